@@ -15,7 +15,8 @@ CREATE TABLE ZIPCodes (
     PercentMinority DECIMAL(5, 2),
     PercentPoverty DECIMAL(5, 2),
     PercentUninsured DECIMAL(5, 2),
-    SocialVulnerabilityIndex DECIMAL(5, 2)
+    SocialVulnerabilityIndex DECIMAL(5, 2),
+    RowVer ROWVERSION  -- Change marker for the analysis fetch cache
 );
 
 -- Create table for healthcare facilities
@@ -28,6 +29,7 @@ CREATE TABLE HealthcareFacilities (
     HasEmergencyServices BIT,
     AcceptsMediCal BIT,
     AcceptsMedicare BIT,
+    RowVer ROWVERSION,  -- Change marker for the analysis fetch cache
     FOREIGN KEY (ZIPCode) REFERENCES ZIPCodes(ZIPCode)
 );
 
@@ -44,6 +46,7 @@ CREATE TABLE HealthIndicators (
     MentalHealthDisordersPrevalence DECIMAL(5, 2),
     PreventableHospitalizations DECIMAL(10, 2),  -- Rate per 100,000
     LifeExpectancy DECIMAL(5, 2),
+    RowVer ROWVERSION,  -- Change marker for the analysis fetch cache
     FOREIGN KEY (ZIPCode) REFERENCES ZIPCodes(ZIPCode)
 );
 
@@ -59,6 +62,7 @@ CREATE TABLE HealthcareAccessBarriers (
     AvgDistanceToClinic DECIMAL(5, 2),    -- In miles
     PublicTransitAccessScore DECIMAL(5, 2),  -- Scale 0-100
     DigitalDivideIndex DECIMAL(5, 2),     -- Scale 0-100 measuring internet access, tech literacy
+    RowVer ROWVERSION,  -- Change marker for the analysis fetch cache
     FOREIGN KEY (ZIPCode) REFERENCES ZIPCodes(ZIPCode)
 );
 
@@ -72,13 +76,33 @@ CREATE TABLE EnvironmentalFactors (
     FoodDesertScore DECIMAL(5, 2),  -- Higher means worse access to healthy food
     GreenSpaceAccess DECIMAL(5, 2), -- Percent of population with park access
     CalEnviroScreenScore DECIMAL(5, 2),
+    RowVer ROWVERSION,  -- Change marker for the analysis fetch cache
     FOREIGN KEY (ZIPCode) REFERENCES ZIPCodes(ZIPCode)
 );
 
 -- Create index for faster queries
-CREATE INDEX idx_zipcode ON HealthIndicators(ZIPCode);
-CREATE INDEX idx_zipcode_health_access ON HealthcareAccessBarriers(ZIPCode);
-CREATE INDEX idx_zipcode_environmental ON EnvironmentalFactors(ZIPCode);
+-- Composite (ZIPCode, Year) indexes serve both ZIP lookups and the per-year joins
+CREATE INDEX idx_zipcode_year ON HealthIndicators(ZIPCode, Year);
+CREATE INDEX idx_zipcode_year_health_access ON HealthcareAccessBarriers(ZIPCode, Year);
+CREATE INDEX idx_zipcode_year_environmental ON EnvironmentalFactors(ZIPCode, Year);
+CREATE INDEX idx_zipcode_facility_type ON HealthcareFacilities(ZIPCode, FacilityType);
+GO
+
+-- Create an indexed view with facility counts per ZIP code and facility type
+-- SQL Server maintains it on every insert/update/delete, so reads never rescan HealthcareFacilities
+CREATE VIEW FacilitySummaryView WITH SCHEMABINDING AS
+SELECT
+    hf.ZIPCode,
+    hf.FacilityType,
+    COUNT_BIG(*) AS FacilityCount
+FROM
+    dbo.HealthcareFacilities hf
+GROUP BY
+    hf.ZIPCode,
+    hf.FacilityType;
+GO
+
+CREATE UNIQUE CLUSTERED INDEX idx_facility_summary ON FacilitySummaryView(ZIPCode, FacilityType);
 GO
 
 -- Create a view that joins all relevant data for easier querying
@@ -112,13 +136,65 @@ SELECT
     ef.FoodDesertScore,
     ef.GreenSpaceAccess,
     ef.CalEnviroScreenScore,
-    (SELECT COUNT(*) FROM HealthcareFacilities hf WHERE hf.ZIPCode = z.ZIPCode) AS FacilityCount
+    CAST(ISNULL(fs.FacilityCount, 0) AS INT) AS FacilityCount
 FROM
     ZIPCodes z
+LEFT JOIN
+    (SELECT ZIPCode, SUM(FacilityCount) AS FacilityCount
+     FROM FacilitySummaryView WITH (NOEXPAND)
+     GROUP BY ZIPCode) fs ON z.ZIPCode = fs.ZIPCode
 LEFT JOIN
     HealthIndicators hi ON z.ZIPCode = hi.ZIPCode AND hi.Year = 2023
 LEFT JOIN
     HealthcareAccessBarriers hab ON z.ZIPCode = hab.ZIPCode AND hab.Year = 2023
 LEFT JOIN
     EnvironmentalFactors ef ON z.ZIPCode = ef.ZIPCode AND ef.Year = 2023;
-GO
\ No newline at end of file
+GO
+
+-- Create a long-format view with one row per ZIP code and year
+-- Filter it with WHERE Year BETWEEN ... to analyze a range of years
+CREATE VIEW CommunityHealthYearView AS
+SELECT
+    z.ZIPCode,
+    hi.Year,
+    z.CommunityName,
+    z.TotalPopulation,
+    z.MedianIncome,
+    z.PercentMinority,
+    z.PercentPoverty,
+    z.PercentUninsured,
+    z.SocialVulnerabilityIndex,
+    hi.DiabetesPrevalence,
+    hi.HeartDiseasePrevalence,
+    hi.AsthmaPrevalence,
+    hi.HypertensionPrevalence,
+    hi.ObesityPrevalence,
+    hi.MentalHealthDisordersPrevalence,
+    hi.PreventableHospitalizations,
+    hi.LifeExpectancy,
+    hab.PercentNoRegularCheckup,
+    hab.PercentDelayedCare,
+    hab.PercentNoTransportation,
+    hab.AvgDistanceToHospital,
+    hab.AvgDistanceToClinic,
+    hab.PublicTransitAccessScore,
+    hab.DigitalDivideIndex,
+    ef.AirPollutionIndex,
+    ef.WaterQualityIndex,
+    ef.FoodDesertScore,
+    ef.GreenSpaceAccess,
+    ef.CalEnviroScreenScore,
+    CAST(ISNULL(fs.FacilityCount, 0) AS INT) AS FacilityCount
+FROM
+    ZIPCodes z
+INNER JOIN
+    HealthIndicators hi ON z.ZIPCode = hi.ZIPCode
+LEFT JOIN
+    (SELECT ZIPCode, SUM(FacilityCount) AS FacilityCount
+     FROM FacilitySummaryView WITH (NOEXPAND)
+     GROUP BY ZIPCode) fs ON z.ZIPCode = fs.ZIPCode
+LEFT JOIN
+    HealthcareAccessBarriers hab ON z.ZIPCode = hab.ZIPCode AND hab.Year = hi.Year
+LEFT JOIN
+    EnvironmentalFactors ef ON z.ZIPCode = ef.ZIPCode AND ef.Year = hi.Year;
+GO
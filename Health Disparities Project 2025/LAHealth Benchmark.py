@@ -0,0 +1,343 @@
+# Import
+import pandas as pd
+import numpy as np
+import os
+import sys
+import logging
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+# Directory holding the analysis scripts
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Function to load one of the analysis scripts as a module
+def load_script(module_name, filename):
+    """
+    Load an analysis script whose file name is not a valid module name.
+
+    The module is registered in sys.modules so functions from it can be
+    pickled to worker processes.
+
+    Args:
+        module_name: Name to register the module under
+        filename: Script file name in SCRIPT_DIR
+
+    Returns:
+        module: The loaded script
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    if SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, SCRIPT_DIR)
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPT_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# Loaded at import time so spawned worker processes can resolve both modules
+first = load_script('lahealth_first', 'LAHealth First Code.py')
+second = load_script('lahealth_second', 'LAHealth Second Code.py')
+
+
+# Numbers of geographic units to benchmark by default
+BENCHMARK_SIZES = [1000, 100000, 1000000]
+
+# Directory benchmark results are written to
+BENCHMARK_RESULTS_DIR = 'benchmarks'
+
+# Relative slowdown (or memory growth) against a baseline that counts as a regression
+REGRESSION_TOLERANCE = 0.10
+
+# Changes smaller than these are treated as noise rather than regressions
+REGRESSION_MIN_SECONDS = 0.05
+REGRESSION_MIN_BYTES = 16 * 1024 ** 2
+
+
+# Function to build an analysis frame from the synthetic generators
+def build_benchmark_frame(n_units, seed=42):
+    """
+    Build the frame fetch_data_for_analysis would return, without a database.
+
+    Units come from the synthetic generator in LAHealth First Code.py and
+    facilities (two per unit) are counted per ZIP code the same way as the
+    fetched facility summary.
+
+    Args:
+        n_units: Number of geographic units
+        seed: Seed for the generators
+
+    Returns:
+        tuple: (community health DataFrame, facilities DataFrame)
+    """
+    units = first.generate_unit_data(n_units, seed)
+    facilities = first.generate_healthcare_facilities(zip_codes=units['ZIPCode'].to_numpy(), seed=seed)
+
+    community_health = second.add_facility_counts(units, second.count_facilities(facilities))
+    return second.enforce_schema(community_health), second.coerce_dtypes(facilities, second.FACILITY_DTYPES)
+
+
+# Function to run every stage once for one size
+def run_pipeline(n_units, seed=42, k=None, n_jobs=None, workdir=None):
+    """
+    Run the analysis pipeline on synthetic data and measure each stage.
+
+    Args:
+        n_units: Number of geographic units
+        seed: Seed for the generators
+        k: Number of clusters (chosen automatically as in main() if not given)
+        n_jobs: Number of worker processes for the k sweep and chart rendering
+        workdir: Directory for the charts and CSV export (a temporary directory if not given)
+
+    Returns:
+        list: One metrics record per stage, as produced by StageProfiler
+    """
+    with tempfile.TemporaryDirectory(dir=workdir) as output_dir:
+        profiler = second.StageProfiler(second.new_run_id(), metrics_path=None)
+
+        with profiler.stage('generate') as stage:
+            community_health, facilities = build_benchmark_frame(n_units, seed)
+            stage['rows'] = len(community_health)
+
+        with profiler.stage('disparities') as stage:
+            disparity_data = second.identify_healthcare_disparities(community_health)
+            stage['rows'] = len(disparity_data)
+
+        with profiler.stage('clustering') as stage:
+            clustered_data, _ = second.cluster_communities(disparity_data, k=k, n_jobs=n_jobs, cache_dir=None)
+            stage['rows'] = len(clustered_data)
+
+        with profiler.stage('insights') as stage:
+            clustered_data['IncomeGroup'] = second.assign_income_groups(clustered_data)
+            clustered_data['FacilityAccessScore'] = second.facility_access_score(clustered_data)
+            summary_cube = second.build_summary_cube(clustered_data)
+            second.generate_insights(clustered_data, cube=summary_cube)
+            stage['rows'] = len(clustered_data)
+
+        with profiler.stage('visualizations') as stage:
+            second.create_visualizations(clustered_data, os.path.join(output_dir, 'visualizations'),
+                                         cube=summary_cube, n_jobs=n_jobs)
+            stage['rows'] = len(clustered_data)
+
+        with profiler.stage('export') as stage:
+            second.write_outputs(os.path.join(output_dir, 'powerbi_data'), clustered_data, facilities)
+            stage['rows'] = len(clustered_data)
+
+    return profiler.records
+
+
+# Function to describe the environment a benchmark ran in
+def environment_info():
+    """
+    Collect the versions and hardware needed to judge whether two results are comparable.
+
+    Returns:
+        dict: Python, library and platform details and the git commit of the scripts
+    """
+    import sklearn
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=SCRIPT_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+    }
+
+
+# Function to summarize repeated runs per size and stage
+def summarize_results(records):
+    """
+    Reduce the per-run records to one row per size and stage.
+
+    Args:
+        records: Stage metrics records with 'size' and 'repeat' keys
+
+    Returns:
+        DataFrame: Median and minimum wall time, median CPU time, largest peak RSS growth and rows,
+            with the CPU time and peak RSS growth of worker processes alongside the main process's
+    """
+    results = pd.DataFrame(records)
+    # Child metrics are None where getrusage isn't available
+    metrics = [col for col in results.columns if col.endswith(('_seconds', '_bytes'))]
+    results[metrics] = results[metrics].apply(pd.to_numeric)
+    summary = results.groupby(['size', 'stage'], sort=False).agg(
+        wall_median=('wall_seconds', 'median'),
+        wall_min=('wall_seconds', 'min'),
+        cpu_median=('cpu_seconds', 'median'),
+        children_cpu_median=('children_cpu_seconds', 'median'),
+        peak_rss_delta_max=('peak_rss_delta_bytes', 'max'),
+        children_peak_rss_delta_max=('children_peak_rss_delta_bytes', 'max'),
+        rows=('rows', 'max'),
+    )
+    return summary.reset_index()
+
+
+# Function to compare a summary against a baseline
+def compare_results(summary, baseline_summary, tolerance=REGRESSION_TOLERANCE):
+    """
+    Compare each size and stage with the same size and stage of a baseline.
+
+    A stage regresses when its median wall time, or the peak RSS growth of
+    the main process or of its workers, exceeds the baseline by more than
+    the tolerance and by more than REGRESSION_MIN_SECONDS or
+    REGRESSION_MIN_BYTES. Baselines saved before worker metrics were
+    recorded are compared on the main process only.
+
+    Args:
+        summary: Output of summarize_results for the current run
+        baseline_summary: Output of summarize_results for the baseline
+        tolerance: Relative growth in median wall time or peak RSS that counts as a regression
+
+    Returns:
+        DataFrame: Current and baseline values, their ratios and a regression flag
+    """
+    baseline_summary = baseline_summary.reindex(columns=summary.columns)
+    comparison = summary.merge(baseline_summary, on=['size', 'stage'], suffixes=('', '_baseline'))
+    comparison['wall_ratio'] = comparison['wall_median'] / comparison['wall_median_baseline']
+    slower = (
+        (comparison['wall_ratio'] > 1 + tolerance)
+        & (comparison['wall_median'] - comparison['wall_median_baseline'] > REGRESSION_MIN_SECONDS)
+    )
+
+    larger = pd.Series(False, index=comparison.index)
+    for col, ratio_col in [('peak_rss_delta_max', 'memory_ratio'),
+                           ('children_peak_rss_delta_max', 'children_memory_ratio')]:
+        current, baseline = comparison[col].astype('float64'), comparison[f'{col}_baseline'].astype('float64')
+        comparison[ratio_col] = current / baseline.replace(0, np.nan)
+        larger |= (comparison[ratio_col] > 1 + tolerance) & (current - baseline > REGRESSION_MIN_BYTES)
+
+    comparison['regression'] = slower | larger
+    return comparison[['size', 'stage', 'wall_median', 'wall_median_baseline', 'wall_ratio',
+                       'peak_rss_delta_max', 'peak_rss_delta_max_baseline', 'memory_ratio',
+                       'children_peak_rss_delta_max', 'children_peak_rss_delta_max_baseline',
+                       'children_memory_ratio', 'regression']]
+
+
+# Function to run the benchmark for every size
+def run_benchmark(sizes=BENCHMARK_SIZES, repeat=3, seed=42, k=None, n_jobs=None, isolate=True):
+    """
+    Benchmark every stage of the pipeline at each size.
+
+    Each repetition runs in a fresh process by default, so in-memory caches
+    are cold and the peak RSS growth of a stage isn't hidden by an earlier run.
+
+    Args:
+        sizes: Numbers of geographic units to benchmark
+        repeat: Runs per size
+        seed: Seed for the generators
+        k: Number of clusters (chosen automatically as in main() if not given)
+        n_jobs: Number of worker processes for the k sweep and chart rendering
+        isolate: Run each repetition in its own process
+
+    Returns:
+        dict: Settings, environment, per-run records and per-stage summary
+    """
+    records = []
+    for size in sizes:
+        for i in range(repeat):
+            logger.info(f"Benchmarking {size:,} units (run {i + 1} of {repeat})...")
+            if isolate:
+                context = multiprocessing.get_context('spawn')
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    run_records = pool.submit(run_pipeline, size, seed, k, n_jobs).result()
+            else:
+                run_records = run_pipeline(size, seed, k, n_jobs)
+
+            records.extend({'size': size, 'repeat': i, **record} for record in run_records)
+
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'settings': {'sizes': list(sizes), 'repeat': repeat, 'seed': seed, 'k': k, 'n_jobs': n_jobs},
+        'environment': environment_info(),
+        'records': records,
+        'summary': summarize_results(records).to_dict(orient='records'),
+    }
+
+
+# Function to parse command line options
+def parse_args(argv=None):
+    """
+    Parse the command line options of the benchmark.
+
+    Args:
+        argv: Argument list (defaults to sys.argv)
+
+    Returns:
+        argparse.Namespace: Parsed options
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the LA County health disparities pipeline offline")
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')],
+                        default=BENCHMARK_SIZES, help="Comma-separated numbers of units to benchmark")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per size")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for the synthetic data")
+    parser.add_argument('--k', type=int, help="Fix the number of clusters instead of sweeping k")
+    parser.add_argument('--n-jobs', type=int, help="Worker processes for the k sweep and chart rendering")
+    parser.add_argument('--in-process', action='store_true',
+                        help="Run every repetition in this process instead of a fresh one")
+    parser.add_argument('--output', help="Results file (defaults to benchmarks/<timestamp>.json)")
+    parser.add_argument('--baseline', help="Earlier results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE,
+                        help="Relative slowdown or memory growth that counts as a regression")
+    return parser.parse_args(argv)
+
+
+# Main function to run the benchmark
+def main(argv=None):
+    """
+    Run the benchmark, save the results and compare them with a baseline.
+
+    Returns:
+        int: 1 if a regression against the baseline was found, otherwise 0
+    """
+    args = parse_args(argv)
+
+    results = run_benchmark(args.sizes, args.repeat, args.seed, args.k, args.n_jobs, isolate=not args.in_process)
+
+    output = args.output or os.path.join(
+        BENCHMARK_RESULTS_DIR, time.strftime('%Y%m%dT%H%M%SZ', time.gmtime()) + '.json'
+    )
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    summary = pd.DataFrame(results['summary'])
+    print("\nBenchmark summary:")
+    print(summary.to_string(index=False))
+    print(f"\nResults saved to '{output}'.")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = compare_results(summary, pd.DataFrame(baseline['summary']), args.tolerance)
+        print(f"\nComparison with '{args.baseline}':")
+        print(comparison.to_string(index=False))
+        if comparison['regression'].any():
+            print(f"\nRegressions of more than {args.tolerance:.0%} found.")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,6 @@
 # Import
 import pandas as pd
 import numpy as np
-import pyodbc
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.preprocessing import StandardScaler
@@ -9,7 +8,10 @@ from sklearn.cluster import KMeans
 import os
 import logging
 import traceback
+import argparse
+import time
 from datetime import datetime
+from lahealth_db import connect_to_database
 
 
 logging.basicConfig(
@@ -23,346 +25,658 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-# Database Connection
-def connect_to_database():
+# LA County ZIP codes used as the default set of geographic units
+LA_ZIP_CODES = ['90001', '90002', '90003', '90004', '90005', '90006', '90007', '90008', '90010',
+                '90011', '90012', '90013', '90014', '90015', '90016', '90017', '90018', '90019',
+                '90020', '90021', '90022', '90023', '90024', '90025', '90026', '90027', '90028',
+                '90029', '90031', '90032', '90033', '90034', '90035', '90036', '90037', '90038',
+                '90039', '90040', '90041', '90042', '90043', '90044', '90045', '90046', '90047',
+                '90048', '90049', '90056', '90057', '90058', '90059', '90061', '90062', '90063',
+                '90064', '90065', '90066', '90067', '90068', '90069', '90071', '90077', '90089',
+                '90090', '90094', '90210', '90211', '90212', '90230', '90232', '90245', '90247',
+                '90248', '90272', '90290', '90291', '90292', '90293', '90301', '90302', '90303',
+                '90304', '90305', '90401', '90402', '90403', '90404', '90405', '90501', '90502',
+                '90710', '90717', '90731', '90732', '90744', '90745', '90810', '90813', '91001',
+                '91006', '91007', '91010', '91011', '91016', '91020', '91024', '91030', '91040',
+                '91042', '91105', '91106', '91108', '91201', '91202', '91203', '91204', '91205',
+                '91206', '91207', '91208', '91210', '91214', '91303', '91304', '91306', '91307',
+                '91311', '91316', '91324', '91325', '91331', '91335', '91340', '91342', '91343',
+                '91344', '91345', '91352', '91356', '91364', '91367', '91371', '91401', '91402',
+                '91403', '91405', '91406', '91411', '91423', '91436', '91501', '91502', '91504',
+                '91505', '91506', '91601', '91602', '91604', '91605', '91606', '91607', '93510',
+                '93532', '93534', '93535', '93536', '93543', '93550', '93551', '93552', '93563',
+                '93591']
+
+# Community names for the ZIP codes we have on record (others fall back to the ZIP code)
+LA_COMMUNITY_NAMES = {
+    '90001': 'Florence-Graham', '90002': 'Watts', '90003': 'South Central LA', '90004': 'Koreatown',
+    '90005': 'Westlake', '90006': 'Pico-Union', '90007': 'University Park', '90008': 'Baldwin Hills',
+    '90010': 'Hancock Park', '90011': 'South Central LA', '90012': 'Chinatown', '90015': 'Downtown LA',
+    '90017': 'Downtown LA', '90024': 'Westwood', '90025': 'West LA', '90026': 'Echo Park',
+    '90027': 'Los Feliz', '90033': 'Boyle Heights', '90045': 'Westchester', '90046': 'Hollywood Hills',
+    '90048': 'Beverly Grove', '90210': 'Beverly Hills', '90211': 'Beverly Hills', '90230': 'Culver City',
+    '90232': 'Culver City', '90291': 'Venice', '90292': 'Marina del Rey', '90301': 'Inglewood',
+    '90302': 'Inglewood', '90402': 'Santa Monica', '90403': 'Santa Monica', '90404': 'Santa Monica',
+    '90405': 'Santa Monica', '90501': 'Torrance', '90502': 'Torrance', '90731': 'San Pedro',
+    '90732': 'San Pedro', '90744': 'Wilmington', '90745': 'Carson', '91342': 'Sylmar',
+    '91344': 'Porter Ranch', '91356': 'Tarzana', '91364': 'Woodland Hills', '91405': 'Van Nuys',
+    '91601': 'North Hollywood'
+}
+
+# Synthetic unit IDs start past the 5-digit ZIP range so they never collide with real ZIP codes
+SYNTHETIC_UNIT_ID_START = 100000
+
+# Health outcomes are drawn uniformly: (column, low, high)
+HEALTH_SPECS = [
+    ('DiabetesPrevalence', 5, 25),
+    ('HeartDiseasePrevalence', 3, 15),
+    ('AsthmaPrevalence', 8, 22),
+    ('HypertensionPrevalence', 15, 40),
+    ('ObesityPrevalence', 10, 35),
+    ('MentalHealthDisordersPrevalence', 10, 30),
+    ('PreventableHospitalizations', 100, 500),
+    ('LifeExpectancy', 75, 90),
+]
+
+# Access and environmental metrics follow the income factor:
+# (column, base, income slope, noise std, lower clip, upper clip)
+ACCESS_SPECS = [
+    ('PercentNoRegularCheckup', 15, 40, 5, 5, 70),
+    ('PercentDelayedCare', 10, 30, 5, 5, 60),
+    ('PercentNoTransportation', 5, 25, 3, 1, 40),
+    ('AvgDistanceToHospital', 1, 8, 1, 0.5, 15),
+    ('AvgDistanceToClinic', 0.5, 5, 0.8, 0.2, 10),
+    ('PublicTransitAccessScore', 80, -60, 10, 10, 95),  # Higher score is better
+    ('DigitalDivideIndex', 10, 70, 10, 5, 90),  # Higher score means bigger divide
+]
+
+ENVIRONMENTAL_SPECS = [
+    ('AirPollutionIndex', 20, 60, 10, 10, 95),  # Higher is worse
+    ('WaterQualityIndex', 90, -40, 10, 30, 98),  # Higher is better
+    ('FoodDesertScore', 10, 70, 15, 5, 95),  # Higher is worse
+    ('GreenSpaceAccess', 80, -60, 10, 5, 95),  # Percentage of population with park access
+    ('CalEnviroScreenScore', 15, 70, 10, 10, 95),  # Higher is worse
+]
+
+DEMOGRAPHIC_COLUMNS = ['TotalPopulation', 'MedianIncome', 'PercentMinority', 'PercentPoverty',
+                       'PercentUninsured', 'SocialVulnerabilityIndex']
+HEALTH_COLUMNS = [spec[0] for spec in HEALTH_SPECS]
+ACCESS_COLUMNS = [spec[0] for spec in ACCESS_SPECS]
+ENVIRONMENTAL_COLUMNS = [spec[0] for spec in ENVIRONMENTAL_SPECS]
+
+
+# Function to build the unit IDs and community names for one chunk
+def _unit_identifiers(start, stop):
     """
-    Connect to our SQL Server database.
+    Build ZIP codes and community names for units start..stop-1.
+
+    The first units are the real LA County ZIP codes; any units beyond that
+    list get numeric synthetic IDs starting at SYNTHETIC_UNIT_ID_START.
+
+    Args:
+        start: Index of the first unit in the chunk
+        stop: Index one past the last unit in the chunk
 
     Returns:
-        connection: A connection to the SQL Server database or None if connection fails
+        tuple: (zip_codes, community_names) as NumPy object arrays
     """
-    logger.info("Connecting to the database...")
+    real_stop = min(stop, len(LA_ZIP_CODES))
+    real_zips = LA_ZIP_CODES[start:real_stop] if start < real_stop else []
+
+    synthetic_start = max(start, len(LA_ZIP_CODES))
+    synthetic_zips = (
+        pd.Series(np.arange(synthetic_start, stop) - len(LA_ZIP_CODES) + SYNTHETIC_UNIT_ID_START)
+        .astype(str)
+        .to_numpy(dtype=object)
+    )
 
-    # Database connection details
-    server = 'DESKTOP-7A92MUU'
-    database = 'LAHealthDisparities'
+    zip_codes = np.concatenate([np.array(real_zips, dtype=object), synthetic_zips])
 
-    #Windows Authentication
-    try:
-        # Windows Authentication connection string
-        connection_string = f'DRIVER={{SQL Server}};SERVER={server};DATABASE={database};Trusted_Connection=yes;TrustServerCertificate=yes'
-        connection = pyodbc.connect(connection_string)
-        logger.info("Successfully connected to the database using Windows Authentication!")
-        return connection
-    except Exception as e:
-        logger.warning(f"Windows Authentication failed: {e}")
-
-        # If Windows Authentication fails, check for other available drivers
-        try:
-            logger.info(f"Available ODBC drivers: {pyodbc.drivers()}")
-
-            # Try with a different driver if "SQL Server" is not available
-            if "ODBC Driver 17 for SQL Server" in pyodbc.drivers():
-                driver = "ODBC Driver 17 for SQL Server"
-            elif "ODBC Driver 18 for SQL Server" in pyodbc.drivers():
-                driver = "ODBC Driver 18 for SQL Server"
-            elif "SQL Server" in pyodbc.drivers():
-                driver = "SQL Server"
-            else:
-                driver = pyodbc.drivers()[0]
-
-            connection_string = f'DRIVER={{{driver}}};SERVER={server};DATABASE={database};Trusted_Connection=yes;TrustServerCertificate=yes'
-            connection = pyodbc.connect(connection_string)
-            logger.info(f"Successfully connected to the database using {driver}!")
-            return connection
-        except Exception as e:
-            logger.error(f"All connection attempts failed: {e}")
-            return None
+    # Synthetic units reuse their ID as the community name
+    community_names = zip_codes.copy()
+    for i, zip_code in enumerate(real_zips):
+        community_names[i] = LA_COMMUNITY_NAMES.get(zip_code, zip_code)
 
+    return zip_codes, community_names
 
-# Function to generate synthetic health data
-def generate_health_data():
+
+# Function to draw every metric for one chunk of units
+def _draw_unit_chunk(rng, zip_codes, community_names, indicator_rng=None):
     """
-    Generate synthetic health data for LA County ZIP codes.
+    Draw all correlated metrics for a chunk of units in one vectorized pass.
+
+    Args:
+        rng: numpy.random.Generator to draw the demographics from
+        zip_codes: Array of ZIP codes (or synthetic unit IDs) for the chunk
+        community_names: Array of community names for the chunk
+        indicator_rng: Separate generator for the health, access and environmental draws (defaults to rng)
 
     Returns:
-        pandas.DataFrame: DataFrame containing health indicators by ZIP code
+        pandas.DataFrame: One row per unit with demographic, health, access and environmental columns
     """
-    logger.info("Generating synthetic health data...")
+    n = len(zip_codes)
+    if indicator_rng is None:
+        indicator_rng = rng
 
-    # LA County ZIP codes
-    zip_codes = ['90001', '90002', '90003', '90004', '90005', '90006', '90007', '90008', '90010',
-                 # ... zip codes continue ...
-                 '93591']
+    # Shared income vector that drives every correlated metric
+    base_income = rng.uniform(30000, 200000, n)
 
-    communities = [
-        'Florence-Graham', 'Watts', 'South Central LA', 'Koreatown', 'Westlake', 'Pico-Union',
-        # ... communities continue ...
-        'Palmdale', 'Valyermo', 'Palmdale'
-    ]
+    # Inverse patterns for poverty and uninsured rates
+    poverty_rates = np.clip(30 - (base_income / 10000), 1, 40)
+    uninsured_rates = np.clip(25 - (base_income / 15000), 1, 30)
+
+    # Note: This is synthetic data and not meant to represent actual demographic patterns
+    minority_percentages = rng.uniform(20, 95, n)
 
-    #DataFrame with synthetic health data
-    np.random.seed(42)  # For reproducibility
+    # Social vulnerability index scaled to 0-10
+    svi = ((poverty_rates / 40) * 0.4 + (uninsured_rates / 30) * 0.3 + (minority_percentages / 100) * 0.3) * 10
 
-    health_data = pd.DataFrame({
+    columns = {
         'ZIPCode': zip_codes,
-        'CommunityName': communities,
-        'DiabetesPrevalence': np.random.uniform(5, 25, len(zip_codes)),
-        'HeartDiseasePrevalence': np.random.uniform(3, 15, len(zip_codes)),
-        'AsthmaPrevalence': np.random.uniform(8, 22, len(zip_codes)),
-        'HypertensionPrevalence': np.random.uniform(15, 40, len(zip_codes)),
-        'ObesityPrevalence': np.random.uniform(10, 35, len(zip_codes)),
-        'MentalHealthDisordersPrevalence': np.random.uniform(10, 30, len(zip_codes)),
-        'PreventableHospitalizations': np.random.uniform(100, 500, len(zip_codes)),
-        'LifeExpectancy': np.random.uniform(75, 90, len(zip_codes)),
-    })
+        'CommunityName': community_names,
+        'TotalPopulation': rng.integers(10000, 70000, n),
+        'MedianIncome': base_income,
+        'PercentMinority': minority_percentages,
+        'PercentPoverty': poverty_rates,
+        'PercentUninsured': uninsured_rates,
+        'SocialVulnerabilityIndex': svi,
+    }
+
+    # Health outcomes: one uniform draw for every column at once
+    lows = np.array([spec[1] for spec in HEALTH_SPECS], dtype=float)
+    highs = np.array([spec[2] for spec in HEALTH_SPECS], dtype=float)
+    health_values = indicator_rng.random((n, len(HEALTH_SPECS)))
+    health_values *= highs - lows
+    health_values += lows
+    for i, col in enumerate(HEALTH_COLUMNS):
+        columns[col] = health_values[:, i]
+
+    # Access and environmental metrics: base + income factor * slope + noise, then clip
+    # Lower income areas tend to have less healthcare access and worse environmental conditions
+    income_factor = ((200000 - base_income) / 200000)[:, None]
+    specs = ACCESS_SPECS + ENVIRONMENTAL_SPECS
+    base, slope, noise_sd, lower, upper = (np.array(values, dtype=float) for values in list(zip(*specs))[1:])
+    correlated_values = indicator_rng.standard_normal((n, len(specs)))
+    correlated_values *= noise_sd
+    correlated_values += base
+    correlated_values += income_factor * slope
+    np.clip(correlated_values, lower, upper, out=correlated_values)
+    for i, spec in enumerate(specs):
+        columns[spec[0]] = correlated_values[:, i]
+
+    return pd.DataFrame(columns)
+
+
+# Synthetic data generator engine
+def generate_synthetic_units(n_units=None, seed=42, chunk_size=500000, year=None):
+    """
+    Generate correlated synthetic data for any number of geographic units.
 
-    logger.info(f"Successfully generated health data for {len(health_data)} ZIP codes.")
-    return health_data
+    Every metric is drawn from one shared income vector in a single vectorized
+    pass per chunk, and chunks are yielded as they are drawn so memory stays
+    bounded by chunk_size rather than n_units. Output is reproducible for a
+    given seed and chunk_size.
 
+    When a year is given, the demographics still come from seed alone while
+    the indicators are drawn from a stream seeded by (seed, year), so every
+    year of a time series shares the same units and income vector.
 
-# Function to generate demographic data
-def generate_demographic_data():
+    Args:
+        n_units: Number of units to generate (defaults to the LA County ZIP codes)
+        seed: Seed for the random number generator
+        chunk_size: Maximum number of units per chunk
+        year: Optional year; adds a Year column and draws year-specific indicators
+
+    Yields:
+        pandas.DataFrame: Chunk of unit-level data with ZIPCode, CommunityName and every metric column
     """
-    Generate synthetic demographic data for LA County ZIP codes.
+    if n_units is None:
+        n_units = len(LA_ZIP_CODES)
+
+    logger.info(f"Generating synthetic data for {n_units} units in chunks of {chunk_size}...")
+
+    rng = np.random.default_rng(seed)
+    indicator_rng = np.random.default_rng([seed, year]) if year is not None else None
+
+    for start in range(0, n_units, chunk_size):
+        stop = min(start + chunk_size, n_units)
+        zip_codes, community_names = _unit_identifiers(start, stop)
+        units = _draw_unit_chunk(rng, zip_codes, community_names, indicator_rng)
+        if year is not None:
+            units.insert(1, 'Year', year)
+        yield units
+
+
+# Function to collect the generator output into a single DataFrame
+def generate_unit_data(n_units=None, seed=42, chunk_size=500000):
+    """
+    Generate synthetic unit data as one DataFrame.
+
+    Args:
+        n_units: Number of units to generate (defaults to the LA County ZIP codes)
+        seed: Seed for the random number generator
+        chunk_size: Maximum number of units per chunk
 
     Returns:
-        pandas.DataFrame: DataFrame containing demographic information by ZIP code
+        pandas.DataFrame: Unit-level data with every metric column
     """
+    return pd.concat(generate_synthetic_units(n_units, seed, chunk_size), ignore_index=True)
 
-    logger.info("Generating demographic data...")
 
-    # Use the same ZIP codes as in the health data function
-    zip_codes = ['90001', '90002', '90003', '90004', '90005', '90006', '90007', '90008', '90010',
-                 '90011', '90012', '90013', '90014', '90015', '90016', '90017', '90018', '90019',
-                 '90020', '90021', '90022', '90023', '90024', '90025', '90026', '90027', '90028',
-                 '90029', '90031', '90032', '90033', '90034', '90035', '90036', '90037', '90038',
-                 '90039', '90040', '90041', '90042', '90043', '90044', '90045', '90046', '90047',
-                 '90048', '90049', '90056', '90057', '90058', '90059', '90061', '90062', '90063',
-                 '90064', '90065', '90066', '90067', '90068', '90069', '90071', '90077', '90089',
-                 '90090', '90094', '90210', '90211', '90212', '90230', '90232', '90245', '90247',
-                 '90248', '90272', '90290', '90291', '90292', '90293', '90301', '90302', '90303',
-                 '90304', '90305', '90401', '90402', '90403', '90404', '90405', '90501', '90502',
-                 '90710', '90717', '90731', '90732', '90744', '90745', '90810', '90813', '91001',
-                 '91006', '91007', '91010', '91011', '91016', '91020', '91024', '91030', '91040',
-                 '91042', '91105', '91106', '91108', '91201', '91202', '91203', '91204', '91205',
-                 '91206', '91207', '91208', '91210', '91214', '91303', '91304', '91306', '91307',
-                 '91311', '91316', '91324', '91325', '91331', '91335', '91340', '91342', '91343',
-                 '91344', '91345', '91352', '91356', '91364', '91367', '91371', '91401', '91402',
-                 '91403', '91405', '91406', '91411', '91423', '91436', '91501', '91502', '91504',
-                 '91505', '91506', '91601', '91602', '91604', '91605', '91606', '91607', '93510',
-                 '93532', '93534', '93535', '93536', '93543', '93550', '93551', '93552', '93563',
-                 '93591']
-
-    # Generate synthetic demographic data
-    np.random.seed(42)  # For reproducibility
-
-    # Correlations between income, poverty, and uninsured rates
-    base_income = np.random.uniform(30000, 200000, len(zip_codes))
-
-    # Sorted incomes to create realistic patterns
-    sorted_indices = np.argsort(base_income)
+# Columns of each per-table frame returned by the generate_*_data functions
+UNIT_TABLE_COLUMNS = {
+    'health': ['ZIPCode', 'CommunityName'] + HEALTH_COLUMNS,
+    'demographic': ['ZIPCode'] + DEMOGRAPHIC_COLUMNS,
+    'healthcare_access': ['ZIPCode'] + ACCESS_COLUMNS,
+    'environmental': ['ZIPCode'] + ENVIRONMENTAL_COLUMNS,
+}
 
-    # Inverse patterns for poverty and uninsured rates
-    poverty_rates = 30 - (base_income / 10000)
-    poverty_rates = np.clip(poverty_rates, 1, 40)
 
-    uninsured_rates = 25 - (base_income / 15000)
-    uninsured_rates = np.clip(uninsured_rates, 1, 30)
+# Function to split each generated chunk into per-table frames
+def generate_table_chunks(table_columns, n_units=None, seed=42, chunk_size=500000, year=None):
+    """
+    Generate the units once and split every chunk into per-table frames.
+
+    Each chunk of units is drawn a single time and every table takes its
+    columns from it, so building several tables never regenerates the units
+    and memory stays bounded by chunk_size.
 
-    # Correlation between minority percentage and income
-    # Note: This is synthetic data and not meant to represent actual demographic patterns
-    minority_percentages = np.random.uniform(20, 95, len(zip_codes))
+    Args:
+        table_columns: Dictionary mapping table names to their columns
+        n_units: Number of units to generate (defaults to the LA County ZIP codes)
+        seed: Seed for the random number generator
+        chunk_size: Maximum number of units per chunk
+        year: Optional year passed to generate_synthetic_units
 
-    # Adjust social vulnerability index based on other factors
-    svi_base = (poverty_rates / 40) * 0.4 + (uninsured_rates / 30) * 0.3 + (minority_percentages / 100) * 0.3
-    svi = svi_base * 10  # Scale to 0-10
+    Yields:
+        dict: Table name to the chunk's frame for that table
+    """
+    for units in generate_synthetic_units(n_units, seed, chunk_size, year):
+        yield {table: units[columns] for table, columns in table_columns.items()}
 
-    demographic_data = pd.DataFrame({
-        'ZIPCode': zip_codes,
-        'TotalPopulation': np.random.randint(10000, 70000, len(zip_codes)),
-        'MedianIncome': base_income,
-        'PercentMinority': minority_percentages,
-        'PercentPoverty': poverty_rates,
-        'PercentUninsured': uninsured_rates,
-        'SocialVulnerabilityIndex': svi
-    })
 
-    logger.info(f"Successfully generated demographic data for {len(demographic_data)} ZIP codes.")
-    return demographic_data
+# Function to generate every per-table frame from one pass over the units
+def generate_all_unit_tables(n_units=None, seed=42, chunk_size=500000):
+    """
+    Generate the health, demographic, healthcare access and environmental tables together.
 
+    Args:
+        n_units: Number of units to generate (defaults to the LA County ZIP codes)
+        seed: Seed for the random number generator
+        chunk_size: Maximum number of units per chunk
 
-# Function to generate healthcare access data
-def generate_healthcare_access_data():
+    Returns:
+        dict: Frame per UNIT_TABLE_COLUMNS key
     """
-    Generate synthetic healthcare access data.
+    parts = {table: [] for table in UNIT_TABLE_COLUMNS}
+    for chunk_tables in generate_table_chunks(UNIT_TABLE_COLUMNS, n_units, seed, chunk_size):
+        for table, frame in chunk_tables.items():
+            parts[table].append(frame)
+    return {table: pd.concat(frames, ignore_index=True) for table, frames in parts.items()}
+
+
+# Function to generate one per-table frame chunk by chunk
+def _generate_unit_table(table, n_units, seed):
+    chunks = generate_table_chunks({table: UNIT_TABLE_COLUMNS[table]}, n_units, seed)
+    return pd.concat([chunk_tables[table] for chunk_tables in chunks], ignore_index=True)
+
+
+# Function to generate synthetic health data
+def generate_health_data(n_units=None, seed=42):
+    """
+    Generate synthetic health data for LA County ZIP codes.
+
+    Args:
+        n_units: Number of units to generate (defaults to the LA County ZIP codes)
+        seed: Seed for the random number generator
 
     Returns:
-        pandas.DataFrame: DataFrame containing healthcare access metrics by ZIP code
+        pandas.DataFrame: DataFrame containing health indicators by ZIP code
     """
-    logger.info("Generating healthcare access data...")
+    logger.info("Generating synthetic health data...")
 
-    # Use the same ZIP codes as before
-    zip_codes = ['90001', '90002', '90003', '90004', '90005', '90006', '90007', '90008', '90010',
-                 '90011', '90012', '90013', '90014', '90015', '90016', '90017', '90018', '90019',
-                 '90020', '90021', '90022', '90023', '90024', '90025', '90026', '90027', '90028',
-                 '90029', '90031', '90032', '90033', '90034', '90035', '90036', '90037', '90038',
-                 '90039', '90040', '90041', '90042', '90043', '90044', '90045', '90046', '90047',
-                 '90048', '90049', '90056', '90057', '90058', '90059', '90061', '90062', '90063',
-                 '90064', '90065', '90066', '90067', '90068', '90069', '90071', '90077', '90089',
-                 '90090', '90094', '90210', '90211', '90212', '90230', '90232', '90245', '90247',
-                 '90248', '90272', '90290', '90291', '90292', '90293', '90301', '90302', '90303',
-                 '90304', '90305', '90401', '90402', '90403', '90404', '90405', '90501', '90502',
-                 '90710', '90717', '90731', '90732', '90744', '90745', '90810', '90813', '91001',
-                 '91006', '91007', '91010', '91011', '91016', '91020', '91024', '91030', '91040',
-                 '91042', '91105', '91106', '91108', '91201', '91202', '91203', '91204', '91205',
-                 '91206', '91207', '91208', '91210', '91214', '91303', '91304', '91306', '91307',
-                 '91311', '91316', '91324', '91325', '91331', '91335', '91340', '91342', '91343',
-                 '91344', '91345', '91352', '91356', '91364', '91367', '91371', '91401', '91402',
-                 '91403', '91405', '91406', '91411', '91423', '91436', '91501', '91502', '91504',
-                 '91505', '91506', '91601', '91602', '91604', '91605', '91606', '91607', '93510',
-                 '93532', '93534', '93535', '93536', '93543', '93550', '93551', '93552', '93563',
-                 '93591']
-
-    # Demographic data to create correlated healthcare access barriers
-    demographic_data = generate_demographic_data()
-
-    # Correlations between income and healthcare access
-    np.random.seed(42)  # For reproducibility
-
-    # Base DataFrame
-    healthcare_access = pd.DataFrame({'ZIPCode': zip_codes})
-
-    # Join with demographic data
-    healthcare_access = healthcare_access.merge(
-        demographic_data[['ZIPCode', 'MedianIncome', 'PercentPoverty', 'PercentUninsured']],
-        on='ZIPCode'
-    )
+    health_data = _generate_unit_table('health', n_units, seed)
 
-    # Correlated healthcare access metrics
-    # Lower income areas tend to have less healthcare access
-    income_factor = (200000 - healthcare_access['MedianIncome']) / 200000
+    logger.info(f"Successfully generated health data for {len(health_data)} ZIP codes.")
+    return health_data
 
-    healthcare_access['PercentNoRegularCheckup'] = 15 + (income_factor * 40) + np.random.normal(0, 5, len(zip_codes))
-    healthcare_access['PercentNoRegularCheckup'] = np.clip(healthcare_access['PercentNoRegularCheckup'], 5, 70)
 
-    healthcare_access['PercentDelayedCare'] = 10 + (income_factor * 30) + np.random.normal(0, 5, len(zip_codes))
-    healthcare_access['PercentDelayedCare'] = np.clip(healthcare_access['PercentDelayedCare'], 5, 60)
+# Function to generate demographic data
+def generate_demographic_data(n_units=None, seed=42):
+    """
+    Generate synthetic demographic data for LA County ZIP codes.
 
-    healthcare_access['PercentNoTransportation'] = 5 + (income_factor * 25) + np.random.normal(0, 3, len(zip_codes))
-    healthcare_access['PercentNoTransportation'] = np.clip(healthcare_access['PercentNoTransportation'], 1, 40)
+    Args:
+        n_units: Number of units to generate (defaults to the LA County ZIP codes)
+        seed: Seed for the random number generator
 
-    healthcare_access['AvgDistanceToHospital'] = 1 + (income_factor * 8) + np.random.normal(0, 1, len(zip_codes))
-    healthcare_access['AvgDistanceToHospital'] = np.clip(healthcare_access['AvgDistanceToHospital'], 0.5, 15)
+    Returns:
+        pandas.DataFrame: DataFrame containing demographic information by ZIP code
+    """
+    logger.info("Generating demographic data...")
 
-    healthcare_access['AvgDistanceToClinic'] = 0.5 + (income_factor * 5) + np.random.normal(0, 0.8, len(zip_codes))
-    healthcare_access['AvgDistanceToClinic'] = np.clip(healthcare_access['AvgDistanceToClinic'], 0.2, 10)
+    demographic_data = _generate_unit_table('demographic', n_units, seed)
+
+    logger.info(f"Successfully generated demographic data for {len(demographic_data)} ZIP codes.")
+    return demographic_data
 
-    # Public transit access (higher score is better)
-    healthcare_access['PublicTransitAccessScore'] = 80 - (income_factor * 60) + np.random.normal(0, 10, len(zip_codes))
-    healthcare_access['PublicTransitAccessScore'] = np.clip(healthcare_access['PublicTransitAccessScore'], 10, 95)
 
-    # Digital divide (higher score means bigger divide)
-    healthcare_access['DigitalDivideIndex'] = 10 + (income_factor * 70) + np.random.normal(0, 10, len(zip_codes))
-    healthcare_access['DigitalDivideIndex'] = np.clip(healthcare_access['DigitalDivideIndex'], 5, 90)
+# Function to generate healthcare access data
+def generate_healthcare_access_data(n_units=None, seed=42):
+    """
+    Generate synthetic healthcare access data.
 
-    # Remove the demographic columns now that I've used them for correlation
-    healthcare_access = healthcare_access.drop(['MedianIncome', 'PercentPoverty', 'PercentUninsured'], axis=1)
+    Args:
+        n_units: Number of units to generate (defaults to the LA County ZIP codes)
+        seed: Seed for the random number generator
+
+    Returns:
+        pandas.DataFrame: DataFrame containing healthcare access metrics by ZIP code
+    """
+    logger.info("Generating healthcare access data...")
+
+    healthcare_access = _generate_unit_table('healthcare_access', n_units, seed)
 
     logger.info(f"Successfully generated healthcare access data for {len(healthcare_access)} ZIP codes.")
     return healthcare_access
 
 
 # Function to generate environmental health data
-def generate_environmental_data():
+def generate_environmental_data(n_units=None, seed=42):
     """
     Generate synthetic environmental health data.
 
+    Args:
+        n_units: Number of units to generate (defaults to the LA County ZIP codes)
+        seed: Seed for the random number generator
+
     Returns:
         pandas.DataFrame: DataFrame containing environmental health metrics by ZIP code
     """
     logger.info("Generating environmental health data...")
 
-    # Use the same ZIP codes as before
-    zip_codes = ['90001', '90002', '90003', '90004', '90005', '90006', '90007', '90008', '90010',
-                 '90011', '90012', '90013', '90014', '90015', '90016', '90017', '90018', '90019',
-                 '90020', '90021', '90022', '90023', '90024', '90025', '90026', '90027', '90028',
-                 '90029', '90031', '90032', '90033', '90034', '90035', '90036', '90037', '90038',
-                 '90039', '90040', '90041', '90042', '90043', '90044', '90045', '90046', '90047',
-                 '90048', '90049', '90056', '90057', '90058', '90059', '90061', '90062', '90063',
-                 '90064', '90065', '90066', '90067', '90068', '90069', '90071', '90077', '90089',
-                 '90090', '90094', '90210', '90211', '90212', '90230', '90232', '90245', '90247',
-                 '90248', '90272', '90290', '90291', '90292', '90293', '90301', '90302', '90303',
-                 '90304', '90305', '90401', '90402', '90403', '90404', '90405', '90501', '90502',
-                 '90710', '90717', '90731', '90732', '90744', '90745', '90810', '90813', '91001',
-                 '91006', '91007', '91010', '91011', '91016', '91020', '91024', '91030', '91040',
-                 '91042', '91105', '91106', '91108', '91201', '91202', '91203', '91204', '91205',
-                 '91206', '91207', '91208', '91210', '91214', '91303', '91304', '91306', '91307',
-                 '91311', '91316', '91324', '91325', '91331', '91335', '91340', '91342', '91343',
-                 '91344', '91345', '91352', '91356', '91364', '91367', '91371', '91401', '91402',
-                 '91403', '91405', '91406', '91411', '91423', '91436', '91501', '91502', '91504',
-                 '91505', '91506', '91601', '91602', '91604', '91605', '91606', '91607', '93510',
-                 '93532', '93534', '93535', '93536', '93543', '93550', '93551', '93552', '93563',
-                 '93591']
-
-    # Get demographic data to create correlations
-    demographic_data = generate_demographic_data()
-
-    # Base DataFrame
-    environmental_data = pd.DataFrame({'ZIPCode': zip_codes})
-
-    # Join with demographic data
-    environmental_data = environmental_data.merge(
-        demographic_data[['ZIPCode', 'MedianIncome', 'PercentPoverty']],
-        on='ZIPCode'
-    )
+    environmental_data = _generate_unit_table('environmental', n_units, seed)
 
-    # Correlated environmental metrics
-    # Lower income areas tend to have worse environmental conditions
-    np.random.seed(42)  # For reproducibility
+    logger.info(f"Successfully generated environmental data for {len(environmental_data)} ZIP codes.")
+    return environmental_data
 
-    income_factor = (200000 - environmental_data['MedianIncome']) / 200000
 
-    # Air pollution (higher is worse)
-    environmental_data['AirPollutionIndex'] = 20 + (income_factor * 60) + np.random.normal(0, 10, len(zip_codes))
-    environmental_data['AirPollutionIndex'] = np.clip(environmental_data['AirPollutionIndex'], 10, 95)
+# Function to generate healthcare facility data
+def generate_healthcare_facilities(n_facilities=None, zip_codes=None, seed=42):
+    """
+    Generate synthetic data on healthcare facilities in LA County.
 
-    # Water quality (higher is better)
-    environmental_data['WaterQualityIndex'] = 90 - (income_factor * 40) + np.random.normal(0, 10, len(zip_codes))
-    environmental_data['WaterQualityIndex'] = np.clip(environmental_data['WaterQualityIndex'], 30, 98)
+    Args:
+        n_facilities: Number of facilities to generate (defaults to two per ZIP code)
+        zip_codes: ZIP codes to distribute facilities across (defaults to the LA County ZIP codes)
+        seed: Seed for the random number generator
 
-    # Food desert score (higher is worse)
-    environmental_data['FoodDesertScore'] = 10 + (income_factor * 70) + np.random.normal(0, 15, len(zip_codes))
-    environmental_data['FoodDesertScore'] = np.clip(environmental_data['FoodDesertScore'], 5, 95)
+    Returns:
+        pandas.DataFrame: DataFrame containing healthcare facility information
+    """
+    logger.info("Generating healthcare facility data...")
 
-    # Green space access (percentage of population with park access)
-    environmental_data['GreenSpaceAccess'] = 80 - (income_factor * 60) + np.random.normal(0, 10, len(zip_codes))
-    environmental_data['GreenSpaceAccess'] = np.clip(environmental_data['GreenSpaceAccess'], 5, 95)
+    if zip_codes is None:
+        zip_codes = LA_ZIP_CODES
+    if n_facilities is None:
+        n_facilities = 2 * len(zip_codes)
+
+    rng = np.random.default_rng(seed)
+
+    facility_types = np.array(['Hospital', 'Clinic', 'Community Health Center'], dtype=object)
+    type_codes = rng.choice(len(facility_types), size=n_facilities, p=[0.15, 0.5, 0.35])
+    is_hospital = type_codes == 0
+    facility_ids = pd.Series(np.arange(1, n_facilities + 1)).astype(str)
+
+    healthcare_facilities = pd.DataFrame({
+        'FacilityName': ('Facility ' + facility_ids).to_numpy(dtype=object),
+        'FacilityType': facility_types[type_codes],
+        'ZIPCode': np.asarray(zip_codes, dtype=object)[rng.integers(0, len(zip_codes), n_facilities)],
+        'Address': (pd.Series(rng.integers(100, 20000, n_facilities)).astype(str) + ' Main St').to_numpy(dtype=object),
+        # Hospitals provide emergency services; most facilities accept public insurance
+        'HasEmergencyServices': is_hospital,
+        'AcceptsMediCal': rng.random(n_facilities) < np.where(is_hospital, 0.8, 0.9),
+        'AcceptsMedicare': rng.random(n_facilities) < 0.95,
+    })
 
-    # CalEnviroScreen score (higher is worse)
-    environmental_data['CalEnviroScreenScore'] = 15 + (income_factor * 70) + np.random.normal(0, 10, len(zip_codes))
-    environmental_data['CalEnviroScreenScore'] = np.clip(environmental_data['CalEnviroScreenScore'], 10, 95)
+    logger.info(f"Successfully generated data for {len(healthcare_facilities)} healthcare facilities.")
+    return healthcare_facilities
 
-    # Remove the demographic columns now that we've used them for correlation
-    environmental_data = environmental_data.drop(['MedianIncome', 'PercentPoverty'], axis=1)
 
-    logger.info(f"Successfully generated environmental data for {len(environmental_data)} ZIP codes.")
-    return environmental_data
+# Local ZIP centroid table read by the proximity analysis
+ZIP_CENTROIDS_FILE = 'zip_centroids.csv'
 
+# Latitude and longitude bounds that synthetic centroids are drawn within (LA County)
+LA_COUNTY_BOUNDS = {'Latitude': (33.70, 34.82), 'Longitude': (-118.95, -117.65)}
 
-# Function to generate healthcare facility data
-def generate_healthcare_facilities():
+
+# Function to generate ZIP code centroids
+def generate_zip_centroids(zip_codes=None, seed=42):
     """
-    Generate synthetic data on healthcare facilities in LA County.
+    Generate synthetic centroid coordinates for ZIP codes.
+
+    Args:
+        zip_codes: ZIP codes to place (defaults to the LA County ZIP codes)
+        seed: Seed for the random number generator
 
     Returns:
-        pandas.DataFrame: DataFrame containing healthcare facility information
+        pandas.DataFrame: ZIPCode, Latitude and Longitude for each ZIP code
     """
-    logger.info("Generating healthcare facility data...")
+    logger.info("Generating ZIP code centroids...")
+
+    if zip_codes is None:
+        zip_codes = LA_ZIP_CODES
+
+    rng = np.random.default_rng(seed)
+    n = len(zip_codes)
+    centroids = pd.DataFrame({'ZIPCode': np.asarray(zip_codes, dtype=object)})
+    for col, (low, high) in LA_COUNTY_BOUNDS.items():
+        centroids[col] = rng.uniform(low, high, n).round(6)
+
+    logger.info(f"Successfully generated centroids for {n} ZIP codes.")
+    return centroids
+
+
+# Columns written to each table, in insert order (tables listed parent-first for the foreign keys)
+TABLE_COLUMNS = {
+    'ZIPCodes': ['ZIPCode', 'CommunityName'] + DEMOGRAPHIC_COLUMNS,
+    'HealthIndicators': ['ZIPCode', 'Year'] + HEALTH_COLUMNS,
+    'HealthcareAccessBarriers': ['ZIPCode', 'Year'] + ACCESS_COLUMNS,
+    'EnvironmentalFactors': ['ZIPCode', 'Year'] + ENVIRONMENTAL_COLUMNS,
+    'HealthcareFacilities': ['FacilityName', 'FacilityType', 'ZIPCode', 'Address',
+                             'HasEmergencyServices', 'AcceptsMediCal', 'AcceptsMedicare'],
+}
+
+
+# Function to bulk insert a DataFrame into a table
+def bulk_insert_dataframe(connection, table, df, chunk_size=10000):
+    """
+    Insert a DataFrame into a table with batched parameterized inserts.
+
+    Each chunk is sent with a single executemany call (using pyodbc's
+    fast_executemany when available) and committed as its own transaction.
+    Works with any DB-API connection that uses '?' placeholders, such as
+    pyodbc or sqlite3.
+
+    Args:
+        connection: Database connection
+        table: Name of the table to insert into
+        df: DataFrame whose columns match the table's columns
+        chunk_size: Number of rows per batch and transaction
+
+    Returns:
+        int: Number of rows inserted
+    """
+    columns = list(df.columns)
+    insert_sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+    cursor = connection.cursor()
+    if hasattr(cursor, 'fast_executemany'):
+        cursor.fast_executemany = True
+
+    rows_inserted = 0
+    try:
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+
+            # Series.tolist() converts NumPy scalars to native Python types for the driver
+            rows = list(zip(*(chunk[col].tolist() for col in columns)))
+
+            try:
+                cursor.executemany(insert_sql, rows)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+
+            rows_inserted += len(rows)
+    finally:
+        cursor.close()
+
+    return rows_inserted
+
+
+# Function to load generated data into the database
+def load_synthetic_data(connection, n_units=None, seed=42, years=(2023,), chunk_size=10000,
+                        generator_chunk_size=500000, n_facilities=None, clear_existing=False):
+    """
+    Generate synthetic data and bulk load it into the database tables.
+
+    Generator chunks are split into the ZIPCodes, HealthIndicators,
+    HealthcareAccessBarriers and EnvironmentalFactors tables and inserted as
+    they are produced, so memory stays bounded by generator_chunk_size.
+    Every year shares the same units and demographics with its own draw of
+    the indicators; ZIPCodes is written with the first year only.
+    Facilities are loaded last so their ZIP codes already exist.
+
+    Unless clear_existing is set, rows are appended: ZIP codes and
+    (ZIPCode, Year) rows that already exist, such as the curated rows from
+    Populating Data.sql, are kept and skipped, and facilities are generated
+    only for newly added ZIP codes.
+
+    Args:
+        connection: Database connection
+        n_units: Number of units to generate (defaults to the LA County ZIP codes)
+        seed: Seed for the random number generator
+        years: Years to generate indicator rows for
+        chunk_size: Number of rows per insert batch and transaction
+        generator_chunk_size: Number of units generated at a time
+        n_facilities: Number of facilities to generate (defaults to two per LA County ZIP code)
+        clear_existing: Delete existing rows from every table before loading (destructive)
+
+    Returns:
+        dict: Rows inserted, elapsed seconds and rows per second for each table
+    """
+    logger.info("Loading synthetic data into the database...")
+
+    if clear_existing:
+        cursor = connection.cursor()
+        # Children first so the foreign keys are never violated
+        for table in reversed(list(TABLE_COLUMNS)):
+            cursor.execute(f"DELETE FROM {table}")
+        connection.commit()
+        cursor.close()
+
+    # Keys already in the database, which an append must not insert again
+    existing_keys = {}
+    if not clear_existing:
+        cursor = connection.cursor()
+        cursor.execute("SELECT ZIPCode FROM ZIPCodes")
+        existing_keys['ZIPCodes'] = {row[0] for row in cursor.fetchall()}
+        for table in ['HealthIndicators', 'HealthcareAccessBarriers', 'EnvironmentalFactors']:
+            cursor.execute(f"SELECT DISTINCT ZIPCode, Year FROM {table}")
+            existing_keys[table] = {(row[0], int(row[1])) for row in cursor.fetchall()}
+        cursor.close()
+
+    def new_rows(table, df):
+        if table not in existing_keys:
+            return df
+        if table == 'ZIPCodes':
+            return df[~df['ZIPCode'].isin(existing_keys[table])]
+        keys = pd.MultiIndex.from_arrays([df['ZIPCode'], df['Year'].astype(int)])
+        return df[~keys.isin(list(existing_keys[table]))]
+
+    load_stats = {table: {'rows': 0, 'seconds': 0.0} for table in TABLE_COLUMNS}
+    added_zip_codes = set()
+
+    def insert_table(table, df):
+        start_time = time.perf_counter()
+        load_stats[table]['rows'] += bulk_insert_dataframe(connection, table, df, chunk_size)
+        load_stats[table]['seconds'] += time.perf_counter() - start_time
+
+    for year_offset, year in enumerate(years):
+        tables = ['HealthIndicators', 'HealthcareAccessBarriers', 'EnvironmentalFactors']
+        if year_offset == 0:
+            tables.insert(0, 'ZIPCodes')
+
+        table_columns = {table: TABLE_COLUMNS[table] for table in tables}
+        for chunk_tables in generate_table_chunks(table_columns, n_units, seed, generator_chunk_size, year):
+            for table, frame in chunk_tables.items():
+                rows = new_rows(table, frame)
+                if table == 'ZIPCodes':
+                    added_zip_codes.update(rows['ZIPCode'])
+                insert_table(table, rows)
+
+    # Facilities can only reference ZIP codes that were loaded above
+    facility_zip_codes = LA_ZIP_CODES[:n_units] if n_units is not None else LA_ZIP_CODES
+    facility_zip_codes = [zip_code for zip_code in facility_zip_codes if zip_code in added_zip_codes]
+    if facility_zip_codes:
+        facilities = generate_healthcare_facilities(n_facilities, facility_zip_codes, seed)
+        insert_table('HealthcareFacilities', facilities[TABLE_COLUMNS['HealthcareFacilities']])
+
+    for table, stats in load_stats.items():
+        stats['rows_per_sec'] = stats['rows'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+        logger.info(f"Loaded {stats['rows']} rows into {table} in {stats['seconds']:.2f}s "
+                    f"({stats['rows_per_sec']:,.0f} rows/sec).")
+
+    return load_stats
+
+
+# Function to parse command line options
+def parse_args(argv=None):
+    """
+    Parse the command line options of the loader.
+
+    Args:
+        argv: Argument list (defaults to sys.argv)
+
+    Returns:
+        argparse.Namespace: Parsed options
+    """
+    parser = argparse.ArgumentParser(description="Generate synthetic LA County health data and load it into the database")
+    parser.add_argument('--clear-existing', action='store_true',
+                        help="Delete every row of the five tables first, including curated rows from Populating Data.sql")
+    return parser.parse_args(argv)
+
+
+# Main function to generate and load the data
+def main(argv=None):
+    """
+    Main function to generate synthetic data and load it into the database.
+
+    Rows are appended to the existing tables unless --clear-existing is given.
+    """
+    args = parse_args(argv)
+
+    connection = connect_to_database()
+    if not connection:
+        logger.error("Failed to connect to the database. Exiting...")
+        return
+
+    try:
+        if args.clear_existing:
+            logger.warning("Clearing every table before loading (--clear-existing)")
+        load_synthetic_data(connection, clear_existing=args.clear_existing)
+        generate_zip_centroids().to_csv(ZIP_CENTROIDS_FILE, index=False)
+        logger.info(f"ZIP code centroids saved to {ZIP_CENTROIDS_FILE}.")
+        logger.info("Data load complete. Data is ready for analysis.")
+    except Exception as e:
+        logger.error(f"Error loading data: {e}")
+        logger.error(traceback.format_exc())
+    finally:
+        connection.close()
+        logger.info("Database connection closed.")
+
 
-    # Use a subset of ZIP codes to distribute facilities
-    zip_codes = ['90001', '90002', '90003', '90004', '90005', '90006', '90007', '90008', '90010',
-                 '90011', '90012', '90013', '90014', '90015', '90016', '90017', '90018', '90019',
-                 '90020', '90021', '90022', '90023', '90024', '90025', '90026', '90027', '90028',
-                 '90029', '90031', '90032', '90033', '90034', '90035', '90036', '90037', '90038',
-                 '90039', '90040', '90041', '90042', '90043', '90044', '90045', '90046', '90047',
-                 '90048', '90049', '90056', '90057', '90058', '90059', '90061', '90062', '90063',
-                 '90064', '90065', '90066', '90067', '90068', '90069', '90071', '90077', '90089',
-                 '90090', '90094', '90210', '90211', '90212', '90230', '90232', '90245', '90247',
-                 '90248', '90272', '90290', '90291', '90292', '90293', '90301', '90302', '90303',
-                 '90304', '90305', '90401', '90402', '90403', '90404', '90405', '90501', '90502',
-                 '90710', '90717', '90731', '90732', '90744', '90745', '90810', '90813', '91001',
-                 '91006', '91007', '91010', '91011', '91016', '91020', '91024', '91030', '91040',
-                 '91042', '91105', '91106', '91108', '91201', '91202', '91203', '91204', '91205',
-                 '91206', '91207', '91208', '91210', '91214', '91303', '91304', '91306', '91307',
-                 '91311', '91316', '91324', '91325', '91331', '91335', '91340', '91342']
\ No newline at end of file
+if __name__ == "__main__":
+    main()
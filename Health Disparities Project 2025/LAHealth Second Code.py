@@ -2,14 +2,30 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import seaborn as sns
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.preprocessing import StandardScaler
 from sklearn.decomposition import PCA
-import pyodbc
+from sklearn.metrics import silhouette_score
+from sklearn.neighbors import KDTree
+from scipy import sparse
 import os
 from pathlib import Path
 import logging
+import argparse
+import json
+import hashlib
+import sqlite3
+import pickle
+import time
+import shutil
+import uuid
+import cProfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from lahealth_db import connect_to_database, get_pool, raw_connection
 
 # Plot style
 plt.style.use('seaborn-v0_8-whitegrid')
@@ -30,60 +46,802 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-# Database connection
-def connect_to_database():
+# Columns of CommunityHealthView and the dtypes they are coerced to at read time
+COMMUNITY_HEALTH_DTYPES = {
+    'ZIPCode': 'category',
+    'Year': 'int16',  # Only in CommunityHealthYearView
+    'CommunityName': 'category',
+    'TotalPopulation': 'int32',
+    'MedianIncome': 'float32',
+    'PercentMinority': 'float32',
+    'PercentPoverty': 'float32',
+    'PercentUninsured': 'float32',
+    'SocialVulnerabilityIndex': 'float32',
+    'DiabetesPrevalence': 'float32',
+    'HeartDiseasePrevalence': 'float32',
+    'AsthmaPrevalence': 'float32',
+    'HypertensionPrevalence': 'float32',
+    'ObesityPrevalence': 'float32',
+    'MentalHealthDisordersPrevalence': 'float32',
+    'PreventableHospitalizations': 'float32',
+    'LifeExpectancy': 'float32',
+    'PercentNoRegularCheckup': 'float32',
+    'PercentDelayedCare': 'float32',
+    'PercentNoTransportation': 'float32',
+    'AvgDistanceToHospital': 'float32',
+    'AvgDistanceToClinic': 'float32',
+    'PublicTransitAccessScore': 'float32',
+    'DigitalDivideIndex': 'float32',
+    'AirPollutionIndex': 'float32',
+    'WaterQualityIndex': 'float32',
+    'FoodDesertScore': 'float32',
+    'GreenSpaceAccess': 'float32',
+    'CalEnviroScreenScore': 'float32',
+    'FacilityCount': 'int32',
+}
+
+# Columns of HealthcareFacilities and their read-time dtypes
+FACILITY_DTYPES = {
+    'FacilityID': 'int32',
+    'FacilityName': 'category',
+    'FacilityType': 'category',
+    'ZIPCode': 'category',
+    'Address': 'category',
+    'HasEmergencyServices': 'bool',
+    'AcceptsMediCal': 'bool',
+    'AcceptsMedicare': 'bool',
+}
+
+# Columns of FacilitySummaryView and their read-time dtypes
+FACILITY_SUMMARY_DTYPES = {
+    'ZIPCode': 'category',
+    'FacilityType': 'category',
+    'FacilityCount': 'int32',
+}
+
+# Facility types that always get a count column, even when a ZIP code has none
+FACILITY_TYPE_COLUMNS = ['Hospital', 'Clinic', 'Community Health Center']
+
+# Columns added to community health data by the analysis stages and their dtypes
+DERIVED_DTYPES = {
+    **{facility_type: 'int32' for facility_type in FACILITY_TYPE_COLUMNS},
+    'TotalFacilities': 'int32',
+    'FacilitiesPer10k': 'float32',
+    'HealthDisparityIndex': 'float32',
+    'DisparityLevel': 'category',
+    'Cluster': 'int16',
+    'CommunityProfile': 'category',
+    'IncomeGroup': 'category',
+    'FacilityAccessScore': 'float32',
+    'NearestHospitalMiles': 'float32',
+    'NearestERMiles': 'float32',
+    'NearestMediCalClinicMiles': 'float32',
+    'CatchmentAccessPer10k': 'float32',
+    'HealthDisparityIndexLower': 'float32',
+    'HealthDisparityIndexUpper': 'float32',
+    'ProbVeryLow': 'float32',
+    'ProbLow': 'float32',
+    'ProbModerate': 'float32',
+    'ProbHigh': 'float32',
+    'ProbVeryHigh': 'float32',
+    'RankMean': 'float32',
+    'RankStd': 'float32',
+    'RankBest': 'float32',
+    'RankWorst': 'float32',
+    'TopNShare': 'float32',
+    'LevelChangeShare': 'float32',
+}
+
+# Dtypes of derived columns matched by name suffix
+DERIVED_SUFFIX_DTYPES = {
+    '_normalized': 'float32',
+}
+
+# Declared schema of the analysis frame: view columns plus derived columns
+ANALYSIS_DTYPES = {**COMMUNITY_HEALTH_DTYPES, **DERIVED_DTYPES}
+
+
+# Function to coerce a fetched frame to compact dtypes
+def coerce_dtypes(df, dtypes):
     """
-    Connect to our SQL Server database.
+    Coerce the columns of a fetched DataFrame to the given dtypes.
+
+    DECIMAL columns arrive from pyodbc as Python Decimal objects; casting them
+    to float32/int32 right after the read keeps them from lingering as object columns.
+
+    Args:
+        df: DataFrame as returned by pd.read_sql
+        dtypes: Dictionary mapping column names to target dtypes
+
+    Returns:
+        DataFrame: The same DataFrame with its known columns coerced
+    """
+    for col, dtype in dtypes.items():
+        if col in df.columns:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+# Function to enforce the declared schema of the analysis frame
+def enforce_schema(df):
+    """
+    Cast every column of an analysis frame to its declared dtype.
+
+    Names and labels become categoricals, counts int32 and metrics float32.
+    Columns that already have their declared dtype are left untouched (so
+    ordered categoricals keep their order), and columns missing from the
+    schema are logged.
+
+    Args:
+        df: DataFrame with community health data and derived columns
 
     Returns:
-        connection: A connection to the SQL Server database or None if connection fails
+        DataFrame: The frame with declared dtypes
+    """
+    dtypes = {}
+    undeclared = []
+    for col in df.columns:
+        dtype = ANALYSIS_DTYPES.get(col) or next(
+            (dtype for suffix, dtype in DERIVED_SUFFIX_DTYPES.items() if col.endswith(suffix)), None
+        )
+        if dtype is None:
+            undeclared.append(col)
+        elif str(df[col].dtype) != dtype:
+            dtypes[col] = dtype
+
+    if undeclared:
+        logger.warning(f"Columns without a declared dtype: {undeclared}")
+    return df.astype(dtypes) if dtypes else df
+
+
+# Function to read the resident set size of this process
+def current_rss():
     """
-    logger.info("Connecting to the database...")
+    Read the current resident set size of this process.
 
-    # Database connection details
-    server = 'DESKTOP-7A92MUU'
-    database = 'LAHealthDisparities'
+    Uses psutil when it is installed and /proc on Linux otherwise.
 
-    # Windows Authentication first (more secure)
+    Returns:
+        int: RSS in bytes, or None if it can't be read on this platform
+    """
     try:
-        # Windows Authentication connection string
-        connection_string = f'DRIVER={{SQL Server}};SERVER={server};DATABASE={database};Trusted_Connection=yes;TrustServerCertificate=yes'
-        connection = pyodbc.connect(connection_string)
-        logger.info("Successfully connected to the database using Windows Authentication!")
-        return connection
-    except Exception as e:
-        logger.warning(f"Windows Authentication failed: {e}")
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
 
-        # If Windows Authentication fails, check available drivers
-        try:
-            logger.info(f"Available ODBC drivers: {pyodbc.drivers()}")
-
-            # Use a different driver if "SQL Server" is not available
-            if "ODBC Driver 17 for SQL Server" in pyodbc.drivers():
-                driver = "ODBC Driver 17 for SQL Server"
-            elif "ODBC Driver 18 for SQL Server" in pyodbc.drivers():
-                driver = "ODBC Driver 18 for SQL Server"
-            elif "SQL Server" in pyodbc.drivers():
-                driver = "SQL Server"
-            else:
-                driver = pyodbc.drivers()[0]  # Use first available driver
-
-            connection_string = f'DRIVER={{{driver}}};SERVER={server};DATABASE={database};Trusted_Connection=yes;TrustServerCertificate=yes'
-            connection = pyodbc.connect(connection_string)
-            logger.info(f"Successfully connected to the database using {driver}!")
-            return connection
-        except Exception as e:
-            logger.error(f"All connection attempts failed: {e}")
-            return None
+
+# Function to report the memory held by a stage's output
+def memory_report(stage, df):
+    """
+    Log the memory used by a frame, by dtype, and the process RSS.
+
+    Args:
+        stage: Name of the pipeline stage
+        df: The stage's output frame
+
+    Returns:
+        dict: 'stage', 'rows', 'frame_bytes', 'bytes_by_dtype' and 'rss_bytes'
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    bytes_by_dtype = usage.groupby(df.dtypes.astype(str)).sum().sort_values(ascending=False)
+    rss = current_rss()
+
+    report = {
+        'stage': stage,
+        'rows': len(df),
+        'frame_bytes': int(usage.sum()),
+        'bytes_by_dtype': {dtype: int(size) for dtype, size in bytes_by_dtype.items()},
+        'rss_bytes': rss,
+    }
+
+    breakdown = ', '.join(f"{dtype} {size / 1024 ** 2:.1f}" for dtype, size in report['bytes_by_dtype'].items())
+    rss_text = f"{rss / 1024 ** 2:.1f} MB" if rss is not None else "n/a"
+    logger.info(f"Memory after {stage}: {len(df)} rows, frame {report['frame_bytes'] / 1024 ** 2:.1f} MB "
+                f"({breakdown} MB by dtype), RSS {rss_text}")
+    return report
+
+
+# Function to stream a query in typed chunks
+def fetch_typed_chunks(connection, table, columns, dtypes, chunksize=50000, where=None, params=None):
+    """
+    Stream a table or view in chunks with an explicit column projection.
+
+    Args:
+        connection: Database connection
+        table: Table or view to select from
+        columns: Columns to select
+        dtypes: Dictionary mapping column names to target dtypes
+        chunksize: Number of rows per chunk
+        where: Optional WHERE clause with '?' placeholders
+        params: Parameters for the placeholders in where
+
+    Yields:
+        DataFrame: Chunk of at most chunksize rows with coerced dtypes
+    """
+    query = f"SELECT {', '.join(columns)} FROM {table}"
+    if where:
+        query += f" WHERE {where}"
+    for chunk in pd.read_sql(query, raw_connection(connection), params=params, chunksize=chunksize):
+        yield coerce_dtypes(chunk, dtypes)
+
+
+# Function to concatenate typed chunks
+def concat_typed_chunks(chunks):
+    """
+    Concatenate typed chunks, merging the categories of categorical columns.
+
+    A plain pd.concat falls back to object dtype when chunks carry different
+    categories, so categorical columns are unioned separately.
+
+    Args:
+        chunks: List of DataFrames with matching columns
+
+    Returns:
+        DataFrame: The concatenated DataFrame
+    """
+    if not chunks:
+        return pd.DataFrame()
+
+    category_cols = [col for col in chunks[0].columns if isinstance(chunks[0][col].dtype, pd.CategoricalDtype)]
+    combined = pd.concat([chunk.drop(columns=category_cols) for chunk in chunks], ignore_index=True)
+    for col in category_cols:
+        combined[col] = pd.api.types.union_categoricals([chunk[col] for chunk in chunks])
+
+    return combined[chunks[0].columns]
+
+
+# Function to pivot per-ZIP, per-type facility counts
+def pivot_facility_summary(facility_summary_df):
+    """
+    Pivot a per-ZIP, per-type facility summary into one row per ZIP code.
+
+    Args:
+        facility_summary_df: DataFrame with ZIPCode, FacilityType and FacilityCount columns
+
+    Returns:
+        DataFrame: Facility counts indexed by ZIPCode with one column per type and TotalFacilities
+    """
+    facility_counts = facility_summary_df.pivot_table(
+        index='ZIPCode', columns='FacilityType', values='FacilityCount',
+        aggfunc='sum', fill_value=0, observed=True
+    )
+    facility_counts.columns = facility_counts.columns.astype(str)
+    facility_counts.columns.name = None
+    facility_counts.index = facility_counts.index.astype(str)
+    for facility_type in FACILITY_TYPE_COLUMNS:
+        if facility_type not in facility_counts.columns:
+            facility_counts[facility_type] = 0
+
+    facility_counts['TotalFacilities'] = facility_counts.sum(axis=1)
+    return facility_counts.astype('int32')
+
+
+# Function to count facilities by ZIP code and type
+def count_facilities(facilities_df):
+    """
+    Count healthcare facilities by ZIP code and facility type.
+
+    Args:
+        facilities_df: DataFrame with ZIPCode and FacilityType columns
+
+    Returns:
+        DataFrame: Facility counts indexed by ZIPCode with one column per type and TotalFacilities
+    """
+    facility_summary = (
+        facilities_df.groupby(['ZIPCode', 'FacilityType'], observed=True).size()
+        .rename('FacilityCount').reset_index()
+    )
+    return pivot_facility_summary(facility_summary)
+
+
+# Function to fetch the pre-aggregated facility summary
+def fetch_facility_counts(connection):
+    """
+    Fetch facility counts per ZIP code and type from FacilitySummaryView.
+
+    The indexed view is maintained by SQL Server, so this reads one small
+    aggregate instead of transferring all of HealthcareFacilities.
+
+    Args:
+        connection: Database connection
+
+    Returns:
+        DataFrame: Output of pivot_facility_summary for the summary rows
+    """
+    query = f"SELECT {', '.join(FACILITY_SUMMARY_DTYPES)} FROM FacilitySummaryView"
+    facility_summary = coerce_dtypes(pd.read_sql(query, raw_connection(connection)), FACILITY_SUMMARY_DTYPES)
+    return pivot_facility_summary(facility_summary)
+
+
+# Function to add facility counts to community health data
+def add_facility_counts(community_health_df, facility_counts):
+    """
+    Merge facility counts into community health data and compute per capita rates.
+
+    Args:
+        community_health_df: DataFrame with ZIPCode and TotalPopulation columns
+        facility_counts: Output of pivot_facility_summary
+
+    Returns:
+        DataFrame: Community health data with facility counts and FacilitiesPer10k
+    """
+    # Align the counts to the rows of the main dataset (ZIP codes without facilities get 0)
+    zip_facility_counts = facility_counts.reindex(community_health_df['ZIPCode'].astype(str), fill_value=0)
+    zip_facility_counts.index = community_health_df.index
+
+    # Add facility counts to the main dataset
+    community_health_with_facilities = pd.concat([community_health_df, zip_facility_counts], axis=1)
+
+    # Calculate per capita facility rates (per 10,000 residents)
+    community_health_with_facilities['FacilitiesPer10k'] = (
+            community_health_with_facilities['TotalFacilities'] /
+            community_health_with_facilities['TotalPopulation'] * 10000
+    ).astype('float32')
+
+    return community_health_with_facilities
+
+
+# Function to stream community health data in typed chunks
+def community_health_chunks(connection, columns=None, chunksize=50000, years=None):
+    """
+    Stream CommunityHealthView (or CommunityHealthYearView) in typed chunks.
+
+    Args:
+        connection: Database connection
+        columns: Columns of CommunityHealthView to select (defaults to all of them)
+        chunksize: Number of rows per chunk
+        years: Optional (start_year, end_year) range; reads the long-format CommunityHealthYearView
+
+    Returns:
+        iterator: Typed DataFrame chunks
+    """
+    if columns is None:
+        columns = [col for col in COMMUNITY_HEALTH_DTYPES if col != 'Year']
+    # ZIPCode (and Year) and TotalPopulation are needed to attach the facility counts
+    key_columns = ['ZIPCode', 'Year', 'TotalPopulation'] if years else ['ZIPCode', 'TotalPopulation']
+    columns = key_columns + [col for col in columns if col not in key_columns]
+
+    if years:
+        return fetch_typed_chunks(connection, 'CommunityHealthYearView', columns, COMMUNITY_HEALTH_DTYPES,
+                                  chunksize, where="Year BETWEEN ? AND ?", params=list(years))
+    return fetch_typed_chunks(connection, 'CommunityHealthView', columns, COMMUNITY_HEALTH_DTYPES, chunksize)
+
+
+# Function to stream community health data in chunks
+def iter_community_health_chunks(connection, columns=None, chunksize=50000, facility_counts=None, years=None):
+    """
+    Stream CommunityHealthView in typed chunks with facility counts attached.
+
+    Peak memory scales with chunksize rather than the size of the view, so
+    downstream stages can consume the chunks incrementally.
+
+    Args:
+        connection: Database connection
+        columns: Columns of CommunityHealthView to select (defaults to all of them)
+        chunksize: Number of rows per chunk
+        facility_counts: Precomputed facility counts (read from FacilitySummaryView if not given)
+        years: Optional (start_year, end_year) range; reads the long-format CommunityHealthYearView
+
+    Yields:
+        DataFrame: Chunk of community health data with facility counts and FacilitiesPer10k
+    """
+    if facility_counts is None:
+        facility_counts = fetch_facility_counts(connection)
+
+    for chunk in community_health_chunks(connection, columns, chunksize, years):
+        yield add_facility_counts(chunk, facility_counts)
+
+
+# Function to read community health data without facility counts
+def read_community_health(connection, chunksize=None, columns=None, years=None):
+    """
+    Read community health data for one year or a range of years.
+
+    Args:
+        connection: Database connection
+        chunksize: If given, read typed chunks of this many rows with an explicit projection
+        columns: Columns of CommunityHealthView to select when chunked (defaults to all of them)
+        years: Optional (start_year, end_year) range; reads the long-format CommunityHealthYearView
+
+    Returns:
+        DataFrame: Community health data
+    """
+    if chunksize:
+        # Stream with an explicit projection and compact dtypes
+        return concat_typed_chunks(list(community_health_chunks(connection, columns, chunksize, years)))
+    if years:
+        # Use the long-format view for a range of years
+        query = "SELECT * FROM CommunityHealthYearView WHERE Year BETWEEN ? AND ?"
+        community_health = pd.read_sql(query, raw_connection(connection), params=list(years))
+        return coerce_dtypes(community_health, COMMUNITY_HEALTH_DTYPES)
+    # Use the CommunityHealthView view to get the combined data
+    community_health = pd.read_sql("SELECT * FROM CommunityHealthView", raw_connection(connection))
+    return coerce_dtypes(community_health, COMMUNITY_HEALTH_DTYPES)
+
+
+# Function to read the healthcare facilities table
+def read_facilities(connection, chunksize=None):
+    """
+    Read the full HealthcareFacilities table (needed for the PowerBI export).
+
+    Args:
+        connection: Database connection
+        chunksize: If given, read typed chunks of this many rows
+
+    Returns:
+        DataFrame: Healthcare facilities
+    """
+    if chunksize:
+        return concat_typed_chunks(list(fetch_typed_chunks(
+            connection, 'HealthcareFacilities', list(FACILITY_DTYPES), FACILITY_DTYPES, chunksize
+        )))
+    # Project the declared columns so the RowVer change marker stays out of the export
+    query = f"SELECT {', '.join(FACILITY_DTYPES)} FROM HealthcareFacilities"
+    return coerce_dtypes(pd.read_sql(query, raw_connection(connection)), FACILITY_DTYPES)
+
+
+# Function to run independent fetch queries, concurrently when a pool is given
+def run_fetch_queries(queries, connection=None, pool=None, max_workers=None):
+    """
+    Run independent queries and time each one.
+
+    With a connection pool every query runs in its own thread on its own
+    pooled connection, so the wall-clock time is bounded by the slowest
+    query. Without one they run one after another on the given connection.
+
+    Args:
+        queries: Dict of name -> function taking a connection and returning a result
+        connection: Connection for running the queries serially
+        pool: lahealth_db.ConnectionPool for running them concurrently
+        max_workers: Number of threads (defaults to one per query)
+
+    Returns:
+        tuple: (results by name, seconds by name)
+    """
+    def timed(query):
+        start = time.perf_counter()
+        if pool is None:
+            return query(connection), time.perf_counter() - start
+        with pool.connection() as pooled_connection:
+            return query(pooled_connection), time.perf_counter() - start
+
+    if pool is None:
+        outcomes = {name: timed(query) for name, query in queries.items()}
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers or len(queries)) as executor:
+            futures = {name: executor.submit(timed, query) for name, query in queries.items()}
+            outcomes = {name: future.result() for name, future in futures.items()}
+
+    results = {name: result for name, (result, _) in outcomes.items()}
+    timings = {name: seconds for name, (_, seconds) in outcomes.items()}
+    return results, timings
+
+
+# Base tables behind the analysis views and their primary keys (which order the rows when they are hashed)
+BASE_TABLE_KEYS = {
+    'ZIPCodes': 'ZIPCode',
+    'HealthcareFacilities': 'FacilityID',
+    'HealthIndicators': 'IndicatorID',
+    'HealthcareAccessBarriers': 'BarrierID',
+    'EnvironmentalFactors': 'EnvironmentalID',
+}
+
+# SQLite table of per-table change counters, kept up to date by triggers on the base tables
+CHANGE_COUNTS_TABLE = 'TableChangeCounts'
+
+# Directory and size cap of the on-disk fetch cache
+FETCH_CACHE_DIR = '.fetch_cache'
+FETCH_CACHE_MAX_BYTES = 512 * 1024 ** 2
+
+
+# Function to read the change stamps of the base tables
+def table_change_stamps(connection):
+    """
+    Read cheap change markers of the base tables.
+
+    Neither path reads the tables themselves: SQL Server stamps come from
+    metadata (see sql_server_change_stamps) and SQLite stamps from the
+    trigger-maintained counters of install_change_counters. Only when no
+    marker is available are the base tables checksummed instead.
+
+    Args:
+        connection: Database connection
+
+    Returns:
+        list: An identity of the database followed by one stamp per base table
+    """
+    raw = raw_connection(connection)
+    if isinstance(raw, sqlite3.Connection):
+        return sqlite_change_stamps(raw)
+    return sql_server_change_stamps(connection)
+
+
+# Function to read the change stamps of the base tables on SQL Server
+def sql_server_change_stamps(connection):
+    """
+    Read the change stamps of the SQL Server base tables from metadata.
+
+    Every base table has a ROWVERSION column (RowVer), so @@DBTS advances on
+    each insert or update, and the row counts in sys.partitions change on
+    deletes. Databases created before RowVer was added fall back to
+    CHECKSUM_AGG(BINARY_CHECKSUM(*)), which scans every table; run
+    Populating Data.sql to add the column.
+
+    Args:
+        connection: pyodbc connection
+
+    Returns:
+        list: [server, database, @@DBTS] followed by [table, row count] per base table
+    """
+    table_names = ", ".join(f"'{table}'" for table in BASE_TABLE_KEYS)
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT t.name, SUM(p.rows), MAX(COL_LENGTH(t.name, 'RowVer')) "
+        "FROM sys.tables t JOIN sys.partitions p ON p.object_id = t.object_id AND p.index_id IN (0, 1) "
+        f"WHERE t.name IN ({table_names}) GROUP BY t.name"
+    )
+    tables = cursor.fetchall()
+    if len(tables) == len(BASE_TABLE_KEYS) and all(row_version is not None for _, _, row_version in tables):
+        cursor.execute("SELECT @@SERVERNAME, DB_NAME(), CAST(@@DBTS AS BIGINT)")
+        server, database, dbts = cursor.fetchone()
+        stamps = [[str(server), str(database), int(dbts)]]
+        stamps += sorted([str(table), int(count)] for table, count, _ in tables)
+    else:
+        logger.warning("The base tables have no RowVer column; checksumming them to validate the fetch cache")
+        cursor.execute(" UNION ALL ".join(
+            f"SELECT '{table}' AS TableName, COUNT(*) AS NumRows, "
+            f"CHECKSUM_AGG(BINARY_CHECKSUM(*)) AS Checksum FROM {table}"
+            for table in BASE_TABLE_KEYS
+        ))
+        stamps = sorted([str(table), int(count), None if checksum is None else int(checksum)]
+                        for table, count, checksum in cursor.fetchall())
+    cursor.close()
+    return stamps
+
+
+# Function to name the triggers that maintain the SQLite change counters
+def change_counter_triggers():
+    """
+    Name the change counter triggers.
+
+    Returns:
+        dict: Trigger name -> (base table, event)
+    """
+    return {f"{table}_{event.lower()}_count": (table, event)
+            for table in BASE_TABLE_KEYS for event in ['INSERT', 'UPDATE', 'DELETE']}
+
+
+# Function to install the change counters of the SQLite base tables
+def install_change_counters(connection):
+    """
+    Create the change counter table and the triggers that maintain it.
+
+    Each counter starts at a random value, so a database whose counters are
+    dropped and recreated never repeats the stamps of its earlier contents.
+
+    Args:
+        connection: sqlite3 connection
+
+    Returns:
+        bool: Whether the counters are installed (False for read-only databases)
+    """
+    try:
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {CHANGE_COUNTS_TABLE} "
+                           f"(TableName TEXT PRIMARY KEY, ChangeCount INTEGER NOT NULL)")
+        for table in BASE_TABLE_KEYS:
+            connection.execute(f"INSERT OR IGNORE INTO {CHANGE_COUNTS_TABLE} VALUES (?, abs(random()))", (table,))
+        for trigger, (table, event) in change_counter_triggers().items():
+            connection.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {trigger} AFTER {event} ON {table} "
+                f"BEGIN UPDATE {CHANGE_COUNTS_TABLE} SET ChangeCount = ChangeCount + 1 "
+                f"WHERE TableName = '{table}'; END"
+            )
+        connection.commit()
+    except sqlite3.OperationalError as e:
+        connection.rollback()
+        logger.warning(f"Could not install the SQLite change counters: {e}")
+        return False
+    return True
+
+
+# Function to read the change stamps of the base tables on SQLite
+def sqlite_change_stamps(connection):
+    """
+    Read the change stamps of the SQLite base tables from their change counters.
+
+    The counters are installed on first use; if that fails (for example on a
+    read-only file) the rows of every table are hashed instead.
+
+    Args:
+        connection: sqlite3 connection
+
+    Returns:
+        list: [database file] followed by [table, change count] per base table
+    """
+    triggers = change_counter_triggers()
+    n_installed = connection.execute(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN ({', '.join('?' * len(triggers))})",
+        list(triggers)
+    ).fetchone()[0]
+    installed = n_installed == len(triggers) or install_change_counters(connection)
+
+    stamps = [[connection.execute("PRAGMA database_list").fetchone()[2]]]
+    if installed:
+        stamps += sorted(list(row) for row in connection.execute(
+            f"SELECT TableName, ChangeCount FROM {CHANGE_COUNTS_TABLE}"
+        ))
+    else:
+        stamps += sorted([table, *sqlite_table_stamp(connection, table, key_col)]
+                         for table, key_col in BASE_TABLE_KEYS.items())
+    return stamps
+
+
+# Function to stamp a SQLite table by hashing its rows
+def sqlite_table_stamp(connection, table, key_col, batch_size=50000):
+    """
+    Compute the change stamp of a SQLite table from its contents.
+
+    Args:
+        connection: sqlite3 connection
+        table: Base table name
+        key_col: Primary key that orders the rows
+        batch_size: Rows hashed per fetch
+
+    Returns:
+        list: [row count, hex digest of the rows in key order]
+    """
+    digest = hashlib.sha256()
+    count = 0
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT * FROM {table} ORDER BY {key_col}")
+    while rows := cursor.fetchmany(batch_size):
+        digest.update(repr(rows).encode())
+        count += len(rows)
+    cursor.close()
+    return [count, digest.hexdigest()]
+
+
+# Function to key a fetch by its options and the state of the base tables
+def fetch_cache_key(connection, **options):
+    """
+    Build the cache key of a fetch.
+
+    Args:
+        connection: Database connection
+        **options: Fetch options that change the result
+
+    Returns:
+        str: Hex digest of the options and the base tables' change stamps
+    """
+    stamps = table_change_stamps(connection)
+    return hashlib.sha256(repr((sorted(options.items()), stamps)).encode()).hexdigest()
+
+
+# Function to read a cached fetch
+def read_fetch_cache(cache_dir, cache_key):
+    """
+    Load a cached fetch, memory-mapping its Arrow files.
+
+    Args:
+        cache_dir: Cache directory
+        cache_key: Key from fetch_cache_key()
+
+    Returns:
+        dict: The cached data_dict, or None on a miss
+    """
+    entry_dir = os.path.join(cache_dir, cache_key)
+    meta_path = os.path.join(entry_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+
+    from pyarrow import feather
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+
+    data_dict = {}
+    for name, index_cols in meta['frames'].items():
+        df = feather.read_table(os.path.join(entry_dir, f"{name}.arrow"), memory_map=True).to_pandas()
+        data_dict[name] = df.set_index(index_cols) if index_cols else df
+
+    # The meta file's mtime records the last use for LRU eviction
+    os.utime(meta_path)
+    return data_dict
+
+
+# Function to write a fetch to the cache
+def write_fetch_cache(cache_dir, cache_key, data_dict, max_bytes=FETCH_CACHE_MAX_BYTES):
+    """
+    Store a fetch as uncompressed Arrow files, then evict old entries.
+
+    The entry is written to a temporary directory and renamed into place,
+    so readers never see a partial entry.
+
+    Args:
+        cache_dir: Cache directory
+        cache_key: Key from fetch_cache_key()
+        data_dict: Fetched DataFrames by name
+        max_bytes: Size cap of the whole cache
+    """
+    entry_dir = os.path.join(cache_dir, cache_key)
+    if os.path.exists(entry_dir):
+        return
+
+    tmp_dir = f"{entry_dir}.{uuid.uuid4().hex[:8]}.tmp"
+    os.makedirs(tmp_dir)
+    try:
+        frames = {}
+        for name, df in data_dict.items():
+            # Arrow files need a default index, so other indexes are stored as columns
+            index_cols = [] if isinstance(df.index, pd.RangeIndex) else list(df.index.names)
+            out = df.reset_index() if index_cols else df
+            out.to_feather(os.path.join(tmp_dir, f"{name}.arrow"), compression='uncompressed')
+            frames[name] = index_cols
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump({'frames': frames}, f)
+        os.rename(tmp_dir, entry_dir)
+    except FileExistsError:
+        # Another run stored the same entry first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    evict_fetch_cache(cache_dir, max_bytes)
+
+
+# Function to evict least recently used cache entries
+def evict_fetch_cache(cache_dir, max_bytes=FETCH_CACHE_MAX_BYTES):
+    """
+    Delete the least recently used entries until the cache fits its size cap.
+
+    Args:
+        cache_dir: Cache directory
+        max_bytes: Size cap of the whole cache
+
+    Returns:
+        int: Number of entries deleted
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        meta_path = os.path.join(cache_dir, name, 'meta.json')
+        if os.path.exists(meta_path):
+            entry_dir = os.path.join(cache_dir, name)
+            size = sum(os.path.getsize(os.path.join(entry_dir, f)) for f in os.listdir(entry_dir))
+            entries.append((os.path.getmtime(meta_path), size, entry_dir))
+
+    total = sum(size for _, size, _ in entries)
+    deleted = 0
+    for _, size, entry_dir in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total -= size
+        deleted += 1
+    return deleted
 
 
 # Function to fetch data for analysis
-def fetch_data_for_analysis(connection):
+def fetch_data_for_analysis(connection, chunksize=None, columns=None, include_facilities=False, years=None,
+                            cache_dir=None, cache_max_bytes=FETCH_CACHE_MAX_BYTES, pool=None):
     """
     Fetch data from our SQL Server database for analysis.
 
     Args:
         connection: Database connection
+        chunksize: If given, stream the data in typed chunks of this many rows
+        columns: Columns of CommunityHealthView to select when streaming (defaults to all of them)
+        include_facilities: Also fetch the full HealthcareFacilities table (needed for the PowerBI export)
+        years: Optional (start_year, end_year) range; returns one row per ZIP code and year with a Year column
+        cache_dir: Directory of the on-disk fetch cache (None disables it; needs pyarrow)
+        cache_max_bytes: Size cap of the fetch cache
+        pool: lahealth_db.ConnectionPool to run the independent queries concurrently (serial on connection if None)
 
     Returns:
         dict: Dictionary containing different DataFrames for analysis
@@ -91,274 +849,2047 @@ def fetch_data_for_analysis(connection):
     print("Fetching data for analysis...")
 
     try:
-        # Use the CommunityHealthView view to get the combined data
-        query = "SELECT * FROM CommunityHealthView"
-        community_health_df = pd.read_sql(query, connection)
-
-        # Fetch healthcare facilities data
-        facilities_query = "SELECT * FROM HealthcareFacilities"
-        facilities_df = pd.read_sql(facilities_query, connection)
-
-        # Count facilities by ZIP code
-        facility_counts = facilities_df.groupby(['ZIPCode', 'FacilityType']).size().unstack(fill_value=0)
-        if 'Hospital' not in facility_counts.columns:
-            facility_counts['Hospital'] = 0
-        if 'Clinic' not in facility_counts.columns:
-            facility_counts['Clinic'] = 0
-        if 'Community Health Center' not in facility_counts.columns:
-            facility_counts['Community Health Center'] = 0
-
-        facility_counts['TotalFacilities'] = facility_counts.sum(axis=1)
-
-        # Add facility counts to the main dataset
-        community_health_with_facilities = community_health_df.merge(
-            facility_counts, on='ZIPCode', how='left'
-        )
+        # Reuse the last fetch with these options while the base tables are unchanged
+        if cache_dir:
+            cache_key = fetch_cache_key(
+                connection, chunked=bool(chunksize), columns=list(columns) if chunksize and columns else None,
+                schema=sorted(ANALYSIS_DTYPES.items()),
+                include_facilities=include_facilities, years=list(years) if years else None
+            )
+            data_dict = read_fetch_cache(cache_dir, cache_key)
+            if data_dict is not None:
+                print(f"Using cached data for {len(data_dict['community_health'])} ZIP codes ({cache_key[:12]}).")
+                return data_dict
+
+        # The queries are independent, so they can run side by side on pooled connections
+        queries = {
+            # Facility counts come from the pre-aggregated summary view
+            'facility_counts': fetch_facility_counts,
+            'community_health': lambda conn: read_community_health(conn, chunksize, columns, years),
+        }
+        if include_facilities:
+            queries['facilities'] = lambda conn: read_facilities(conn, chunksize)
 
-        # Handle missing values
-        community_health_with_facilities = community_health_with_facilities.fillna({
-            'Hospital': 0,
-            'Clinic': 0,
-            'Community Health Center': 0,
-            'TotalFacilities': 0
-        })
-
-        # Calculate per capita facility rates (per 10,000 residents)
-        community_health_with_facilities['FacilitiesPer10k'] = (
-                community_health_with_facilities['TotalFacilities'] /
-                community_health_with_facilities['TotalPopulation'] * 10000
-        )
+        results, timings = run_fetch_queries(queries, connection, pool)
+        for name, seconds in timings.items():
+            logger.info(f"Fetched {name} in {seconds:.3f}s")
+
+        facility_counts = results['facility_counts']
+        community_health_with_facilities = add_facility_counts(results['community_health'], facility_counts)
+
+        # Return all the data
+        data_dict = {
+            'community_health': community_health_with_facilities,
+            'facility_counts': facility_counts
+        }
+        if include_facilities:
+            data_dict['facilities'] = results['facilities']
+
+        if cache_dir:
+            write_fetch_cache(cache_dir, cache_key, data_dict, cache_max_bytes)
+
+        print(f"Successfully fetched data for {len(community_health_with_facilities)} ZIP codes.")
+        return data_dict
+
+    except Exception as e:
+        print(f"Error fetching data: {e}")
+        return None
+
+
+
+# Local ZIP centroid table written by LAHealth First Code.py
+ZIP_CENTROIDS_FILE = 'zip_centroids.csv'
+
+# Mean radius of the Earth, to turn great-circle distances in radians into miles
+EARTH_RADIUS_MILES = 3958.8
+
+# Nearest-facility columns and the facilities each one measures to, as (column, {facility column: accepted values})
+PROXIMITY_TARGETS = [
+    ('NearestHospitalMiles', {'FacilityType': ['Hospital']}),
+    ('NearestERMiles', {'HasEmergencyServices': [True]}),
+    ('NearestMediCalClinicMiles', {'FacilityType': ['Clinic', 'Community Health Center'], 'AcceptsMediCal': [True]}),
+]
+
+# Number of points looked up in the facility trees at a time
+PROXIMITY_CHUNK_SIZE = 100000
+
+
+# Function to read a local coordinate table
+def read_coordinates(path, key_col='ZIPCode'):
+    """
+    Read a local table of coordinates, such as ZIP centroids or facility geocodes.
+
+    Args:
+        path: CSV file with key_col, Latitude and Longitude columns (and optionally Population)
+        key_col: Column identifying each row
+
+    Returns:
+        DataFrame: The table with float64 Latitude and Longitude
+    """
+    coordinates = pd.read_csv(path, dtype={'ZIPCode': str})
+    missing = {key_col, 'Latitude', 'Longitude'} - set(coordinates.columns)
+    if missing:
+        raise ValueError(f"{path} is missing the columns {sorted(missing)}")
+    return coordinates.astype({'Latitude': 'float64', 'Longitude': 'float64'})
+
+
+# Function to give every facility coordinates
+def locate_facilities(facilities, centroids, geocodes=None):
+    """
+    Place facilities at their geocoded location, or at their ZIP centroid if they have none.
+
+    Args:
+        facilities: DataFrame of healthcare facilities
+        centroids: ZIP centroid table from read_coordinates
+        geocodes: Optional table of FacilityID, Latitude and Longitude
+
+    Returns:
+        DataFrame: Located facilities with Latitude and Longitude
+    """
+    coordinates = (
+        centroids.set_index('ZIPCode')[['Latitude', 'Longitude']]
+        .reindex(facilities['ZIPCode'].astype(str)).to_numpy()
+    )
+    if geocodes is not None:
+        geocoded = (
+            geocodes.set_index('FacilityID')[['Latitude', 'Longitude']]
+            .reindex(facilities['FacilityID']).to_numpy()
+        )
+        coordinates = np.where(np.isnan(geocoded), coordinates, geocoded)
+
+    located = ~np.isnan(coordinates).any(axis=1)
+    if not located.all():
+        logger.warning(f"{(~located).sum()} facilities have no coordinates and are left out of the proximity analysis")
+
+    located_facilities = facilities.loc[located].reset_index(drop=True)
+    located_facilities['Latitude'] = coordinates[located, 0]
+    located_facilities['Longitude'] = coordinates[located, 1]
+    return located_facilities
+
+
+# Function to turn coordinates into points on the unit sphere
+def unit_vectors(coordinates):
+    """
+    Convert latitude and longitude to 3D unit vectors.
+
+    The straight-line (chord) distance c between two unit vectors gives their
+    haversine great-circle distance exactly as 2 * arcsin(c / 2), so a
+    Euclidean KD-tree over these vectors finds the same nearest neighbours
+    as a haversine BallTree, several times faster.
+
+    Args:
+        coordinates: DataFrame with Latitude and Longitude in degrees
+
+    Returns:
+        ndarray: Array of shape (n, 3)
+    """
+    lat = np.radians(coordinates['Latitude'].to_numpy(dtype='float64'))
+    lon = np.radians(coordinates['Longitude'].to_numpy(dtype='float64'))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+# Function to find the distance from every point to its nearest facility in a tree
+def nearest_distances(tree, points, chunk_size=PROXIMITY_CHUNK_SIZE):
+    """
+    Look up the nearest facility of every point in chunks.
+
+    Args:
+        tree: KDTree of facility unit vectors
+        points: Array of point unit vectors
+        chunk_size: Number of points per lookup
+
+    Returns:
+        ndarray: Great-circle distance in miles from each point to its nearest facility
+    """
+    distances = np.empty(len(points), dtype='float32')
+    for start in range(0, len(points), chunk_size):
+        chord, _ = tree.query(points[start:start + chunk_size], k=1)
+        distances[start:start + chunk_size] = 2 * np.arcsin(np.minimum(chord[:, 0] / 2, 1)) * EARTH_RADIUS_MILES
+    return distances
+
+
+# Function to compute nearest-facility distances for every geography
+def facility_proximity(points, facilities, weight_col=None, key_col='ZIPCode', chunk_size=PROXIMITY_CHUNK_SIZE):
+    """
+    Compute the distance to the nearest facility of each PROXIMITY_TARGETS kind.
+
+    One KD-tree (see unit_vectors) is built per kind of facility and every
+    point is looked up in it, so the cost grows as
+    (points + facilities) * log(facilities) instead of points * facilities. Points can be ZIP centroids (one per
+    geography) or population points, whose distances are averaged per
+    geography, weighted by weight_col if given.
+
+    Args:
+        points: DataFrame with key_col, Latitude and Longitude
+        facilities: Output of locate_facilities
+        weight_col: Optional column of points to weight the per-geography mean by (such as Population)
+        key_col: Column of points identifying the geography
+        chunk_size: Number of points looked up at a time
+
+    Returns:
+        DataFrame: One column per PROXIMITY_TARGETS entry in miles, indexed by key_col
+    """
+    point_vectors = unit_vectors(points)
+    facility_vectors = unit_vectors(facilities)
+
+    distances = {}
+    for column, criteria in PROXIMITY_TARGETS:
+        selected = np.ones(len(facilities), dtype=bool)
+        for col, values in criteria.items():
+            selected &= facilities[col].isin(values).to_numpy()
+
+        if not selected.any():
+            logger.warning(f"No located facilities match {column}; leaving it empty")
+            distances[column] = np.full(len(points), np.nan, dtype='float32')
+            continue
+        tree = KDTree(facility_vectors[selected])
+        distances[column] = nearest_distances(tree, point_vectors, chunk_size)
+
+    distances = pd.DataFrame(distances)
+    keys = points[key_col].astype(str).to_numpy()
+    if weight_col:
+        weights = points[weight_col].to_numpy(dtype='float64')
+        totals = distances.mul(weights, axis=0).groupby(keys, sort=False).sum(min_count=1)
+        proximity = totals.div(pd.Series(weights).groupby(keys, sort=False).sum(), axis=0)
+    else:
+        proximity = distances.groupby(keys, sort=False).mean()
+
+    proximity.index.name = key_col
+    return proximity.astype('float32')
+
+
+# Function to add nearest-facility distances to community health data
+def add_proximity_columns(community_health_df, proximity):
+    """
+    Merge nearest-facility distances into community health data.
+
+    Args:
+        community_health_df: DataFrame with a ZIPCode column
+        proximity: Output of facility_proximity or catchment_access
+
+    Returns:
+        DataFrame: Community health data with the columns of proximity (NaN for unlocated ZIP codes)
+    """
+    zip_proximity = proximity.reindex(community_health_df['ZIPCode'].astype(str))
+    zip_proximity.index = community_health_df.index
+    return pd.concat([community_health_df, zip_proximity], axis=1)
+
+
+# Catchment radius of the two-step floating catchment access score, in miles
+CATCHMENT_MILES = 10.0
+
+# Relative capacity of each facility type in the catchment access score (other types count as 1)
+CATCHMENT_TYPE_WEIGHTS = {'Hospital': 3.0, 'Community Health Center': 1.5, 'Clinic': 1.0}
+
+# Share of a facility's capacity open to everyone, plus the share added by each accepted payer
+CATCHMENT_BASE_WEIGHT = 0.25
+CATCHMENT_PAYER_WEIGHTS = {'AcceptsMediCal': 0.5, 'AcceptsMedicare': 0.25}
+
+
+# Function to weight facilities by type and accepted insurance
+def facility_capacity(facilities):
+    """
+    Weight each facility by its type and the public insurance it accepts.
+
+    Args:
+        facilities: DataFrame with FacilityType and the CATCHMENT_PAYER_WEIGHTS columns
+
+    Returns:
+        ndarray: Capacity of each facility
+    """
+    capacity = (
+        facilities['FacilityType'].astype(str).map(CATCHMENT_TYPE_WEIGHTS).fillna(1.0).to_numpy(dtype='float64')
+    )
+    payer_share = np.full(len(facilities), CATCHMENT_BASE_WEIGHT)
+    for col, weight in CATCHMENT_PAYER_WEIGHTS.items():
+        payer_share += weight * facilities[col].to_numpy(dtype=bool)
+    return capacity * payer_share
+
+
+# Function to build the sparse population-to-facility catchment matrix
+def catchment_matrix(points, facilities, radius_miles=CATCHMENT_MILES, decay='binary',
+                     chunk_size=PROXIMITY_CHUNK_SIZE):
+    """
+    Find every facility within the catchment radius of every point.
+
+    Args:
+        points: DataFrame with Latitude and Longitude
+        facilities: Output of locate_facilities
+        radius_miles: Catchment radius
+        decay: 'binary' (every facility in the catchment counts fully) or
+            'gaussian' (weight falls from 1 at the point to 0 at the radius)
+        chunk_size: Number of points looked up at a time
+
+    Returns:
+        scipy.sparse.csr_matrix: Points x facilities matrix of catchment weights
+    """
+    tree = KDTree(unit_vectors(facilities))
+    point_vectors = unit_vectors(points)
+    chord_radius = 2 * np.sin(radius_miles / EARTH_RADIUS_MILES / 2)
+
+    rows, cols, miles = [], [], []
+    for start in range(0, len(point_vectors), chunk_size):
+        neighbors, chords = tree.query_radius(point_vectors[start:start + chunk_size], chord_radius,
+                                              return_distance=True)
+        counts = np.fromiter(map(len, neighbors), dtype=np.int64, count=len(neighbors))
+        rows.append(np.repeat(np.arange(start, start + len(neighbors)), counts))
+        cols.append(np.concatenate(neighbors))
+        miles.append(2 * np.arcsin(np.minimum(np.concatenate(chords) / 2, 1)) * EARTH_RADIUS_MILES)
+
+    rows, cols, miles = (np.concatenate(parts) for parts in (rows, cols, miles))
+    if decay == 'binary':
+        weights = np.ones(len(miles), dtype='float32')
+    elif decay == 'gaussian':
+        edge = np.exp(-0.5)
+        weights = ((np.exp(-0.5 * (miles / radius_miles) ** 2) - edge) / (1 - edge)).astype('float32')
+    else:
+        raise ValueError(f"Unknown catchment decay: {decay}")
+
+    return sparse.csr_matrix((weights, (rows, cols)), shape=(len(points), len(facilities)))
+
+
+# Function to compute the two-step floating catchment access score
+def catchment_access(points, facilities, population_col='Population', key_col='ZIPCode',
+                     radius_miles=CATCHMENT_MILES, decay='binary', chunk_size=PROXIMITY_CHUNK_SIZE):
+    """
+    Compute a two-step floating catchment area (2SFCA) access score.
+
+    Step 1 divides each facility's capacity by the population within its
+    catchment; step 2 sums those ratios over the facilities within each
+    point's catchment. Both steps are single sparse matrix products, so a
+    ZIP code next to a major hospital gets credit for it even when the
+    hospital is across the ZIP boundary. Point scores are averaged per
+    geography, weighted by population.
+
+    Args:
+        points: DataFrame with key_col, Latitude, Longitude and population_col
+        facilities: Output of locate_facilities
+        population_col: Column of points with the population at each point
+        key_col: Column of points identifying the geography
+        radius_miles: Catchment radius
+        decay: 'binary' or 'gaussian' distance decay within the catchment
+        chunk_size: Number of points looked up at a time
+
+    Returns:
+        DataFrame: CatchmentAccessPer10k (capacity per 10,000 residents within reach), indexed by key_col
+    """
+    catchment = catchment_matrix(points, facilities, radius_miles, decay, chunk_size)
+    population = points[population_col].to_numpy(dtype='float64')
+
+    # Step 1: capacity-to-population ratio of each facility
+    demand = catchment.T @ population
+    ratios = np.divide(facility_capacity(facilities), demand, out=np.zeros(len(facilities)), where=demand > 0)
+
+    # Step 2: ratios of every facility reachable from each point, per 10,000 residents
+    access = catchment @ ratios * 10000
+
+    keys = points[key_col].astype(str).to_numpy()
+    totals = pd.Series(access * population).groupby(keys, sort=False).sum()
+    weights = pd.Series(population).groupby(keys, sort=False).sum()
+    scores = (totals / weights.where(weights > 0)).astype('float32')
+    scores.index.name = key_col
+    return scores.to_frame('CatchmentAccessPer10k')
+
+
+# Factor groups of the healthcare disparity index
+# Health outcomes (higher = worse)
+HEALTH_FACTORS = [
+    'DiabetesPrevalence',
+    'HeartDiseasePrevalence',
+    'AsthmaPrevalence',
+    'HypertensionPrevalence',
+    'ObesityPrevalence',
+    'MentalHealthDisordersPrevalence'
+]
+
+# Access barriers (higher = worse)
+ACCESS_FACTORS = [
+    'PercentNoRegularCheckup',
+    'PercentDelayedCare',
+    'PercentNoTransportation',
+    'AvgDistanceToHospital',
+    'AvgDistanceToClinic'
+]
+
+# Environmental factors (higher = worse, except WaterQualityIndex and GreenSpaceAccess)
+ENV_FACTORS = [
+    'AirPollutionIndex',
+    'FoodDesertScore',
+    'CalEnviroScreenScore'
+]
+
+# Protective factors (higher = better)
+PROTECTIVE_FACTORS = [
+    'WaterQualityIndex',
+    'GreenSpaceAccess',
+    'FacilitiesPer10k',
+    'PublicTransitAccessScore'
+]
+
+# Weight of each factor group in the index
+FACTOR_GROUP_WEIGHTS = [
+    (HEALTH_FACTORS, 0.4),
+    (ACCESS_FACTORS, 0.35),
+    (ENV_FACTORS, 0.15),
+    (PROTECTIVE_FACTORS, 0.1),
+]
+
+# Names of the factor groups, in FACTOR_GROUP_WEIGHTS order
+FACTOR_GROUP_NAMES = ['Health', 'Access', 'Environment', 'Protective']
+
+# Facility access scores the index can use as its protective access factor
+ACCESS_SCORE_FACTORS = {
+    'per_capita': 'FacilitiesPer10k',
+    'catchment': 'CatchmentAccessPer10k',
+}
+
+
+# Function to choose the facility access score used in the index
+def disparity_factor_groups(access_score='per_capita'):
+    """
+    Get the index factor groups with the chosen facility access score.
+
+    Args:
+        access_score: Key of ACCESS_SCORE_FACTORS ('per_capita' or 'catchment')
+
+    Returns:
+        list: (factors, weight) pairs like FACTOR_GROUP_WEIGHTS
+    """
+    default_factor = ACCESS_SCORE_FACTORS['per_capita']
+    access_factor = ACCESS_SCORE_FACTORS[access_score]
+    return [([access_factor if col == default_factor else col for col in factors], weight)
+            for factors, weight in FACTOR_GROUP_WEIGHTS]
+
+
+# Function to get the weight of each factor in the raw index
+def factor_weights(factor_cols, factor_groups):
+    """
+    Get the signed weight of each normalized factor in the raw index.
+
+    Each group's weight is split evenly over its available factors, and
+    protective factors get a negative weight.
+
+    Args:
+        factor_cols: Factor column names
+        factor_groups: List of (factors, weight) pairs
+
+    Returns:
+        ndarray: Weight per factor
+    """
+    weights = np.zeros(len(factor_cols))
+    for factors, weight in factor_groups:
+        positions = [i for i, col in enumerate(factor_cols) if col in factors]
+        weights[positions] = weight / len(positions) if positions else 0
+    return weights * factor_signs(factor_cols)
+
+
+# Function to orient factors so that higher always means worse
+def factor_signs(factor_cols):
+    """
+    Get the sign of each factor in the index (-1 for protective factors, which are inverted).
+
+    Args:
+        factor_cols: Factor column names
+
+    Returns:
+        ndarray: 1 or -1 per factor
+    """
+    protective = set(PROTECTIVE_FACTORS) | set(ACCESS_SCORE_FACTORS.values())
+    return np.array([-1 if col in protective else 1 for col in factor_cols])
+
+DISPARITY_LABELS = ['Very Low', 'Low', 'Moderate', 'High', 'Very High']
+
+
+# Shared numeric features of the analysis stages
+class FeatureMatrix:
+    """
+    Numeric columns of the analysis frame as one NumPy array.
+
+    It is built once from the fetched frame and shared by the analysis
+    stages, which read the columns they need from it and return only the
+    columns they add. The stage outputs are joined to the frame with a
+    single concat, so the data is not copied at every stage.
+    """
+
+    def __init__(self, values, columns, index):
+        """
+        Args:
+            values: 2-D array with one column per entry in columns
+            columns: Column names
+            index: Row index of the frame the values came from
+        """
+        self.values = values
+        self.columns = list(columns)
+        self.index = index
+        self._positions = {col: i for i, col in enumerate(self.columns)}
+
+    @classmethod
+    def from_frame(cls, df, columns, dtype='float32'):
+        """
+        Copy the given columns of a frame into one array.
+
+        Args:
+            df: DataFrame with the columns
+            columns: Columns to include (missing ones are skipped)
+            dtype: Dtype of the array (float32 matches the declared metric dtype)
+
+        Returns:
+            FeatureMatrix: The features of df
+        """
+        columns = [col for col in dict.fromkeys(columns) if col in df.columns]
+        return cls(df[columns].to_numpy(dtype=dtype), columns, df.index)
+
+    def __len__(self):
+        return len(self.values)
+
+    def take(self, cols):
+        """
+        Get the values of some columns.
+
+        Args:
+            cols: Column names
+
+        Returns:
+            numpy.ndarray: Array with one column per entry in cols
+        """
+        return self.values[:, [self._positions[col] for col in cols]]
+
+    def rows(self, mask):
+        """
+        Get the features of a subset of rows.
+
+        Args:
+            mask: Boolean array selecting rows
+
+        Returns:
+            FeatureMatrix: The selected rows
+        """
+        return FeatureMatrix(self.values[mask], self.columns, self.index[mask])
+
+
+# Function to standardize columns, optionally within groups
+def standardize_by_group(values, groups=None):
+    """
+    Standardize columns to z-scores, optionally within each group.
+
+    Missing values are ignored in the statistics and stay missing, and
+    constant columns get a scale of 1, as in StandardScaler.
+
+    Args:
+        values: 2-D array of values
+        groups: Optional group label of each row (such as the Year column)
+
+    Returns:
+        numpy.ndarray: Standardized values with the shape of values
+    """
+    if groups is None:
+        return StandardScaler().fit_transform(values)
+
+    codes, _ = pd.factorize(np.asarray(groups))
+    standardized = np.full(values.shape, np.nan)
+    for code in np.unique(codes[codes >= 0]):
+        rows = codes == code
+        block = values[rows]
+        std = np.nanstd(block, axis=0)
+        std[std == 0] = 1
+        standardized[rows] = (block - np.nanmean(block, axis=0)) / std
+    return standardized
+
+
+# Function to combine normalized factors into the composite index
+def composite_disparity_index(normalized, factor_groups=FACTOR_GROUP_WEIGHTS):
+    """
+    Weighted average of the normalized factor groups.
+
+    By default health outcomes carry 40% of the weight, access barriers 35%,
+    environmental factors 15% and protective factors 10%.
+
+    Args:
+        normalized: DataFrame with a {factor}_normalized column per available factor
+        factor_groups: List of (factors, weight) pairs
+
+    Returns:
+        Series: Raw (unscaled) healthcare disparity index per row
+    """
+    index = 0
+    for factors, weight in factor_groups:
+        norm_cols = [f"{col}_normalized" for col in factors if f"{col}_normalized" in normalized.columns]
+        index = index + normalized[norm_cols].mean(axis=1) * weight
+    return index
+
+
+# Disparity index model that is fit once and applied to new records
+class DisparityModel:
+    """
+    Healthcare disparity index fit once on a reference population.
+
+    fit() stores the per-factor means and stds, the group weights, the min/max
+    of the raw index and the quintile cut points; transform() scores any
+    DataFrame against them, and score_records() scores a NumPy array of
+    factor values with a single matrix product. The fitted state serializes
+    to a small JSON artifact with save() and load().
+    """
+
+    def __init__(self, factor_groups=None):
+        """
+        Args:
+            factor_groups: List of (factors, weight) pairs (defaults to FACTOR_GROUP_WEIGHTS)
+        """
+        self.factor_groups = factor_groups if factor_groups is not None else FACTOR_GROUP_WEIGHTS
+        self.factor_cols = None
+        self.means = None
+        self.stds = None
+        self.index_min = None
+        self.index_max = None
+        self.cut_points = None
+        self._coefficients = None
+        self._intercept = None
+
+    def fit(self, df):
+        """
+        Fit the model on a reference population.
+
+        Args:
+            df: DataFrame (or FeatureMatrix) with community health data
+
+        Returns:
+            DisparityModel: The fitted model
+        """
+        self.factor_cols = [col for factors, _ in self.factor_groups for col in factors if col in df.columns]
+
+        # One pass over every factor instead of one scaler fit per factor group
+        values = self._factor_values(df)
+        # Column by column, so the temporaries stay one column wide
+        self.means = np.array([np.nanmean(column) for column in values.T])
+        stds = np.array([np.nanstd(column) for column in values.T])
+        del values
+        stds[stds == 0] = 1  # Constant factors get a scale of 1, as in StandardScaler
+        self.stds = stds
+
+        raw_index = self.raw_index(df).to_numpy()
+        self.index_min = float(np.nanmin(raw_index))
+        self.index_max = float(np.nanmax(raw_index))
+
+        scaled_index = self.scale_index(raw_index)
+        self.cut_points = np.quantile(scaled_index[~np.isnan(scaled_index)], np.linspace(0, 1, 6))
+        self._coefficients = None
+        return self
+
+    def normalized_columns(self):
+        """
+        Returns:
+            list: Names of the normalized columns, in factor order
+        """
+        return [f"{col}_normalized" for col in self.factor_cols]
+
+    def _factor_values(self, df):
+        """
+        Returns:
+            numpy.ndarray: float64 values of the factor columns of a DataFrame or FeatureMatrix
+        """
+        if isinstance(df, FeatureMatrix):
+            return df.take(self.factor_cols).astype('float64', copy=False)
+        return df[self.factor_cols].to_numpy(dtype='float64')
+
+    def normalize(self, df):
+        """
+        Compute z-scores of the factors, inverted for protective factors.
+
+        Args:
+            df: DataFrame (or FeatureMatrix) with the fitted factor columns
+
+        Returns:
+            DataFrame: One {factor}_normalized column per factor
+        """
+        signs = factor_signs(self.factor_cols)
+        # One new array, scaled in place
+        normalized = self._factor_values(df) - self.means
+        normalized /= self.stds
+        normalized *= signs
+        return pd.DataFrame(normalized, columns=self.normalized_columns(), index=df.index, copy=False)
+
+    def raw_index(self, df):
+        """
+        Compute the raw (unscaled) disparity index.
+
+        Args:
+            df: DataFrame (or FeatureMatrix) with the fitted factor columns
+
+        Returns:
+            Series: Raw index per row
+        """
+        return composite_disparity_index(self.normalize(df), self.factor_groups)
+
+    def scale_index(self, raw_index):
+        """
+        Rescale a raw index to 0-100 using the fitted min/max.
+
+        Args:
+            raw_index: Raw index values
+
+        Returns:
+            Rescaled index values (same type as raw_index)
+        """
+        return (raw_index - self.index_min) / (self.index_max - self.index_min) * 100
+
+    def classify(self, index):
+        """
+        Assign disparity levels using the fitted quintile cut points.
+
+        The outer bins are open-ended so records outside the reference range still get a level.
+
+        Args:
+            index: Series of 0-100 disparity index values
+
+        Returns:
+            Series: Ordered categorical DisparityLevel
+        """
+        bins = np.concatenate([[-np.inf], self.cut_points[1:-1], [np.inf]])
+        return pd.cut(index, bins=bins, labels=DISPARITY_LABELS)
+
+    def score_columns(self, df):
+        """
+        Compute only the columns the index adds.
+
+        Args:
+            df: DataFrame (or FeatureMatrix) with community health data
+
+        Returns:
+            DataFrame: The normalized factors, HealthDisparityIndex and DisparityLevel, indexed like df
+        """
+        columns = self.normalize(df)
+        columns['HealthDisparityIndex'] = self.scale_index(composite_disparity_index(columns, self.factor_groups))
+        columns['DisparityLevel'] = self.classify(columns['HealthDisparityIndex'])
+        return columns
+
+    def transform(self, df):
+        """
+        Score a DataFrame against the fitted reference population.
+
+        Args:
+            df: DataFrame with community health data
+
+        Returns:
+            DataFrame: Copy of df with the normalized factors, HealthDisparityIndex and DisparityLevel
+        """
+        return pd.concat([df, self.score_columns(df)], axis=1)
+
+    def fit_transform(self, df):
+        """
+        Fit the model on df and score it.
+
+        Args:
+            df: DataFrame with community health data
+
+        Returns:
+            DataFrame: Output of transform
+        """
+        return self.fit(df).transform(df)
+
+    def score_records(self, values):
+        """
+        Score raw factor values with one matrix product.
+
+        The index is linear in the factors, so it collapses to one coefficient
+        per factor plus an intercept. Records must not contain missing values.
+
+        Args:
+            values: Array of shape (n_records, n_factors) in factor_cols order
+
+        Returns:
+            tuple: (HealthDisparityIndex array, DisparityLevel codes 0-4)
+        """
+        if self._coefficients is None:
+            self._coefficients, self._intercept = self._linear_form()
+
+        index = self.scale_index(np.atleast_2d(values) @ self._coefficients + self._intercept)
+        levels = np.searchsorted(self._inner_cut_points, index, side='left')
+        return index, levels
+
+    def _linear_form(self):
+        """
+        Returns:
+            tuple: (coefficient per factor, intercept) of the raw index
+        """
+        coefficients = factor_weights(self.factor_cols, self.factor_groups) / self.stds
+        self._inner_cut_points = self.cut_points[1:-1]
+        return coefficients, -coefficients @ self.means
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: JSON-serializable fitted state
+        """
+        return {
+            'factor_groups': [[list(factors), weight] for factors, weight in self.factor_groups],
+            'factor_cols': self.factor_cols,
+            'means': self.means.tolist(),
+            'stds': self.stds.tolist(),
+            'index_min': self.index_min,
+            'index_max': self.index_max,
+            'cut_points': self.cut_points.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """
+        Args:
+            state: Output of to_dict
+
+        Returns:
+            DisparityModel: Model with the fitted state restored
+        """
+        model = cls([(factors, weight) for factors, weight in state['factor_groups']])
+        model.factor_cols = state['factor_cols']
+        model.means = np.array(state['means'])
+        model.stds = np.array(state['stds'])
+        model.index_min = state['index_min']
+        model.index_max = state['index_max']
+        model.cut_points = np.array(state['cut_points'])
+        return model
+
+    def save(self, path):
+        """
+        Save the fitted state as JSON.
+
+        Args:
+            path: File to write
+        """
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a model saved with save().
+
+        Args:
+            path: File to read
+
+        Returns:
+            DisparityModel: The restored model
+        """
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+# Function to compute the disparity columns from the shared features
+def compute_disparity_columns(features, groups=None, factor_groups=None):
+    """
+    Compute the healthcare disparity index from the shared feature matrix.
+
+    Args:
+        features: FeatureMatrix with the disparity factors
+        groups: Optional group label of each row (such as the Year column) to
+            compute the index separately for each group
+        factor_groups: List of (factors, weight) pairs (defaults to FACTOR_GROUP_WEIGHTS;
+            see disparity_factor_groups)
+
+    Returns:
+        DataFrame: Only the new columns ({factor}_normalized, HealthDisparityIndex
+            and DisparityLevel), indexed like the features
+    """
+    print("Identifying healthcare disparities...")
+
+    if factor_groups is None:
+        factor_groups = FACTOR_GROUP_WEIGHTS
+
+    if groups is None:
+        # Fit the index once on this population and score it
+        columns = DisparityModel(factor_groups).fit(features).score_columns(features)
+        print("Successfully identified healthcare disparities.")
+        return columns
+
+    # Normalize factors within each group (higher = worse disparity, so protective factors are inverted)
+    factor_cols = [col for factors, _ in factor_groups for col in factors if col in features.columns]
+    signs = factor_signs(factor_cols)
+    normalized = standardize_by_group(features.take(factor_cols), groups)
+    normalized *= signs
+    columns = pd.DataFrame(normalized, columns=[f"{col}_normalized" for col in factor_cols],
+                           index=features.index, copy=False)
+
+    # Calculate a composite healthcare disparity index
+    raw_index = composite_disparity_index(columns, factor_groups)
+    group_codes = pd.factorize(np.asarray(groups))[0]
+
+    # Normalize the index to a 0-100 scale within each group for easier interpretation
+    grouped_index = raw_index.groupby(group_codes)
+    min_val = grouped_index.transform('min')
+    max_val = grouped_index.transform('max')
+    columns['HealthDisparityIndex'] = ((raw_index - min_val) / (max_val - min_val)) * 100
+
+    # Classify communities by disparity level (quintiles within each group)
+    level_codes = columns['HealthDisparityIndex'].groupby(group_codes).transform(
+        lambda index: pd.qcut(index, q=5, labels=False)
+    )
+    columns['DisparityLevel'] = pd.Categorical.from_codes(
+        level_codes.fillna(-1).astype(int), categories=DISPARITY_LABELS, ordered=True
+    )
+
+    print("Successfully identified healthcare disparities.")
+    return columns
+
+
+def identify_healthcare_disparities(df, group_col=None, factor_groups=None):
+    """
+    Identify healthcare disparities across LA County communities.
+
+    Args:
+        df: DataFrame with community health data
+        group_col: Optional column (such as 'Year') to compute the index separately for each group
+        factor_groups: List of (factors, weight) pairs (defaults to FACTOR_GROUP_WEIGHTS;
+            disparity_factor_groups('catchment') uses CatchmentAccessPer10k instead of FacilitiesPer10k)
+
+    Returns:
+        DataFrame: Dataset with disparity metrics
+    """
+    if factor_groups is None:
+        factor_groups = FACTOR_GROUP_WEIGHTS
+    features = FeatureMatrix.from_frame(df, [col for factors, _ in factor_groups for col in factors])
+    groups = df[group_col] if group_col is not None else None
+    return pd.concat([df, compute_disparity_columns(features, groups, factor_groups)], axis=1)
+
+
+# Memory the bootstrap may use for its working arrays, shared by its threads
+BOOTSTRAP_MEMORY_BUDGET = 512 * 1024 ** 2
+
+# Bytes of working memory per (replicate, row) pair in each bootstrap pass
+BOOTSTRAP_FIT_BYTES = 32
+BOOTSTRAP_SCORE_BYTES = 24
+
+# Bytes held throughout the bootstrap per (row, factor) (the float64 values and
+# their squares) and per row (the float32 result and the index of complete rows)
+BOOTSTRAP_INPUT_BYTES = 16
+BOOTSTRAP_RESULT_BYTES = 36
+
+# Replicates fit together in one product with the counts; fixed so its rounding never changes
+BOOTSTRAP_FIT_BATCH = 16
+
+# Bytes of the row blocks replicate_index accumulates at a time (sized to stay in cache)
+REPLICATE_INDEX_BLOCK_BYTES = 256 * 1024
+
+
+# Function to compute the raw index of rows under a batch of replicates
+def replicate_index(values, coefficients, intercepts):
+    """
+    Compute the raw disparity index of every row under every replicate.
+
+    The index is accumulated one factor at a time with elementwise
+    operations rather than a matrix product, whose rounding depends on the
+    shape of the operands. Each (row, replicate) value is therefore the same
+    however rows and replicates are batched, so rows lying on a quintile cut
+    are classified the same way in every batch.
+
+    Args:
+        values: Factor values of the rows, shape (n_rows, n_factors)
+        coefficients: Raw index coefficients, shape (n_replicates, n_factors)
+        intercepts: Raw index intercepts, shape (n_replicates,)
+
+    Returns:
+        ndarray: Raw index, shape (n_rows, n_replicates)
+    """
+    raw_index = np.empty((len(values), len(coefficients)))
+    block_size = max(1, REPLICATE_INDEX_BLOCK_BYTES // (8 * max(len(coefficients), 1)))
+    term = np.empty((min(block_size, len(values)), len(coefficients)))
+    for start in range(0, len(values), block_size):
+        block = raw_index[start:start + block_size]
+        block_term = term[:len(block)]
+        block[:] = intercepts
+        for j in range(values.shape[1]):
+            np.multiply(values[start:start + block_size, j, None], coefficients[:, j], out=block_term)
+            block += block_term
+    return raw_index
+
+
+# Function to fit the disparity index on a batch of bootstrap resamples
+def bootstrap_replicates(values, squares, weights, resamples):
+    """
+    Fit the index on a batch of resamples of the reference population at once.
+
+    The means and stds of every resample come from one product of the resample
+    counts of the batch with the values (and their squares). The counts are
+    padded with zeros to BOOTSTRAP_FIT_BATCH rows, so the product always has
+    the same shape and each replicate's moments are the same in every batch
+    that puts it in the same row.
+
+    Args:
+        values: Complete factor values of the reference population, shape (n, n_factors)
+        squares: Squares of values, shared by all batches
+        weights: Output of factor_weights
+        resamples: Stacked resample row indices, shape (n_replicates, n), with at
+            most BOOTSTRAP_FIT_BATCH replicates
+
+    Returns:
+        tuple: Per replicate, the raw index coefficients (n_replicates, n_factors),
+            intercepts, raw index min and max, and inner quintile cut points (n_replicates, 4)
+    """
+    n_replicates, n = resamples.shape
+    counts = np.zeros((max(n_replicates, BOOTSTRAP_FIT_BATCH), n))
+    for replicate_counts, resample in zip(counts, resamples):
+        replicate_counts[:] = np.bincount(resample, minlength=n)
+
+    means = (counts @ values)[:n_replicates] / n
+    variances = (counts @ squares)[:n_replicates] / n - np.square(means)
+    del counts
+    stds = np.sqrt(np.maximum(variances, 0))
+    stds[stds == 0] = 1
+
+    coefficients = weights / stds
+    intercepts = -np.einsum('ij,ij->i', coefficients, means)
+
+    # The index of each replicate is scaled and cut on its own resampled rows
+    raw_index = replicate_index(values, coefficients, intercepts)
+    resampled_index = np.take_along_axis(raw_index.T, resamples, axis=1)
+    del raw_index
+    index_min = resampled_index.min(axis=1)
+    index_max = resampled_index.max(axis=1)
+    cut_points = np.quantile(resampled_index, np.linspace(0, 1, 6)[1:-1], axis=1).T
+    return coefficients, intercepts, index_min, index_max, cut_points
+
+
+# Function to score rows under every bootstrap replicate
+def bootstrap_scores(values, replicates, ci=0.95):
+    """
+    Score a block of rows under every replicate and summarize the spread.
+
+    Args:
+        values: Complete factor values of the rows, shape (n_rows, n_factors)
+        replicates: Output of bootstrap_replicates for all replicates
+        ci: Confidence level of the interval
+
+    Returns:
+        tuple: Lower and upper interval bounds of HealthDisparityIndex, and the
+            probability of each DISPARITY_LABELS level, shape (n_rows, 5)
+    """
+    coefficients, intercepts, index_min, index_max, cut_points = replicates
+
+    raw_index = replicate_index(values, coefficients, intercepts)
+
+    levels = np.zeros(raw_index.shape, dtype='int8')
+    for cut in cut_points.T:
+        levels += raw_index > cut
+    probabilities = np.stack([(levels == level).mean(axis=1) for level in range(len(DISPARITY_LABELS))], axis=1)
+    del levels
+
+    raw_index -= index_min
+    raw_index *= 100 / (index_max - index_min)
+    lower, upper = np.quantile(raw_index, [(1 - ci) / 2, (1 + ci) / 2], axis=1)
+    return lower, upper, probabilities
+
+
+# Function to estimate the uncertainty of the disparity index by bootstrapping
+def bootstrap_disparity(features, n_boot=1000, ci=0.95, factor_groups=None, seed=42,
+                        memory_budget=BOOTSTRAP_MEMORY_BUDGET, n_jobs=None):
+    """
+    Bootstrap the healthcare disparity index over the reference population.
+
+    Each replicate refits the index (factor means and stds, 0-100 scaling and
+    quintile cut points) on a resample of the rows, and every row is scored
+    under every replicate. Replicates are fit in fixed batches of
+    BOOTSTRAP_FIT_BATCH and rows are scored in blocks against all replicates
+    at once. The inputs and the result are counted against memory_budget
+    first; the rest is shared by the threads, whose number is capped so that
+    their working arrays fit. Each replicate draws its resample from its own
+    stream spawned from seed and is always fit in the same batch, so results
+    depend only on seed and not on n_jobs or memory_budget.
+
+    Args:
+        features: FeatureMatrix with the disparity factors
+        n_boot: Number of bootstrap replicates
+        ci: Confidence level of the interval
+        factor_groups: List of (factors, weight) pairs (defaults to FACTOR_GROUP_WEIGHTS)
+        seed: Seed for the resamples
+        memory_budget: Bytes of working memory to stay within
+        n_jobs: Maximum number of threads (defaults to the number of CPUs)
+
+    Returns:
+        DataFrame: HealthDisparityIndexLower, HealthDisparityIndexUpper and one
+            Prob{level} column per DisparityLevel, indexed like the features
+            (missing for rows with missing factors)
+
+    Raises:
+        ValueError: If memory_budget cannot hold the inputs and one thread's working arrays
+    """
+    if factor_groups is None:
+        factor_groups = FACTOR_GROUP_WEIGHTS
+    factor_cols = [col for factors, _ in factor_groups for col in factors if col in features.columns]
+    weights = factor_weights(factor_cols, factor_groups)
+
+    values = features.take(factor_cols)
+    complete = ~np.isnan(values).any(axis=1)
+    values = values[complete].astype('float64')
+    # Centering keeps the variances from losing precision in the count products
+    values -= values.mean(axis=0)
+    squares = np.square(values)
+    n, n_factors = values.shape
+
+    # What is left after the inputs, the replicates and the result is shared by the threads
+    fixed_bytes = (n * n_factors * BOOTSTRAP_INPUT_BYTES + len(features) * BOOTSTRAP_RESULT_BYTES
+                   + n_boot * 8 * (n_factors + 7))
+    fit_bytes = BOOTSTRAP_FIT_BATCH * BOOTSTRAP_FIT_BYTES * n
+    score_row_bytes = BOOTSTRAP_SCORE_BYTES * n_boot
+    available = memory_budget - fixed_bytes
+    if available < max(fit_bytes, score_row_bytes):
+        raise ValueError(f"A memory_budget of {int(memory_budget)} bytes cannot hold the bootstrap of {n} rows; "
+                         f"it needs at least {fixed_bytes + max(fit_bytes, score_row_bytes)} bytes")
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    # Pass 1: fit the replicates in fixed batches; each replicate draws from its own seeded stream
+    streams = np.random.SeedSequence(seed).spawn(n_boot)
+    batches = [streams[start:start + BOOTSTRAP_FIT_BATCH] for start in range(0, n_boot, BOOTSTRAP_FIT_BATCH)]
+
+    def fit_batch(batch):
+        resamples = np.stack([np.random.default_rng(stream).integers(0, n, n, dtype=np.int32) for stream in batch])
+        return bootstrap_replicates(values, squares, weights, resamples)
+
+    with ThreadPoolExecutor(max_workers=int(min(n_jobs, available // max(fit_bytes, 1)))) as executor:
+        fitted = list(executor.map(fit_batch, batches))
+    replicates = tuple(np.concatenate(parts) for parts in zip(*fitted))
+    del fitted, squares
+
+    # Pass 2: score blocks of rows against every replicate, writing each block into the result
+    score_jobs = int(min(n_jobs, available // score_row_bytes))
+    block_size = int(available // (score_jobs * score_row_bytes))
+    result = np.full((len(features), 2 + len(DISPARITY_LABELS)), np.nan, dtype='float32')
+    rows = np.flatnonzero(complete)
+
+    def score_block(start):
+        lower, upper, probabilities = bootstrap_scores(values[start:start + block_size], replicates, ci)
+        result[rows[start:start + block_size]] = np.column_stack([lower, upper, probabilities])
+
+    with ThreadPoolExecutor(max_workers=score_jobs) as executor:
+        list(executor.map(score_block, range(0, n, block_size)))
+
+    columns = ['HealthDisparityIndexLower', 'HealthDisparityIndexUpper'] + [
+        'Prob' + label.replace(' ', '') for label in DISPARITY_LABELS
+    ]
+    return pd.DataFrame(result, columns=columns, index=features.index, copy=False)
+
+
+# Function to compute the uncertainty columns, optionally within groups
+def compute_uncertainty_columns(features, groups=None, n_boot=1000, factor_groups=None, **options):
+    """
+    Bootstrap the disparity index for the whole population or each group.
+
+    Args:
+        features: FeatureMatrix with the disparity factors
+        groups: Optional group label of each row (such as the Year column) to
+            bootstrap each group against its own reference population
+        n_boot: Number of bootstrap replicates
+        factor_groups: List of (factors, weight) pairs (defaults to FACTOR_GROUP_WEIGHTS)
+        **options: Further arguments of bootstrap_disparity
+
+    Returns:
+        DataFrame: Output of bootstrap_disparity, indexed like the features
+    """
+    print(f"Bootstrapping the disparity index ({n_boot} replicates)...")
+
+    if groups is None:
+        columns = bootstrap_disparity(features, n_boot, factor_groups=factor_groups, **options)
+    else:
+        codes, _ = pd.factorize(np.asarray(groups))
+        parts = [
+            bootstrap_disparity(features.rows(codes == code), n_boot, factor_groups=factor_groups, **options)
+            for code in np.unique(codes[codes >= 0])
+        ]
+        columns = pd.concat(parts).reindex(features.index)
+
+    print("Successfully bootstrapped the disparity index.")
+    return columns
+
+
+# Memory the weight sensitivity sweep may use for its score and rank arrays
+SENSITIVITY_MEMORY_BUDGET = 256 * 1024 ** 2
+
+# Bytes of working memory per (candidate, row) pair of the sweep
+SENSITIVITY_BYTES = 40
+
+# Row pairs Kendall tau is computed over; populations with fewer pairs use every pair
+KENDALL_TAU_PAIRS = 200000
+
+
+# Function to draw candidate weightings of the factor groups
+def candidate_weights(n_candidates=2000, factor_groups=None, concentration=20, seed=42):
+    """
+    Draw candidate factor group weightings around the current ones.
+
+    Candidates are drawn from a Dirichlet distribution centred on the
+    current weights (higher concentration keeps them closer); the first
+    candidate is the current weighting itself.
+
+    Args:
+        n_candidates: Number of weightings, including the current one
+        factor_groups: List of (factors, weight) pairs (defaults to FACTOR_GROUP_WEIGHTS)
+        concentration: Dirichlet concentration
+        seed: Seed for the draws
+
+    Returns:
+        ndarray: Weights of shape (n_candidates, n_groups), each row summing to 1
+    """
+    if factor_groups is None:
+        factor_groups = FACTOR_GROUP_WEIGHTS
+    baseline = np.array([weight for _, weight in factor_groups], dtype='float64')
+    baseline /= baseline.sum()
+
+    draws = np.random.default_rng(seed).dirichlet(baseline * concentration, size=max(n_candidates - 1, 0))
+    return np.vstack([baseline, draws])
+
+
+# Function to compute the mean normalized factor of each group
+def category_scores(features, factor_groups=None):
+    """
+    Compute the mean normalized factor of each factor group for every row.
+
+    The disparity index is the weighted sum of these columns, so any
+    weighting can be scored from them with one matrix product.
+
+    Args:
+        features: FeatureMatrix with the disparity factors
+        factor_groups: List of (factors, weight) pairs (defaults to FACTOR_GROUP_WEIGHTS)
+
+    Returns:
+        ndarray: Array of shape (n_rows, n_groups)
+    """
+    model = DisparityModel(factor_groups).fit(features)
+    normalized = model.normalize(features)
+    return np.column_stack([
+        normalized[[f"{col}_normalized" for col in factors if col in model.factor_cols]].mean(axis=1).to_numpy()
+        for factors, _ in model.factor_groups
+    ])
+
+
+# Function to rank rows by score within every column
+def rank_columns(scores):
+    """
+    Rank rows by descending score within each column (1 = highest disparity).
+
+    Args:
+        scores: Array of shape (n_rows, n_columns)
+
+    Returns:
+        ndarray: int32 ranks with the shape of scores
+    """
+    order = np.argsort(-scores, axis=0, kind='stable')
+    ranks = np.empty(scores.shape, dtype='int32')
+    np.put_along_axis(ranks, order, np.arange(1, len(scores) + 1, dtype='int32')[:, None], axis=0)
+    return ranks
+
+
+# Function to choose the row pairs Kendall tau is computed over
+def tau_pairs(n, n_pairs=KENDALL_TAU_PAIRS, seed=42):
+    """
+    Choose the row pairs Kendall tau is computed over.
+
+    Every pair is used when there are at most n_pairs of them, which gives
+    the exact tau; otherwise n_pairs pairs are drawn uniformly at random,
+    which estimates tau with a standard error of at most 1 / sqrt(n_pairs).
+
+    Args:
+        n: Number of rows
+        n_pairs: Maximum number of pairs
+        seed: Seed for the sampled pairs
+
+    Returns:
+        tuple: (first, second) row positions of each pair
+    """
+    if n * (n - 1) // 2 <= n_pairs:
+        return np.triu_indices(n, 1)
+    rng = np.random.default_rng(seed)
+    first = rng.integers(0, n, n_pairs)
+    second = (first + rng.integers(1, n, n_pairs)) % n
+    return first, second
+
+
+# Function to compute Kendall tau of every column against a baseline ranking
+def kendall_tau(baseline_ranks, ranks, pairs):
+    """
+    Compute Kendall tau between a baseline ranking and each column of ranks.
+
+    Ranks have no ties, so tau is the share of concordant pairs minus the
+    share of discordant ones. Pairs are compared in chunks of len(ranks)
+    so the working arrays stay the size of ranks.
+
+    Args:
+        baseline_ranks: Baseline rank of each row, shape (n,)
+        ranks: Ranks under each candidate, shape (n, n_candidates)
+        pairs: Output of tau_pairs
+
+    Returns:
+        ndarray: Kendall tau per column (NaN with fewer than two rows)
+    """
+    first, second = pairs
+    if not len(first):
+        return np.full(ranks.shape[1], np.nan)
+
+    concordant = np.zeros(ranks.shape[1], dtype='int64')
+    chunk_size = max(len(ranks), 1)
+    for start in range(0, len(first), chunk_size):
+        i, j = first[start:start + chunk_size], second[start:start + chunk_size]
+        baseline_greater = baseline_ranks[i] > baseline_ranks[j]
+        concordant += ((ranks[i] > ranks[j]) == baseline_greater[:, None]).sum(axis=0)
+    return 2 * concordant / len(first) - 1
+
+
+# Function to sweep candidate weightings and measure rank stability
+def weight_sensitivity(features, weights=None, top_n=20, factor_groups=None,
+                       memory_budget=SENSITIVITY_MEMORY_BUDGET, n_tau_pairs=KENDALL_TAU_PAIRS):
+    """
+    Score every candidate weighting at once and measure how stable the rankings are.
+
+    The factor group means are computed once; each batch of candidates is
+    scored with one matrix product and ranked, and per-row statistics are
+    accumulated across batches, so the sweep never holds a rows x candidates
+    array larger than memory_budget. Rows are compared with the first
+    candidate (the current weighting from candidate_weights). Levels are
+    quintiles of the rank, as with DisparityLevel.
+
+    The cost grows with the number of candidates times the number of rows
+    (one sort per candidate), plus candidates times n_tau_pairs comparisons
+    for Kendall tau, which is computed from the ranks over the pairs chosen
+    by tau_pairs (exact for small populations, sampled for large ones).
+
+    Args:
+        features: FeatureMatrix with the disparity factors
+        weights: Candidate weights of shape (n_candidates, n_groups) (defaults to candidate_weights())
+        top_n: Size of the highest-disparity list whose churn is measured
+        factor_groups: List of (factors, weight) pairs (defaults to FACTOR_GROUP_WEIGHTS)
+        memory_budget: Bytes of working memory to stay within
+        n_tau_pairs: Maximum number of row pairs Kendall tau is computed over
+
+    Returns:
+        tuple: (DataFrame of per-row rank statistics indexed like the features,
+            DataFrame with one row per candidate: its weights, KendallTau and TopNChurn
+            against the first candidate)
+    """
+    if weights is None:
+        weights = candidate_weights(factor_groups=factor_groups)
+    weights = np.atleast_2d(np.asarray(weights, dtype='float64'))
+
+    categories = category_scores(features, factor_groups)
+    complete = ~np.isnan(categories).any(axis=1)
+    categories = categories[complete]
+    n = len(categories)
+
+    baseline_scores = categories @ weights[0]
+    baseline_ranks = rank_columns(baseline_scores[:, None])[:, 0]
+    baseline_top = baseline_ranks <= top_n
+    baseline_levels = (n - baseline_ranks) * len(DISPARITY_LABELS) // n
+    pairs = tau_pairs(n, n_tau_pairs)
+
+    rank_sum = np.zeros(n)
+    rank_square_sum = np.zeros(n)
+    rank_best = np.full(n, n, dtype='int32')
+    rank_worst = np.zeros(n, dtype='int32')
+    top_count = np.zeros(n, dtype='int64')
+    level_change_count = np.zeros(n, dtype='int64')
+    kendall = np.empty(len(weights))
+    churn = np.empty(len(weights))
+
+    batch_size = int(max(1, memory_budget // (SENSITIVITY_BYTES * max(n, 1))))
+    for start in range(0, len(weights), batch_size):
+        batch = weights[start:start + batch_size]
+
+        # Every candidate in the batch is scored with one matrix product
+        scores = categories @ batch.T
+        ranks = rank_columns(scores)
+        del scores
+
+        rank_sum += ranks.sum(axis=1)
+        rank_square_sum += np.square(ranks, dtype='float64').sum(axis=1)
+        np.minimum(rank_best, ranks.min(axis=1), out=rank_best)
+        np.maximum(rank_worst, ranks.max(axis=1), out=rank_worst)
+
+        top = ranks <= top_n
+        top_count += top.sum(axis=1)
+        churn[start:start + len(batch)] = 1 - (top & baseline_top[:, None]).sum(axis=0) / max(baseline_top.sum(), 1)
+        level_change_count += ((n - ranks) * len(DISPARITY_LABELS) // n != baseline_levels[:, None]).sum(axis=1)
+        kendall[start:start + len(batch)] = kendall_tau(baseline_ranks, ranks, pairs)
+
+    n_candidates = len(weights)
+    rank_mean = rank_sum / n_candidates
+    stability = pd.DataFrame(np.nan, index=features.index, columns=[
+        'RankMean', 'RankStd', 'RankBest', 'RankWorst', 'TopNShare', 'LevelChangeShare'
+    ])
+    stability.loc[complete] = np.column_stack([
+        rank_mean,
+        np.sqrt(np.maximum(rank_square_sum / n_candidates - np.square(rank_mean), 0)),
+        rank_best,
+        rank_worst,
+        top_count / n_candidates,
+        level_change_count / n_candidates,
+    ])
+
+    candidates = pd.DataFrame(weights, columns=[f"{name}Weight" for name in FACTOR_GROUP_NAMES[:weights.shape[1]]])
+    candidates['KendallTau'] = kendall
+    candidates['TopNChurn'] = churn
+    return stability, candidates
+
+
+# Function to run the weight sensitivity sweep, optionally within groups
+def compute_sensitivity_columns(features, groups=None, n_candidates=2000, top_n=20, factor_groups=None,
+                                n_tau_pairs=KENDALL_TAU_PAIRS, **options):
+    """
+    Sweep candidate weightings for the whole population or each group.
+
+    Args:
+        features: FeatureMatrix with the disparity factors
+        groups: Optional group label of each row (such as the Year column) to rank each group separately
+        n_candidates: Number of candidate weightings, including the current one
+        top_n: Size of the highest-disparity list whose churn is measured
+        factor_groups: List of (factors, weight) pairs (defaults to FACTOR_GROUP_WEIGHTS)
+        n_tau_pairs: Maximum number of row pairs Kendall tau is computed over
+        **options: Further arguments of candidate_weights (concentration, seed)
+
+    Returns:
+        tuple: (per-row rank statistics indexed like the features, per-candidate
+            table with a column named like groups (or Group) when groups are given)
+    """
+    print(f"Sweeping {n_candidates} candidate index weightings...")
+
+    weights = candidate_weights(n_candidates, factor_groups, **options)
+    if groups is None:
+        stability, candidates = weight_sensitivity(features, weights, top_n, factor_groups, n_tau_pairs=n_tau_pairs)
+    else:
+        group_values = pd.Series(np.asarray(groups))
+        stability_parts, candidate_parts = [], []
+        for group in group_values.dropna().unique():
+            group_stability, group_candidates = weight_sensitivity(
+                features.rows((group_values == group).to_numpy()), weights, top_n, factor_groups,
+                n_tau_pairs=n_tau_pairs
+            )
+            stability_parts.append(group_stability)
+            candidate_parts.append(group_candidates.assign(**{getattr(groups, 'name', None) or 'Group': group}))
+        stability = pd.concat(stability_parts).reindex(features.index)
+        candidates = pd.concat(candidate_parts, ignore_index=True)
+
+    print(f"Median Kendall tau against the current weights: {candidates['KendallTau'].median():.3f}; "
+          f"median top-{top_n} churn: {candidates['TopNChurn'].median():.1%}.")
+    return stability, candidates
+
+
+# Function to capture the statistics needed for incremental disparity updates
+def build_disparity_state(df, key_col=None):
+    """
+    Run a full disparity computation and keep its statistics for incremental updates.
+
+    The state holds a fitted DisparityModel (reference means/stds, min/max of
+    the raw index and quintile cut points) plus running sums, sums of squares
+    and non-null counts per factor for running means and variances. Rows are
+    keyed by ZIPCode and Year when a Year column is present, so a multi-year
+    frame is one population of (ZIPCode, Year) rows.
+
+    Args:
+        df: DataFrame with community health data
+        key_col: Column or list of columns that identify each row
+            (defaults to ['ZIPCode', 'Year'] when df has a Year column, otherwise 'ZIPCode')
+
+    Returns:
+        dict: Incremental disparity state, with the full results under 'result'
+
+    Raises:
+        ValueError: If the key columns don't identify each row uniquely
+    """
+    if key_col is None:
+        key_col = ['ZIPCode', 'Year'] if 'Year' in df.columns else 'ZIPCode'
+
+    # Plain object columns so updated rows can bring values outside the original categories
+    data = indexed_by_key(df, key_col)
+    data = data.astype({col: 'object' for col in data.columns if isinstance(data[col].dtype, pd.CategoricalDtype)})
+
+    model = DisparityModel().fit(data)
+    values = data[model.factor_cols].astype('float64')
+    raw_index = model.raw_index(data)
+
+    return {
+        'key_col': key_col,
+        'model': model,
+        'data': data,
+        'count': values.notna().sum(),
+        'sum': values.sum(),
+        'sum_sq': (values ** 2).sum(),
+        'reference_std': values.std(ddof=0).to_numpy(),
+        'extreme_keys': {raw_index.idxmin(), raw_index.idxmax()},
+        'result': model.transform(data),
+    }
+
+
+# Function to refresh the disparity index for updated rows only
+def update_healthcare_disparities(state, updated_df, tolerance=0.05):
+    """
+    Refresh the disparity index for changed rows without recomputing every row.
+
+    The running sums are adjusted for the changed rows and compared with the
+    reference statistics. If any factor's mean or std drifted by more than
+    tolerance (relative to the reference std), or a changed row moves the
+    min/max of the raw index, everything is recomputed; otherwise only the
+    changed rows are scored by the state's DisparityModel.
+
+    Args:
+        state: Output of build_disparity_state (updated in place)
+        updated_df: DataFrame of new or changed rows with the same columns as the original data
+        tolerance: Allowed drift of the global statistics before a full recompute
+
+    Returns:
+        DataFrame: Refreshed results for the rows in updated_df
+
+    Raises:
+        ValueError: If updated_df repeats a key
+    """
+    key_col = state['key_col']
+    model = state['model']
+    updates = indexed_by_key(updated_df, key_col)
+    keys = updates.index
+
+    # Swap the old contribution of changed rows for the new one in the running sums
+    existing = keys.intersection(state['data'].index)
+    old_values = state['data'].loc[existing, model.factor_cols].astype('float64')
+    new_values = updates[model.factor_cols].astype('float64')
+    state['sum'] += new_values.sum() - old_values.sum()
+    state['sum_sq'] += (new_values ** 2).sum() - (old_values ** 2).sum()
+    state['count'] += new_values.notna().sum() - old_values.notna().sum()
+    state['data'] = upsert_rows(state['data'], updates)
+
+    running_mean = (state['sum'] / state['count']).to_numpy()
+    running_std = np.sqrt(np.clip((state['sum_sq'] / state['count']).to_numpy() - running_mean ** 2, 0, None))
+    drift = max(
+        np.max(np.abs(running_mean - model.means) / model.stds),
+        np.max(np.abs(running_std - state['reference_std']) / model.stds)
+    )
+
+    raw_index = model.raw_index(updates)
+    extremes_moved = (
+        raw_index.min() < model.index_min or raw_index.max() > model.index_max
+        or not state['extreme_keys'].isdisjoint(keys)
+    )
+
+    if drift > tolerance or extremes_moved:
+        print(f"Global statistics changed (drift {drift:.3f}); recomputing all disparities...")
+        state.update(build_disparity_state(state['data'].reset_index(), key_col))
+        return state['result'].loc[keys]
+
+    # Only the changed rows are rescored against the reference statistics
+    refreshed = model.transform(updates)
+    state['result'] = upsert_rows(state['result'], refreshed)
+
+    return refreshed
+
+
+# Function to index a frame by its key columns
+def indexed_by_key(df, key_col):
+    """
+    Index a frame by its key columns, rejecting repeated keys.
+
+    Args:
+        df: DataFrame with the key columns
+        key_col: Column or list of columns that identify each row
+
+    Returns:
+        DataFrame: df indexed by the key
+
+    Raises:
+        ValueError: If a key appears more than once
+    """
+    data = df.set_index(key_col)
+    if data.index.has_duplicates:
+        duplicates = data.index[data.index.duplicated()].unique()
+        raise ValueError(f"{key_col} must identify each row; repeated keys include {list(duplicates[:5])}")
+    return data
+
+
+# Function to update and append rows of an indexed frame
+def upsert_rows(df, rows):
+    """
+    Overwrite existing rows in place and append new ones.
+
+    Args:
+        df: DataFrame indexed by key
+        rows: DataFrame indexed by the same key with a subset of df's columns
+
+    Returns:
+        DataFrame: df with the rows applied
+    """
+    existing = rows.index.intersection(df.index)
+    if len(existing):
+        # Cast to the target dtypes so the in-place assignment never upcasts a whole column
+        existing_rows = rows.loc[existing].astype(df.dtypes[rows.columns].to_dict())
+        df.loc[existing, rows.columns] = existing_rows
+
+    new_keys = rows.index.difference(df.index)
+    if len(new_keys):
+        df = pd.concat([df, rows.loc[new_keys]])
+
+    return df
+
+
+# Features for clustering
+CLUSTER_FEATURES = [
+    'MedianIncome', 'PercentMinority', 'PercentPoverty', 'PercentUninsured',
+    'DiabetesPrevalence', 'HeartDiseasePrevalence', 'AsthmaPrevalence',
+    'ObesityPrevalence', 'LifeExpectancy', 'AirPollutionIndex',
+    'FoodDesertScore', 'FacilitiesPer10k'
+]
+
+# Numeric columns read by the analysis stages
+ANALYSIS_FEATURES = (
+    [col for factors, _ in FACTOR_GROUP_WEIGHTS for col in factors]
+    + list(ACCESS_SCORE_FACTORS.values()) + CLUSTER_FEATURES
+)
+
+# Cluster labeling rules, checked in order (the first match wins)
+# Each condition (feature, comparison, statistic) compares a cluster's mean feature
+# value with that statistic of the feature across all clusters
+CLUSTER_LABEL_RULES = [
+    # High income, good health outcomes
+    ("High Resource / Good Health", [
+        ('MedianIncome', '>', 'median'),
+        ('LifeExpectancy', '>', 'median'),
+    ]),
+    # Low income, high minority, poor health outcomes
+    ("Underserved / Poor Health", [
+        ('MedianIncome', '<', 'median'),
+        ('PercentMinority', '>', 'median'),
+        ('DiabetesPrevalence', '>', 'median'),
+    ]),
+    # Low income, high environmental concerns
+    ("Environmental Justice Concerns", [
+        ('MedianIncome', '<', 'median'),
+        ('AirPollutionIndex', '>', 'median'),
+    ]),
+    # Moderate income, food access issues
+    ("Food Access Challenges", [
+        ('MedianIncome', '>', 'min'),
+        ('FoodDesertScore', '>', 'median'),
+    ]),
+]
+
+# Other communities
+DEFAULT_CLUSTER_LABEL = "Mixed Resources / Average Health"
+
+# Directory for cached k-selection results
+KMEANS_CACHE_DIR = '.kmeans_cache'
+
+# In-process cache of k-selection results, keyed like the on-disk cache
+_kmeans_cache = {}
+
+
+# Function to fit one k-means model (module level so worker processes can pickle it)
+def fit_kmeans(X, k):
+    """
+    Fit k-means with the settings used throughout the analysis.
+
+    Args:
+        X: Scaled feature matrix
+        k: Number of clusters
+
+    Returns:
+        KMeans: The fitted model
+    """
+    kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
+    kmeans.fit(X)
+    return kmeans
+
+
+# Function to pick k at the elbow of the inertia curve
+def elbow_k(k_values, inertias):
+    """
+    Pick the k farthest below the straight line from the first to the last inertia.
+
+    Args:
+        k_values: Candidate numbers of clusters
+        inertias: Inertia of the fitted model for each k
+
+    Returns:
+        int: k at the elbow
+    """
+    k_values = np.asarray(k_values, dtype=float)
+    inertias = np.asarray(inertias, dtype=float)
+
+    # Normalize both axes to 0-1 so the distance doesn't depend on the inertia scale
+    x = (k_values - k_values[0]) / (k_values[-1] - k_values[0])
+    y = (inertias - inertias[-1]) / max(inertias[0] - inertias[-1], 1e-12)
+    return int(k_values[np.argmax((1 - x) - y)])
+
+
+# Function to choose the number of clusters
+def find_optimal_k(X_scaled, k_range=range(2, 11), method='elbow', n_jobs=None, cache_dir=KMEANS_CACHE_DIR):
+    """
+    Sweep k in parallel and choose the number of clusters automatically.
+
+    Each k is fit in its own worker process. Results are cached under a hash
+    of X_scaled and the sweep settings, in memory and (if cache_dir is set)
+    on disk, so a rerun on unchanged data skips the sweep entirely. The
+    fitted model for the chosen k is returned so it never has to be refit.
+
+    Args:
+        X_scaled: Scaled feature matrix
+        k_range: Candidate numbers of clusters
+        method: 'elbow' (inertia curve) or 'silhouette'
+        n_jobs: Number of worker processes (defaults to the number of CPUs; 1 runs serially)
+        cache_dir: Directory for cached results (None disables the on-disk cache)
+
+    Returns:
+        dict: 'k', 'model' (fitted KMeans for k), 'inertia' and 'silhouette' per candidate k
+    """
+    X_scaled = np.ascontiguousarray(X_scaled)
+    k_values = list(k_range)
+
+    cache_key = hashlib.sha256(
+        X_scaled.tobytes() + repr((X_scaled.shape, str(X_scaled.dtype), k_values, method)).encode()
+    ).hexdigest()
+    if cache_key in _kmeans_cache:
+        return _kmeans_cache[cache_key]
+
+    cache_path = os.path.join(cache_dir, f"{cache_key}.pkl") if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            _kmeans_cache[cache_key] = pickle.load(f)
+        print(f"Using cached k selection ({cache_key[:12]}).")
+        return _kmeans_cache[cache_key]
+
+    # Fit every candidate k, one per worker process
+    if n_jobs == 1:
+        models = [fit_kmeans(X_scaled, k) for k in k_values]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            models = list(pool.map(fit_kmeans, repeat(X_scaled), k_values))
+
+    inertia = {k: model.inertia_ for k, model in zip(k_values, models)}
+    silhouette = {}
+    if method == 'silhouette':
+        # Score a sample so the O(n^2) silhouette stays affordable on large geographies
+        sample_size = min(len(X_scaled), 10000)
+        for k, model in zip(k_values, models):
+            silhouette[k] = silhouette_score(X_scaled, model.labels_, sample_size=sample_size, random_state=42)
+        best_k = max(silhouette, key=silhouette.get)
+    elif method == 'elbow':
+        best_k = elbow_k(k_values, [inertia[k] for k in k_values])
+    else:
+        raise ValueError(f"Unknown k selection method: {method}")
+
+    result = {
+        'k': best_k,
+        'model': models[k_values.index(best_k)],
+        'inertia': inertia,
+        'silhouette': silhouette,
+    }
+
+    _kmeans_cache[cache_key] = result
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, 'wb') as f:
+            pickle.dump(result, f)
+
+    return result
+
+
+# Function to compute the cluster columns from the shared features
+def compute_cluster_columns(features, groups=None, k=None, k_method='elbow', n_jobs=None,
+                            cache_dir=KMEANS_CACHE_DIR):
+    """
+    Cluster communities by health and socioeconomic factors from the shared feature matrix.
+
+    Args:
+        features: FeatureMatrix with the clustering features
+        groups: Optional group label of each row (such as the Year column) to cluster each group separately
+        k: Number of clusters (chosen automatically with find_optimal_k if not given)
+        k_method: 'elbow' or 'silhouette' when choosing k automatically
+        n_jobs: Number of worker processes for the k sweep
+        cache_dir: Directory for cached k selection results (None disables the on-disk cache)
+
+    Returns:
+        tuple: (DataFrame with only the Cluster and CommunityProfile columns, DataFrame of cluster profiles)
+    """
+    if groups is not None:
+        # Cluster each group on its own and write its labels into the group's rows
+        groups = pd.Series(np.asarray(groups), name=getattr(groups, 'name', None))
+        clusters = np.empty(len(features), dtype='int16')
+        labels = np.empty(len(features), dtype=object)
+        keys, profiles = [], []
+        for key, positions in groups.groupby(groups, observed=True).indices.items():
+            rows = np.zeros(len(features), dtype=bool)
+            rows[positions] = True
+            group_columns, group_profiles = compute_cluster_columns(
+                features.rows(rows), k=k, k_method=k_method, n_jobs=n_jobs, cache_dir=cache_dir
+            )
+            clusters[rows] = group_columns['Cluster'].to_numpy()
+            labels[rows] = group_columns['CommunityProfile'].astype(object).to_numpy()
+            keys.append(key)
+            profiles.append(group_profiles)
+
+        columns = pd.DataFrame({'Cluster': clusters, 'CommunityProfile': pd.Categorical(labels)},
+                               index=features.index)
+        cluster_profiles = pd.concat(profiles, keys=keys, names=[groups.name, 'Cluster'])
+        return columns, cluster_profiles
+
+    print("Clustering communities by health and socioeconomic factors...")
+
+    # Ensure all features are present
+    feature_cols = [col for col in CLUSTER_FEATURES if col in features.columns]
+    X = features.take(feature_cols)
+
+    # Handle any missing values
+    X_filled = np.where(np.isnan(X), np.nanmean(X, axis=0), X)
+
+    # Scale features
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X_filled)
+
+    if k is None:
+        # Determine the optimal number of clusters and reuse the model fitted during the sweep
+        k_selection = find_optimal_k(X_scaled, method=k_method, n_jobs=n_jobs, cache_dir=cache_dir)
+        k = k_selection['k']
+        kmeans = k_selection['model']
+        print(f"Selected k={k} clusters ({k_method}).")
+    else:
+        # Perform k-means clustering
+        kmeans = fit_kmeans(X_scaled, k)
+
+    clusters = pd.Series(kmeans.labels_.astype('int16'), index=features.index, name='Cluster')
 
-        # Return all the data
-        data_dict = {
-            'community_health': community_health_with_facilities,
-            'facilities': facilities_df
-        }
+    # Interpret clusters with one aggregation over every feature (missing values are skipped)
+    cluster_profiles = pd.DataFrame(X, columns=feature_cols, index=features.index, copy=False).groupby(clusters).mean()
 
-        print(f"Successfully fetched data for {len(community_health_with_facilities)} ZIP codes.")
-        return data_dict
+    # Assign descriptive labels to clusters based on their characteristics
+    cluster_labels = label_clusters(cluster_profiles)
 
-    except Exception as e:
-        print(f"Error fetching data: {e}")
-        return None
+    columns = pd.DataFrame({
+        'Cluster': clusters,
+        'CommunityProfile': pd.Categorical(clusters.map(cluster_labels)),
+    })
 
+    print("Successfully clustered communities.")
+    return columns, cluster_profiles
 
 
-def identify_healthcare_disparities(df):
+# Function to perform clustering analysis
+def cluster_communities(data, group_col=None, k=None, k_method='elbow', n_jobs=None, cache_dir=KMEANS_CACHE_DIR):
     """
-    Identify healthcare disparities across LA County communities.
+    Cluster communities by health and socioeconomic factors.
 
     Args:
-        df: DataFrame with community health data
+        data: DataFrame with community health metrics
+        group_col: Optional column (such as 'Year') to cluster each group separately
+        k: Number of clusters (chosen automatically with find_optimal_k if not given)
+        k_method: 'elbow' or 'silhouette' when choosing k automatically
+        n_jobs: Number of worker processes for the k sweep
+        cache_dir: Directory for cached k selection results (None disables the on-disk cache)
 
     Returns:
-        DataFrame: Dataset with disparity metrics
+        tuple: (Dataset with cluster assignments, DataFrame of cluster profiles)
     """
+    features = FeatureMatrix.from_frame(data, CLUSTER_FEATURES)
+    groups = data[group_col] if group_col is not None else None
+    columns, cluster_profiles = compute_cluster_columns(features, groups, k, k_method, n_jobs, cache_dir)
+    return pd.concat([data, columns], axis=1), cluster_profiles
 
-    print("Identifying healthcare disparities...")
 
-    # Create a copy to avoid modifying the original
-    df = df.copy()
+# Function to label clusters from their profiles
+def label_clusters(cluster_profiles, rules=None, default_label=DEFAULT_CLUSTER_LABEL, group_level=None):
+    """
+    Assign descriptive labels to clusters based on their characteristics.
 
-    # Create a healthcare disparity index
-    # Normalize factors to 0-100 scale (higher = worse disparity)
+    Every rule is evaluated as a boolean mask over all clusters at once and
+    the first matching rule wins, so the cost grows with the number of
+    rules rather than the number of clusters.
 
-    # Health outcomes (higher = worse)
-    health_factors = [
-        'DiabetesPrevalence',
-        'HeartDiseasePrevalence',
-        'AsthmaPrevalence',
-        'HypertensionPrevalence',
-        'ObesityPrevalence',
-        'MentalHealthDisordersPrevalence'
-    ]
+    Args:
+        cluster_profiles: DataFrame of mean feature values indexed by cluster
+        rules: List of (label, conditions) pairs (defaults to CLUSTER_LABEL_RULES)
+        default_label: Label for clusters that match no rule
+        group_level: Optional index level (such as 'Year') whose clusters are compared only with each other
 
-    # Access barriers (higher = worse)
-    access_factors = [
-        'PercentNoRegularCheckup',
-        'PercentDelayedCare',
-        'PercentNoTransportation',
-        'AvgDistanceToHospital',
-        'AvgDistanceToClinic'
-    ]
+    Returns:
+        dict: Label for each cluster
+    """
+    if rules is None:
+        rules = CLUSTER_LABEL_RULES
 
-    # Environmental factors (higher = worse, except WaterQualityIndex and GreenSpaceAccess)
-    env_factors = [
-        'AirPollutionIndex',
-        'FoodDesertScore',
-        'CalEnviroScreenScore'
-    ]
+    comparisons = {'>': np.greater, '<': np.less, '>=': np.greater_equal, '<=': np.less_equal}
 
-    # Protective factors (higher = better)
-    protective_factors = [
-        'WaterQualityIndex',
-        'GreenSpaceAccess',
-        'FacilitiesPer10k',
-        'PublicTransitAccessScore'
-    ]
+    masks = []
+    for _, conditions in rules:
+        mask = np.ones(len(cluster_profiles), dtype=bool)
+        for feature, comparison, statistic in conditions:
+            if group_level is None:
+                reference = cluster_profiles[feature].agg(statistic)
+            else:
+                reference = cluster_profiles.groupby(level=group_level)[feature].transform(statistic).to_numpy()
+            mask &= comparisons[comparison](cluster_profiles[feature].to_numpy(), reference)
+        masks.append(mask)
 
-    # Normalized versions of each metric
-    scaler = StandardScaler()
+    labels = np.select(masks, [label for label, _ in rules], default=default_label)
+    return dict(zip(cluster_profiles.index, labels.tolist()))
 
-    # For factors where higher values indicate worse outcomes
-    for factors in [health_factors, access_factors, env_factors]:
-        factor_cols = [col for col in factors if col in df.columns]
-        if factor_cols:
-            normalized_vals = scaler.fit_transform(df[factor_cols])
-            for i, col in enumerate(factor_cols):
-                df[f"{col}_normalized"] = normalized_vals[:, i]
-
-    # For factors where higher values indicate better outcomes (invert the scale)
-    protective_cols = [col for col in protective_factors if col in df.columns]
-    if protective_cols:
-        normalized_vals = -1 * scaler.fit_transform(df[protective_cols])
-        for i, col in enumerate(protective_cols):
-            df[f"{col}_normalized"] = normalized_vals[:, i]
 
-    # Calculate a composite healthcare disparity index
-    # Weighted average of all normalized factors
-    health_norm_cols = [f"{col}_normalized" for col in health_factors if col in df.columns]
-    access_norm_cols = [f"{col}_normalized" for col in access_factors if col in df.columns]
-    env_norm_cols = [f"{col}_normalized" for col in env_factors if col in df.columns]
-    protective_norm_cols = [f"{col}_normalized" for col in protective_factors if col in df.columns]
-
-    df['HealthDisparityIndex'] = (
-        # Health outcomes (40% weight)
-            df[health_norm_cols].mean(axis=1) * 0.4 +
-            # Access barriers (35% weight)
-            df[access_norm_cols].mean(axis=1) * 0.35 +
-            # Environmental factors (15% weight)
-            df[env_norm_cols].mean(axis=1) * 0.15 +
-            # Protective factors (10% weight)
-            df[protective_norm_cols].mean(axis=1) * 0.1
-    )
+# Function to cluster communities out of core
+def cluster_communities_streaming(chunk_source, k=5, batch_size=10000, n_epochs=1):
+    """
+    Cluster communities with mini-batch k-means over streamed chunks.
 
-    # Normalize the index to a 0-100 scale for easier interpretation
-    min_val = df['HealthDisparityIndex'].min()
-    max_val = df['HealthDisparityIndex'].max()
-    df['HealthDisparityIndex'] = ((df['HealthDisparityIndex'] - min_val) / (max_val - min_val)) * 100
+    The full feature matrix is never held in memory: the first pass over the
+    chunks accumulates running means and variances, the next n_epochs passes
+    fit MiniBatchKMeans in batches of batch_size, and the returned generator
+    makes one more pass assigning Cluster and CommunityProfile chunk by chunk.
+    Cluster profiles come from the fitted centers mapped back to the original
+    feature scale (the mean of each cluster's members).
 
-    # Classify communities by disparity level
-    df['DisparityLevel'] = pd.qcut(
-        df['HealthDisparityIndex'],
-        q=5,
-        labels=['Very Low', 'Low', 'Moderate', 'High', 'Very High']
-    )
+    Args:
+        chunk_source: Callable returning a fresh iterator of DataFrame chunks
+            (for example lambda: iter_community_health_chunks(connection))
+        k: Number of clusters
+        batch_size: Rows per mini-batch
+        n_epochs: Number of fitting passes over the data
 
-    print("Successfully identified healthcare disparities.")
-    return df
+    Returns:
+        tuple: (generator of labeled chunks, DataFrame of cluster profiles)
+    """
+    print("Clustering communities from streamed chunks...")
 
+    feature_cols = None
+    scaler = StandardScaler()
 
-# Function to perform clustering analysis
-def cluster_communities(data):
-    """
-    Cluster communities by health and socioeconomic factors.
+    # Pass 1: running statistics for standardization (NaNs are ignored)
+    for chunk in chunk_source():
+        if feature_cols is None:
+            feature_cols = [col for col in CLUSTER_FEATURES if col in chunk.columns]
+        scaler.partial_fit(chunk[feature_cols].to_numpy(dtype='float64'))
+
+    def scaled_features(chunk):
+        X = chunk[feature_cols].to_numpy(dtype='float64')
+        # Handle any missing values with the running means
+        X = np.where(np.isnan(X), scaler.mean_, X)
+        return scaler.transform(X)
+
+    # Fitting passes: one partial_fit per mini-batch
+    kmeans = MiniBatchKMeans(n_clusters=k, batch_size=batch_size, random_state=42, n_init=3)
+    for _ in range(n_epochs):
+        for chunk in chunk_source():
+            X_scaled = scaled_features(chunk)
+            for start in range(0, len(X_scaled), batch_size):
+                batch = X_scaled[start:start + batch_size]
+                # The first batch initializes the centers, so it needs at least k rows
+                if len(batch) >= k or hasattr(kmeans, 'cluster_centers_'):
+                    kmeans.partial_fit(batch)
 
-    Args:
-        data: DataFrame with community health metrics
+    # Interpret clusters
+    cluster_profiles = pd.DataFrame(
+        scaler.inverse_transform(kmeans.cluster_centers_), columns=feature_cols
+    )
+    cluster_profiles.index.name = 'Cluster'
+    cluster_labels = label_clusters(cluster_profiles)
 
-    Returns:
-        DataFrame: Dataset with cluster assignments
-    """
-    print("Clustering communities by health and socioeconomic factors...")
+    def labeled_chunks():
+        # Final pass: assign clusters and profiles chunk by chunk
+        for chunk in chunk_source():
+            chunk['Cluster'] = kmeans.predict(scaled_features(chunk))
+            chunk['CommunityProfile'] = chunk['Cluster'].map(cluster_labels)
+            yield chunk
 
-    df = data.copy()
+    print("Successfully fit streaming clusters.")
+    return labeled_chunks(), cluster_profiles
 
-    # Features for clustering
-    feature_cols = [
-        'MedianIncome', 'PercentMinority', 'PercentPoverty', 'PercentUninsured',
-        'DiabetesPrevalence', 'HeartDiseasePrevalence', 'AsthmaPrevalence',
-        'ObesityPrevalence', 'LifeExpectancy', 'AirPollutionIndex',
-        'FoodDesertScore', 'FacilitiesPer10k'
-    ]
 
-    # Ensure all features are present
-    feature_cols = [col for col in feature_cols if col in df.columns]
+# Income quartile labels, from lowest to highest
+INCOME_GROUP_LABELS = ['Low Income', 'Lower-Middle Income', 'Upper-Middle Income', 'High Income']
 
-    # Prepare data for clustering
-    X = df[feature_cols].copy()
+# Dimensions of the summary cube
+SUMMARY_DIMENSIONS = ['IncomeGroup', 'CommunityProfile']
 
-    # Handle any missing values
-    X = X.fillna(X.mean())
+# Per-group means needed by the insights and charts
+SUMMARY_COLUMNS = [
+    'DiabetesPrevalence', 'HeartDiseasePrevalence', 'AsthmaPrevalence', 'HypertensionPrevalence',
+    'ObesityPrevalence', 'LifeExpectancy', 'PercentNoRegularCheckup', 'PercentDelayedCare',
+    'PercentNoTransportation', 'AvgDistanceToHospital', 'AirPollutionIndex', 'WaterQualityIndex',
+    'FoodDesertScore', 'GreenSpaceAccess', 'FacilityAccessScore'
+]
 
-    # Scale features
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
 
-    # Determine optimal number of clusters using the elbow method
-    inertia = []
-    k_range = range(2, 11)
-    for k in k_range:
-        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-        kmeans.fit(X_scaled)
-        inertia.append(kmeans.inertia_)
+# Function to group communities into income quartiles
+def assign_income_groups(data, by=None):
+    """
+    Group communities into income quartiles.
 
-    # Choose k=5 for simplicity
+    Args:
+        data: DataFrame with MedianIncome
+        by: Column to cut quartiles within (e.g. 'Year'), or None to cut across all rows
 
-    k = 5
+    Returns:
+        Series: Ordered categorical IncomeGroup for each row
+    """
+    if by is None:
+        return pd.qcut(data['MedianIncome'], q=4, labels=INCOME_GROUP_LABELS)
 
-    # Perform k-means clustering
-    kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-    df['Cluster'] = kmeans.fit_predict(X_scaled)
+    codes = data.groupby(by, observed=True)['MedianIncome'].transform(lambda income: pd.qcut(income, q=4, labels=False))
+    groups = pd.Categorical.from_codes(codes.fillna(-1).astype('int8'), categories=INCOME_GROUP_LABELS, ordered=True)
+    return pd.Series(groups, index=data.index, name='MedianIncome')
 
-    # Interpret clusters
-    cluster_profiles = pd.DataFrame()
-    for col in feature_cols:
-        cluster_profiles[col] = df.groupby('Cluster')[col].mean()
 
-    # Assign descriptive labels to clusters based on their characteristics
-    cluster_labels = {}
+# Function to compute healthcare facilities per 10,000 residents
+def facility_access_score(data):
+    """
+    Compute healthcare facilities per 10,000 residents.
 
-    for cluster in range(k):
-        profile = cluster_profiles.loc[cluster]
+    Args:
+        data: DataFrame with TotalPopulation and TotalFacilities
 
-        # High income, good health outcomes
-        if profile['MedianIncome'] > cluster_profiles['MedianIncome'].median() and profile['LifeExpectancy'] > \
-                cluster_profiles['LifeExpectancy'].median():
-            label = "High Resource / Good Health"
+    Returns:
+        Series: FacilityAccessScore for each row
+    """
+    return ((10000 / data['TotalPopulation']) * data['TotalFacilities']).astype('float32')
 
-        # Low income, high minority, poor health outcomes
-        elif profile['MedianIncome'] < cluster_profiles['MedianIncome'].median() and profile['PercentMinority'] > \
-                cluster_profiles['PercentMinority'].median() and profile['DiabetesPrevalence'] > cluster_profiles[
-            'DiabetesPrevalence'].median():
-            label = "Underserved / Poor Health"
 
-        # Low income, high environmental concerns
-        elif profile['MedianIncome'] < cluster_profiles['MedianIncome'].median() and profile['AirPollutionIndex'] > \
-                cluster_profiles['AirPollutionIndex'].median():
-            label = "Environmental Justice Concerns"
+# Function to build the per-group summary shared by insights and charts
+def build_summary_cube(data):
+    """
+    Compute every per-group mean used by the insights and charts in one pass.
 
-        # Moderate income, food access issues
-        elif profile['MedianIncome'] > cluster_profiles['MedianIncome'].min() and profile['FoodDesertScore'] > \
-                cluster_profiles['FoodDesertScore'].median():
-            label = "Food Access Challenges"
+    The frame is grouped once by all summary dimensions into per-cell sums
+    and counts, and each dimension's means are rolled up from those cells.
+    IncomeGroup and FacilityAccessScore are derived when missing, without
+    modifying the input frame.
 
-        # Other communities
-        else:
-            label = "Mixed Resources / Average Health"
+    Args:
+        data: DataFrame with analysis results
 
-        cluster_labels[cluster] = label
+    Returns:
+        dict: DataFrame of means for each dimension, indexed by group
+    """
+    frame = data[[col for col in SUMMARY_COLUMNS if col in data.columns]].astype('float64')
+    if 'FacilityAccessScore' not in frame.columns and 'TotalFacilities' in data.columns:
+        frame['FacilityAccessScore'] = facility_access_score(data)
+    frame['IncomeGroup'] = data['IncomeGroup'] if 'IncomeGroup' in data.columns else assign_income_groups(data)
+    dimensions = ['IncomeGroup'] + [dim for dim in SUMMARY_DIMENSIONS[1:] if dim in data.columns]
+    for dim in dimensions[1:]:
+        frame[dim] = data[dim]
 
-    # Add descriptive labels to the dataset
-    df['CommunityProfile'] = df['Cluster'].map(cluster_labels)
+    cells = frame.groupby(dimensions, observed=True).agg(['sum', 'count'])
 
-    print("Successfully clustered communities.")
-    return df, cluster_profiles
+    cube = {}
+    for dim in dimensions:
+        totals = cells.groupby(level=dim, observed=True).sum()
+        cube[dim] = totals.xs('sum', axis=1, level=1) / totals.xs('count', axis=1, level=1)
+    return cube
 
 
 # Function to generate key insights
-def generate_insights(data):
+def generate_insights(data, cube=None):
     """
     Generate key insights from the analysis.
 
     Args:
         data: DataFrame with analysis results
+        cube: Summary from build_summary_cube (computed from data when omitted)
 
     Returns:
         list: List of key insights as text
     """
     print("Generating insights from the analysis...")
 
+    if cube is None:
+        cube = build_summary_cube(data)
+    by_income = cube['IncomeGroup']
+
     insights = []
 
     # Most underserved areas
@@ -369,49 +2900,34 @@ def generate_insights(data):
         insights.append(insight)
 
     # Relationship between income and health outcomes
-    income_groups = pd.qcut(data['MedianIncome'], q=4,
-                            labels=['Low Income', 'Lower-Middle Income', 'Upper-Middle Income', 'High Income'])
-    data['IncomeGroup'] = income_groups
-
-    income_health = data.groupby('IncomeGroup')[
-        ['DiabetesPrevalence', 'HeartDiseasePrevalence', 'LifeExpectancy']].mean()
-
-    diabetes_diff = income_health.loc['Low Income', 'DiabetesPrevalence'] - income_health.loc[
+    diabetes_diff = by_income.loc['Low Income', 'DiabetesPrevalence'] - by_income.loc[
         'High Income', 'DiabetesPrevalence']
-    heart_diff = income_health.loc['Low Income', 'HeartDiseasePrevalence'] - income_health.loc[
+    heart_diff = by_income.loc['Low Income', 'HeartDiseasePrevalence'] - by_income.loc[
         'High Income', 'HeartDiseasePrevalence']
-    life_exp_diff = income_health.loc['High Income', 'LifeExpectancy'] - income_health.loc[
+    life_exp_diff = by_income.loc['High Income', 'LifeExpectancy'] - by_income.loc[
         'Low Income', 'LifeExpectancy']
 
     insight = f"Income-related health disparities: Low-income communities have {diabetes_diff:.1f}% higher diabetes rates, {heart_diff:.1f}% higher heart disease rates, and {life_exp_diff:.1f} years shorter life expectancy compared to high-income areas."
     insights.append(insight)
 
     # Facility distribution insights
-    data['FacilityAccessScore'] = (10000 / data['TotalPopulation']) * data['TotalFacilities']
-
-    facility_by_income = data.groupby('IncomeGroup')['FacilityAccessScore'].mean()
-    high_vs_low = facility_by_income['High Income'] / facility_by_income['Low Income']
+    high_vs_low = by_income.loc['High Income', 'FacilityAccessScore'] / by_income.loc['Low Income', 'FacilityAccessScore']
 
     insight = f"Healthcare facility distribution: High-income areas have {high_vs_low:.1f}x more healthcare facilities per capita than low-income areas."
     insights.append(insight)
 
     # Environmental health insights
-    env_by_income = data.groupby('IncomeGroup')[['AirPollutionIndex', 'FoodDesertScore']].mean()
-
-    air_diff = env_by_income.loc['Low Income', 'AirPollutionIndex'] - env_by_income.loc[
+    air_diff = by_income.loc['Low Income', 'AirPollutionIndex'] - by_income.loc[
         'High Income', 'AirPollutionIndex']
-    food_diff = env_by_income.loc['Low Income', 'FoodDesertScore'] - env_by_income.loc['High Income', 'FoodDesertScore']
+    food_diff = by_income.loc['Low Income', 'FoodDesertScore'] - by_income.loc['High Income', 'FoodDesertScore']
 
     insight = f"Environmental justice concerns: Low-income communities face {air_diff:.1f}% higher air pollution levels and {food_diff:.1f}% worse food access compared to high-income areas."
     insights.append(insight)
 
     # Healthcare access insights
-    access_by_income = data.groupby('IncomeGroup')[
-        ['PercentNoRegularCheckup', 'PercentDelayedCare', 'AvgDistanceToHospital']].mean()
-
-    checkup_diff = access_by_income.loc['Low Income', 'PercentNoRegularCheckup'] - access_by_income.loc[
+    checkup_diff = by_income.loc['Low Income', 'PercentNoRegularCheckup'] - by_income.loc[
         'High Income', 'PercentNoRegularCheckup']
-    delay_diff = access_by_income.loc['Low Income', 'PercentDelayedCare'] - access_by_income.loc[
+    delay_diff = by_income.loc['Low Income', 'PercentDelayedCare'] - by_income.loc[
         'High Income', 'PercentDelayedCare']
 
     insight = f"Healthcare access barriers: Residents in low-income areas are {checkup_diff:.1f}% more likely to skip regular checkups and {delay_diff:.1f}% more likely to delay needed care compared to high-income areas."
@@ -421,49 +2937,47 @@ def generate_insights(data):
     return insights
 
 
-# Function to create visualizations for analysis
-def create_visualizations(data, output_dir):
+# Chart drawing functions take an Axes and the chart's input data, so they
+# can run in worker processes without the pyplot state machine
+
+# Function to draw the disparity index against income
+def draw_disparity_by_income(ax, chart_data):
     """
-    Create visualizations for health disparities analysis.
+    Draw the Health Disparity Index against median income.
 
     Args:
-        data: DataFrame with analysis results
-        output_dir: Directory to save visualizations
+        ax: Matplotlib Axes to draw on
+        chart_data: DataFrame with MedianIncome, HealthDisparityIndex, DisparityLevel and TotalPopulation
     """
-    print("Creating visualizations...")
-
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-
-    # 1. Health Disparity Index by Income
-    plt.figure(figsize=(12, 8))
     sns.scatterplot(
-        data=data,
+        data=chart_data,
         x='MedianIncome',
         y='HealthDisparityIndex',
         hue='DisparityLevel',
         size='TotalPopulation',
         sizes=(50, 500),
-        alpha=0.7
+        alpha=0.7,
+        ax=ax
     )
-    plt.title('Health Disparity Index vs. Median Income')
-    plt.xlabel('Median Income ($)')
-    plt.ylabel('Health Disparity Index (Higher = Worse)')
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, '1_disparity_by_income.png'), dpi=300)
-    plt.close()
-
-    # 2. Chronic Disease Rates by Community Profile
-    plt.figure(figsize=(14, 10))
-    disease_vars = ['DiabetesPrevalence', 'HeartDiseasePrevalence', 'AsthmaPrevalence', 'HypertensionPrevalence',
-                    'ObesityPrevalence']
-    disease_data = data.groupby('CommunityProfile')[disease_vars].mean().reset_index()
+    ax.set_title('Health Disparity Index vs. Median Income')
+    ax.set_xlabel('Median Income ($)')
+    ax.set_ylabel('Health Disparity Index (Higher = Worse)')
+    ax.grid(True, alpha=0.3)
+
 
+# Function to draw chronic disease rates by community profile
+def draw_disease_by_profile(ax, chart_data):
+    """
+    Draw chronic disease rates by community profile.
+
+    Args:
+        ax: Matplotlib Axes to draw on
+        chart_data: Mean disease prevalence indexed by CommunityProfile
+    """
     disease_data_melted = pd.melt(
-        disease_data,
+        chart_data.reset_index(),
         id_vars=['CommunityProfile'],
-        value_vars=disease_vars,
+        value_vars=list(chart_data.columns),
         var_name='Disease',
         value_name='Prevalence'
     )
@@ -475,27 +2989,32 @@ def create_visualizations(data, output_dir):
         data=disease_data_melted,
         x='CommunityProfile',
         y='Prevalence',
-        hue='Disease'
+        hue='Disease',
+        ax=ax
     )
-    plt.title('Chronic Disease Rates by Community Profile')
-    plt.xlabel('Community Profile')
-    plt.ylabel('Prevalence (%)')
-    plt.xticks(rotation=45, ha='right')
-    plt.legend(title='Disease')
-    plt.grid(True, alpha=0.3, axis='y')
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, '2_disease_by_profile.png'), dpi=300)
-    plt.close()
-
-    # 3. Healthcare Access Barriers by Community Profile
-    plt.figure(figsize=(14, 10))
-    access_vars = ['PercentNoRegularCheckup', 'PercentDelayedCare', 'PercentNoTransportation', 'AvgDistanceToHospital']
-    access_data = data.groupby('CommunityProfile')[access_vars].mean().reset_index()
+    ax.set_title('Chronic Disease Rates by Community Profile')
+    ax.set_xlabel('Community Profile')
+    ax.set_ylabel('Prevalence (%)')
+    for label in ax.get_xticklabels():
+        label.set_rotation(45)
+        label.set_horizontalalignment('right')
+    ax.legend(title='Disease')
+    ax.grid(True, alpha=0.3, axis='y')
+
+
+# Function to draw healthcare access barriers by community profile
+def draw_access_barriers(ax, chart_data):
+    """
+    Draw healthcare access barriers by community profile.
 
+    Args:
+        ax: Matplotlib Axes to draw on
+        chart_data: Mean access barriers indexed by CommunityProfile
+    """
     access_data_melted = pd.melt(
-        access_data,
+        chart_data.reset_index(),
         id_vars=['CommunityProfile'],
-        value_vars=access_vars,
+        value_vars=list(chart_data.columns),
         var_name='Barrier',
         value_name='Value'
     )
@@ -513,65 +3032,75 @@ def create_visualizations(data, output_dir):
         data=access_data_melted,
         x='CommunityProfile',
         y='Value',
-        hue='Barrier'
+        hue='Barrier',
+        ax=ax
     )
-    plt.title('Healthcare Access Barriers by Community Profile')
-    plt.xlabel('Community Profile')
-    plt.ylabel('Value')
-    plt.xticks(rotation=45, ha='right')
-    plt.legend(title='Barrier')
-    plt.grid(True, alpha=0.3, axis='y')
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, '3_access_barriers.png'), dpi=300)
-    plt.close()
-
-    # 4. Life Expectancy vs. Healthcare Facilities
-    plt.figure(figsize=(12, 8))
+    ax.set_title('Healthcare Access Barriers by Community Profile')
+    ax.set_xlabel('Community Profile')
+    ax.set_ylabel('Value')
+    for label in ax.get_xticklabels():
+        label.set_rotation(45)
+        label.set_horizontalalignment('right')
+    ax.legend(title='Barrier')
+    ax.grid(True, alpha=0.3, axis='y')
+
+
+# Function to draw life expectancy against facility density
+def draw_life_expectancy_facilities(ax, chart_data):
+    """
+    Draw life expectancy against healthcare facilities per 10,000 residents.
+
+    Args:
+        ax: Matplotlib Axes to draw on
+        chart_data: DataFrame with FacilitiesPer10k, LifeExpectancy, IncomeGroup and TotalPopulation
+    """
     sns.scatterplot(
-        data=data,
+        data=chart_data,
         x='FacilitiesPer10k',
         y='LifeExpectancy',
         hue='IncomeGroup',
         size='TotalPopulation',
         sizes=(50, 500),
-        alpha=0.7
+        alpha=0.7,
+        ax=ax
     )
-    plt.title('Life Expectancy vs. Healthcare Facilities Per 10,000 Residents')
-    plt.xlabel('Healthcare Facilities Per 10,000 Residents')
-    plt.ylabel('Life Expectancy (Years)')
-    plt.grid(True, alpha=0.3)
+    ax.set_title('Life Expectancy vs. Healthcare Facilities Per 10,000 Residents')
+    ax.set_xlabel('Healthcare Facilities Per 10,000 Residents')
+    ax.set_ylabel('Life Expectancy (Years)')
+    ax.grid(True, alpha=0.3)
 
     # Add regression line
     sns.regplot(
-        data=data,
+        data=chart_data,
         x='FacilitiesPer10k',
         y='LifeExpectancy',
         scatter=False,
-        line_kws={'color': 'red', 'linestyle': '--'}
+        line_kws={'color': 'red', 'linestyle': '--'},
+        ax=ax
     )
 
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, '4_life_expectancy_facilities.png'), dpi=300)
-    plt.close()
 
-    # 5. Environmental Factors by Income Group
-    plt.figure(figsize=(12, 8))
-    env_vars = ['AirPollutionIndex', 'WaterQualityIndex', 'FoodDesertScore', 'GreenSpaceAccess']
-    env_data = data.groupby('IncomeGroup')[env_vars].mean().reset_index()
+# Function to draw environmental factors by income group
+def draw_environmental_factors(ax, chart_data):
+    """
+    Draw environmental factors by income group.
 
+    Args:
+        ax: Matplotlib Axes to draw on
+        chart_data: Mean environmental scores indexed by IncomeGroup
+    """
     env_data_melted = pd.melt(
-        env_data,
+        chart_data.reset_index(),
         id_vars=['IncomeGroup'],
-        value_vars=env_vars,
+        value_vars=list(chart_data.columns),
         var_name='Environmental Factor',
         value_name='Score'
     )
 
     # Adjust order of income groups
-    income_order = ['Low Income', 'Lower-Middle Income', 'Upper-Middle Income', 'High Income']
     env_data_melted['IncomeGroup'] = pd.Categorical(
         env_data_melted['IncomeGroup'],
-        categories=income_order,
+        categories=INCOME_GROUP_LABELS,
         ordered=True
     )
 
@@ -579,57 +3108,764 @@ def create_visualizations(data, output_dir):
         data=env_data_melted,
         x='IncomeGroup',
         y='Score',
-        hue='Environmental Factor'
+        hue='Environmental Factor',
+        ax=ax
     )
-    plt.title('Environmental Factors by Income Group')
-    plt.xlabel('Income Group')
-    plt.ylabel('Score')
-    plt.grid(True, alpha=0.3, axis='y')
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, '5_environmental_factors.png'), dpi=300)
-    plt.close()
+    ax.set_title('Environmental Factors by Income Group')
+    ax.set_xlabel('Income Group')
+    ax.set_ylabel('Score')
+    ax.grid(True, alpha=0.3, axis='y')
+
+
+# Charts drawn by create_visualizations: (file name, draw function, figure size)
+CHART_SPECS = [
+    ('1_disparity_by_income.png', draw_disparity_by_income, (12, 8)),
+    ('2_disease_by_profile.png', draw_disease_by_profile, (14, 10)),
+    ('3_access_barriers.png', draw_access_barriers, (14, 10)),
+    ('4_life_expectancy_facilities.png', draw_life_expectancy_facilities, (12, 8)),
+    ('5_environmental_factors.png', draw_environmental_factors, (12, 8)),
+]
+
+# File in each output directory recording the cache key of every rendered chart
+RENDER_MANIFEST = '.render_cache.json'
+
+
+# Function to collect the input data of every chart
+def chart_inputs(data, cube):
+    """
+    Collect the (small) input DataFrame each chart is drawn from.
+
+    Args:
+        data: DataFrame with analysis results
+        cube: Summary from build_summary_cube
+
+    Returns:
+        dict: Input DataFrame for each chart file name
+    """
+    income_groups = data['IncomeGroup'] if 'IncomeGroup' in data.columns else assign_income_groups(data)
+
+    return {
+        '1_disparity_by_income.png': data[
+            ['MedianIncome', 'HealthDisparityIndex', 'DisparityLevel', 'TotalPopulation']],
+        '2_disease_by_profile.png': cube['CommunityProfile'][
+            ['DiabetesPrevalence', 'HeartDiseasePrevalence', 'AsthmaPrevalence', 'HypertensionPrevalence',
+             'ObesityPrevalence']],
+        '3_access_barriers.png': cube['CommunityProfile'][
+            ['PercentNoRegularCheckup', 'PercentDelayedCare', 'PercentNoTransportation', 'AvgDistanceToHospital']],
+        '4_life_expectancy_facilities.png': data[
+            ['FacilitiesPer10k', 'LifeExpectancy', 'TotalPopulation']].assign(IncomeGroup=income_groups),
+        '5_environmental_factors.png': cube['IncomeGroup'][
+            ['AirPollutionIndex', 'WaterQualityIndex', 'FoodDesertScore', 'GreenSpaceAccess']],
+    }
+
+
+# Function to compute the render cache key of a chart
+def chart_cache_key(chart_data, params):
+    """
+    Hash a chart's input data together with its rendering parameters.
+
+    Args:
+        chart_data: Input DataFrame of the chart
+        params: Rendering parameters (file name, figure size, dpi)
+
+    Returns:
+        str: Hex digest identifying the rendered image
+    """
+    row_hashes = pd.util.hash_pandas_object(chart_data, index=True).to_numpy()
+    return hashlib.sha256(
+        row_hashes.tobytes() + repr((list(chart_data.columns), params)).encode()
+    ).hexdigest()
+
+
+# Function to render one chart (module level so worker processes can pickle it)
+def render_chart(filename, chart_data, output_dir, figsize, dpi):
+    """
+    Draw one chart on its own Figure and save it as a PNG.
+
+    Args:
+        filename: Chart file name (selects the draw function)
+        chart_data: Input DataFrame of the chart
+        output_dir: Directory to save the chart in
+        figsize: Figure size in inches
+        dpi: Output resolution
+
+    Returns:
+        float: Render time in seconds
+    """
+    start = time.perf_counter()
+    draw = {name: draw_fn for name, draw_fn, _ in CHART_SPECS}[filename]
+
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    draw(ax, chart_data)
+    fig.tight_layout()
+    fig.savefig(os.path.join(output_dir, filename), dpi=dpi)
+
+    return time.perf_counter() - start
+
+
+# Function to create visualizations for analysis
+def create_visualizations(data, output_dir, cube=None, n_jobs=None, dpi=300):
+    """
+    Create visualizations for health disparities analysis.
+
+    Each chart is drawn in its own worker process. A chart is skipped when
+    its PNG already exists and was rendered from the same input data and
+    parameters, as recorded in the output directory's render manifest.
+
+    Args:
+        data: DataFrame with analysis results
+        output_dir: Directory to save visualizations
+        cube: Summary from build_summary_cube (computed from data when omitted)
+        n_jobs: Number of worker processes (defaults to the number of CPUs; 1 renders serially)
+        dpi: Output resolution
+
+    Returns:
+        dict: Render time in seconds for each chart file name (None when the cached PNG was kept)
+    """
+    print("Creating visualizations...")
+
+    # Create output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+
+    if cube is None:
+        cube = build_summary_cube(data)
+    inputs = chart_inputs(data, cube)
+
+    manifest_path = os.path.join(output_dir, RENDER_MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    # Only charts whose inputs or parameters changed (or whose PNG is missing) are redrawn
+    pending = []
+    render_times = {}
+    for filename, _, figsize in CHART_SPECS:
+        key = chart_cache_key(inputs[filename], (filename, figsize, dpi))
+        if manifest.get(filename) == key and os.path.exists(os.path.join(output_dir, filename)):
+            render_times[filename] = None
+        else:
+            manifest.pop(filename, None)
+            pending.append((filename, figsize, key))
+
+    if pending:
+        names = [filename for filename, _, _ in pending]
+        args = (names, [inputs[name] for name in names], repeat(output_dir),
+                [figsize for _, figsize, _ in pending], repeat(dpi))
+        if n_jobs == 1 or len(pending) == 1:
+            seconds = list(map(render_chart, *args))
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                seconds = list(pool.map(render_chart, *args))
+
+        for (filename, _, key), elapsed in zip(pending, seconds):
+            render_times[filename] = elapsed
+            manifest[filename] = key
+
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    for filename, _, _ in CHART_SPECS:
+        elapsed = render_times[filename]
+        print(f"  {filename}: " + ("unchanged, kept cached image" if elapsed is None else f"rendered in {elapsed:.2f}s"))
 
     print(f"Successfully created visualizations in {output_dir}.")
+    return render_times
+
+
+# Columns written as dictionary-encoded categoricals in columnar exports
+COLUMNAR_CATEGORY_COLUMNS = ['DisparityLevel', 'CommunityProfile', 'IncomeGroup']
+
+# Columnar export formats and their file extensions
+COLUMNAR_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+
+# Function to prepare a frame for columnar export
+def prepare_columnar(df, columns=None):
+    """
+    Prune and compact a frame for columnar export.
+
+    Label columns become categoricals (written dictionary-encoded) and
+    float64 columns are stored as float32, which is ample precision for
+    rates, indices and incomes.
+
+    Args:
+        df: DataFrame to export
+        columns: Columns to keep (defaults to all)
+
+    Returns:
+        DataFrame: Compacted copy of the selected columns
+    """
+    out = df[list(columns)] if columns is not None else df
+    dtypes = {col: 'float32' for col in out.columns if out[col].dtype == 'float64'}
+    dtypes.update({col: 'category' for col in COLUMNAR_CATEGORY_COLUMNS
+                   if col in out.columns and not isinstance(out[col].dtype, pd.CategoricalDtype)})
+    return out.astype(dtypes)
+
+
+# Function to write a frame as Parquet or Arrow
+def export_columnar(df, path, columns=None, fmt='parquet'):
+    """
+    Write a frame as Parquet or as an Arrow IPC file (requires pyarrow).
+
+    Parquet is the compact choice for PowerBI. Arrow files are written
+    uncompressed so Python consumers can memory-map them, e.g. with
+    pyarrow.ipc.open_file(pyarrow.memory_map(path)).
+
+    Args:
+        df: DataFrame to export
+        path: Output file path
+        columns: Columns to keep (defaults to all)
+        fmt: 'parquet' or 'arrow'
+
+    Returns:
+        str: Path of the written file
+    """
+    out = prepare_columnar(df, columns).reset_index(drop=True)
+
+    if fmt == 'parquet':
+        out.to_parquet(path, engine='pyarrow', index=False)
+    elif fmt == 'arrow':
+        out.to_feather(path, compression='uncompressed')
+    else:
+        raise ValueError(f"Unknown columnar format: {fmt}")
+
+    return path
+
+
+# Root directory of the partitioned output store
+OUTPUT_STORE_DIR = 'output_store'
+
+# Year that CommunityHealthView reports (used to partition single-year runs)
+COMMUNITY_HEALTH_VIEW_YEAR = 2023
+
+
+# Function to make a unique, time-ordered run id
+def new_run_id():
+    """
+    Make a run id that sorts by start time and is unique across concurrent runs.
+
+    Returns:
+        str: Run id such as '20250301T120000Z-1a2b3c4d'
+    """
+    return time.strftime('%Y%m%dT%H%M%SZ', time.gmtime()) + '-' + uuid.uuid4().hex[:8]
+
+
+# Function to replace a file atomically
+@contextmanager
+def atomic_path(path):
+    """
+    Yield a temporary path that replaces path only if the write completes.
+
+    Args:
+        path: Final file path
+
+    Yields:
+        str: Temporary path in the same directory to write to
+    """
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# Class for the partitioned, append-only output store
+class OutputStore:
+    """
+    Append-only store of analysis outputs partitioned by year and run id.
+
+    Each partition is written to a staging directory and renamed into
+    place only once it is complete, then recorded in manifest.json.
+    Readers should locate partitions through the manifest, which lists
+    complete partitions only, so concurrent runs (such as backfills of
+    several years) never expose half-written files.
+
+    Layout:
+        <root>/year=<year>/run=<run_id>/   one complete partition
+        <root>/manifest.json               complete partitions and the latest one per year
+    """
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, root=OUTPUT_STORE_DIR, lock_timeout=60):
+        """
+        Args:
+            root: Root directory of the store
+            lock_timeout: Seconds to wait for the manifest lock
+        """
+        self.root = root
+        self.lock_timeout = lock_timeout
+
+    def partition_path(self, year, run_id):
+        """Path of the partition for a year and run id."""
+        return os.path.join(self.root, f"year={year}", f"run={run_id}")
+
+    @contextmanager
+    def write_partition(self, year, run_id):
+        """
+        Yield a staging directory that becomes the partition once the block completes.
+
+        If the block raises, the staging directory is removed and nothing is
+        recorded.
+
+        Args:
+            year: Year of the partition
+            run_id: Run id from new_run_id()
+
+        Yields:
+            str: Staging directory to write the partition's files into
+        """
+        final_path = self.partition_path(year, run_id)
+        if os.path.exists(final_path):
+            raise FileExistsError(f"Partition already exists: {final_path}")
+
+        # Staging lives under the root so the final rename stays on one filesystem
+        staging_path = os.path.join(self.root, '.staging', f"year={year}-run={run_id}")
+        os.makedirs(staging_path)
+        try:
+            yield staging_path
+        except BaseException:
+            shutil.rmtree(staging_path, ignore_errors=True)
+            raise
+
+        files = sorted(
+            os.path.relpath(os.path.join(dirpath, name), staging_path)
+            for dirpath, _, names in os.walk(staging_path) for name in names
+        )
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.rename(staging_path, final_path)
+        self._record(year, run_id, files)
+
+    def read_manifest(self):
+        """
+        Read the manifest of complete partitions.
+
+        Returns:
+            dict: 'partitions' (one entry per complete partition) and 'latest' (partition path per year)
+        """
+        manifest_path = os.path.join(self.root, self.MANIFEST)
+        if not os.path.exists(manifest_path):
+            return {'partitions': [], 'latest': {}}
+        with open(manifest_path) as f:
+            return json.load(f)
+
+    def latest_partition(self, year=None):
+        """
+        Locate the most recently completed partition.
+
+        Args:
+            year: Year to look up (defaults to the most recent year in the store)
+
+        Returns:
+            str: Path of the partition, or None if the store has none
+        """
+        latest = self.read_manifest()['latest']
+        if not latest:
+            return None
+        key = str(year) if year is not None else max(latest, key=int)
+        return os.path.join(self.root, latest[key]) if key in latest else None
+
+    @contextmanager
+    def _manifest_lock(self):
+        # An exclusively created lock file serializes manifest updates across processes
+        lock_path = os.path.join(self.root, self.MANIFEST + '.lock')
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for {lock_path}")
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.remove(lock_path)
+
+    def _record(self, year, run_id, files):
+        relative_path = os.path.relpath(self.partition_path(year, run_id), self.root)
+        with self._manifest_lock():
+            manifest = self.read_manifest()
+            manifest['partitions'].append({
+                'year': int(year),
+                'run_id': run_id,
+                'path': relative_path,
+                'completed_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'files': files,
+            })
+            manifest['latest'][str(year)] = relative_path
+
+            with atomic_path(os.path.join(self.root, self.MANIFEST)) as tmp_path:
+                with open(tmp_path, 'w') as f:
+                    json.dump(manifest, f, indent=2)
+
+
+# Function to write the PowerBI outputs of an analysis
+def write_outputs(output_dir, analysis, facilities, columnar_format=None, columnar_columns=None, tables=None):
+    """
+    Write the analysis and facilities tables, replacing each file atomically.
+
+    Args:
+        output_dir: Directory to write to
+        analysis: DataFrame with analysis results
+        facilities: DataFrame of healthcare facilities
+        columnar_format: Also write this columnar format ('parquet' or 'arrow')
+        columnar_columns: Analysis columns to keep in the columnar export (defaults to all)
+        tables: Optional further DataFrames to write as CSV, by file name without extension
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    with atomic_path(os.path.join(output_dir, 'la_health_disparities_analysis.csv')) as tmp_path:
+        analysis.to_csv(tmp_path, index=False)
+    with atomic_path(os.path.join(output_dir, 'healthcare_facilities.csv')) as tmp_path:
+        facilities.to_csv(tmp_path, index=False)
+    for name, table in (tables or {}).items():
+        with atomic_path(os.path.join(output_dir, name + '.csv')) as tmp_path:
+            table.to_csv(tmp_path, index=False)
+
+    # Columnar copies for faster dashboard refreshes and memory-mapped Python reads
+    if columnar_format:
+        extension = COLUMNAR_FORMATS[columnar_format]
+        with atomic_path(os.path.join(output_dir, 'la_health_disparities_analysis' + extension)) as tmp_path:
+            export_columnar(analysis, tmp_path, columns=columnar_columns, fmt=columnar_format)
+        with atomic_path(os.path.join(output_dir, 'healthcare_facilities' + extension)) as tmp_path:
+            export_columnar(facilities, tmp_path, fmt=columnar_format)
+
+
+# File that stage metrics are appended to, one JSON object per line
+STAGE_METRICS_FILE = 'stage_metrics.jsonl'
+
+
+# Function to read the peak resident set size of this process
+def peak_rss():
+    """
+    Read the peak resident set size (high-water mark) of this process.
+
+    Returns:
+        int: Peak RSS in bytes, or None if it can't be read on this platform
+    """
+    try:
+        import psutil
+        memory_info = psutil.Process().memory_info()
+        # Windows reports the peak directly
+        if hasattr(memory_info, 'peak_wset'):
+            return memory_info.peak_wset
+    except ImportError:
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        return None
+
+
+# Function to read the resource usage of finished worker processes
+def children_usage():
+    """
+    Read the CPU time and largest peak RSS of this process's finished children.
+
+    Worker processes are only counted once they have exited and been
+    reaped, which happens when a ProcessPoolExecutor is shut down.
+
+    Returns:
+        tuple: (CPU seconds, peak RSS in bytes), or (None, None) where getrusage isn't available
+    """
+    try:
+        import resource
+        import sys
+    except ImportError:
+        return None, None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # Linux reports kilobytes, macOS bytes
+    peak = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+    return usage.ru_utime + usage.ru_stime, peak
+
+
+# Class for per-stage instrumentation of a run
+class StageProfiler:
+    """
+    Measure each stage of a run and append the results as JSON lines.
+
+    Each stage records its wall time, CPU time, RSS after the stage, growth
+    of the peak RSS during the stage and the rows it processed. cpu_seconds
+    and the RSS figures cover this process only; the CPU time of worker
+    processes that exited during the stage (the k sweep and chart pools) is
+    recorded as children_cpu_seconds, and growth of the largest worker's
+    peak RSS as children_peak_rss_delta_bytes. With a
+    profile directory, every stage is also run under cProfile and its stats
+    are dumped to <profile_dir>/<run_id>-<stage>.pstats for pstats or snakeviz.
+    """
+
+    def __init__(self, run_id, metrics_path=STAGE_METRICS_FILE, profile_dir=None):
+        """
+        Args:
+            run_id: Run id from new_run_id()
+            metrics_path: File to append stage metrics to (None only logs them)
+            profile_dir: Directory for cProfile dumps (None disables profiling)
+        """
+        self.run_id = run_id
+        self.metrics_path = metrics_path
+        self.profile_dir = profile_dir
+        self.records = []
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Measure the with block as one stage.
+
+        Set the 'rows' key of the yielded dict to record the rows processed.
+
+        Args:
+            name: Stage name
+
+        Yields:
+            dict: Metrics record of the stage
+        """
+        record = {'run_id': self.run_id, 'stage': name, 'rows': None}
+        profiler = cProfile.Profile() if self.profile_dir else None
+        peak_before = peak_rss()
+        children_cpu_before, children_peak_before = children_usage()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profiler:
+            profiler.enable()
+
+        try:
+            yield record
+            record['status'] = 'ok'
+        except BaseException:
+            record['status'] = 'error'
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+            peak_after = peak_rss()
+            children_cpu_after, children_peak_after = children_usage()
+            record.update({
+                'wall_seconds': round(time.perf_counter() - wall_start, 6),
+                'cpu_seconds': round(time.process_time() - cpu_start, 6),
+                'rss_bytes': current_rss(),
+                'peak_rss_delta_bytes': None if peak_before is None else peak_after - peak_before,
+                'children_cpu_seconds': (
+                    None if children_cpu_before is None else round(children_cpu_after - children_cpu_before, 6)
+                ),
+                'children_peak_rss_delta_bytes': (
+                    None if children_peak_before is None else children_peak_after - children_peak_before
+                ),
+                'finished_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            })
+            self._emit(record, profiler)
+
+    def _emit(self, record, profiler):
+        self.records.append(record)
+        line = json.dumps(record)
+        logger.info(f"Stage metrics: {line}")
+        if self.metrics_path:
+            with open(self.metrics_path, 'a') as f:
+                f.write(line + '\n')
+        if profiler:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profiler.dump_stats(os.path.join(self.profile_dir, f"{self.run_id}-{record['stage']}.pstats"))
+
+
+# Function to parse command line options
+def parse_args(argv=None):
+    """
+    Parse command line options for the analysis.
+
+    Args:
+        argv: List of arguments (defaults to sys.argv)
+
+    Returns:
+        argparse.Namespace: Parsed options
+    """
+    parser = argparse.ArgumentParser(description="LA County Health Disparities analysis")
+    parser.add_argument('--start-year', type=int, help="First year to analyze (defaults to CommunityHealthView's year)")
+    parser.add_argument('--end-year', type=int, help="Last year to analyze (defaults to --start-year)")
+    parser.add_argument('--columnar-format', choices=sorted(COLUMNAR_FORMATS),
+                        help="Also export the PowerBI data in this columnar format")
+    parser.add_argument('--columnar-columns', type=lambda value: value.split(','),
+                        help="Comma-separated analysis columns to keep in the columnar export (defaults to all)")
+    parser.add_argument('--server', help="SQL Server host (defaults to LAHEALTH_DB_SERVER or the project server)")
+    parser.add_argument('--database', help="Database name (defaults to LAHEALTH_DB_DATABASE or LAHealthDisparities)")
+    parser.add_argument('--no-fetch-cache', action='store_true',
+                        help="Always query the database instead of reusing cached data")
+    parser.add_argument('--output-store', default=OUTPUT_STORE_DIR,
+                        help="Root directory of the partitioned output store")
+    parser.add_argument('--centroids', default=ZIP_CENTROIDS_FILE,
+                        help="Local ZIP centroid table; nearest-facility distances are computed when it exists")
+    parser.add_argument('--facility-geocodes',
+                        help="Optional table of FacilityID, Latitude and Longitude (facilities default to their ZIP centroid)")
+    parser.add_argument('--population-points',
+                        help="Optional table of ZIPCode, Latitude, Longitude and Population to average distances over")
+    parser.add_argument('--access-score', choices=sorted(ACCESS_SCORE_FACTORS), default='per_capita',
+                        help="Facility access score used in the disparity index (catchment needs the centroid table)")
+    parser.add_argument('--catchment-miles', type=float, default=CATCHMENT_MILES,
+                        help="Catchment radius of the catchment access score")
+    parser.add_argument('--bootstrap', type=int, default=0, metavar='B',
+                        help="Bootstrap the disparity index with B replicates for confidence intervals and level probabilities")
+    parser.add_argument('--sensitivity', type=int, default=0, metavar='N',
+                        help="Sweep N candidate index weightings and report how stable the rankings are "
+                             "(the cost grows with N times the number of rows)")
+    parser.add_argument('--sensitivity-top-n', type=int, default=20,
+                        help="Size of the highest-disparity list whose churn the sweep reports")
+    parser.add_argument('--sensitivity-tau-pairs', type=int, default=KENDALL_TAU_PAIRS, metavar='PAIRS',
+                        help="Row pairs each Kendall tau is computed over (exact below this many pairs, sampled above)")
+    parser.add_argument('--metrics-file', default=STAGE_METRICS_FILE,
+                        help="File to append per-stage metrics to as JSON lines")
+    parser.add_argument('--profile-dir',
+                        help="Also profile every stage with cProfile and dump the stats to this directory")
+    return parser.parse_args(argv)
 
 
 # Main function to run the analysis
-def main():
+def main(argv=None):
     """
     Main function to orchestrate the health disparities analysis.
+
+    Args:
+        argv: List of command line arguments (defaults to sys.argv)
     """
+    args = parse_args(argv)
+    years = (args.start_year, args.end_year or args.start_year) if args.start_year else None
+    group_col = 'Year' if years else None
+
     print("Starting LA County Health Disparities analysis...")
 
     # Add this line to check what functions are available
     print("Available functions:",
           [name for name in globals() if callable(globals()[name]) and name.startswith('identify')])
 
+    run_id = new_run_id()
+    profiler = StageProfiler(run_id, args.metrics_file, args.profile_dir)
+
     # Step 1: Connect to the database
-    connection = connect_to_database()
+    with profiler.stage('connect'):
+        connection = connect_to_database(server=args.server, database=args.database)
     if not connection:
         print("Failed to connect to the database. Exiting...")
         return
 
     try:
         # Step 2: Fetch data for analysis
-        data_dict = fetch_data_for_analysis(connection)
-        if not data_dict:
-            print("Failed to fetch data. Exiting...")
-            return
-
-        # Check if I got any data
-        if len(data_dict['community_health']) == 0:
-            print("No community health data found in database. Check your database tables.")
-            return
-
-        # Step 3: Identify healthcare disparities
-
-        disparity_data = identify_healthcare_disparities(data_dict['community_health'])
+        with profiler.stage('fetch') as stage:
+            data_dict = fetch_data_for_analysis(connection, include_facilities=True, years=years,
+                                                cache_dir=None if args.no_fetch_cache else FETCH_CACHE_DIR,
+                                                pool=get_pool(args.server, args.database))
+            if not data_dict:
+                print("Failed to fetch data. Exiting...")
+                return
+
+            # Check if I got any data
+            if len(data_dict['community_health']) == 0:
+                print("No community health data found in database. Check your database tables.")
+                return
+
+            # Every stage's output is held to the declared schema and its memory reported
+            community_health = enforce_schema(data_dict['community_health'])
+            memory_report('fetch', community_health)
+            stage['rows'] = len(community_health)
+
+        # Nearest hospital, ER and Medi-Cal clinic and catchment access from the local coordinate tables
+        access_score = args.access_score
+        if os.path.exists(args.centroids):
+            with profiler.stage('proximity') as stage:
+                centroids = read_coordinates(args.centroids)
+                geocodes = read_coordinates(args.facility_geocodes, 'FacilityID') if args.facility_geocodes else None
+                facilities = locate_facilities(data_dict['facilities'], centroids, geocodes)
+                if args.population_points:
+                    points = read_coordinates(args.population_points)
+                    proximity = facility_proximity(points, facilities, weight_col='Population')
+                else:
+                    # One point per ZIP code, carrying the ZIP code's population
+                    zip_populations = community_health.groupby('ZIPCode', observed=True)['TotalPopulation'].first()
+                    zip_populations.index = zip_populations.index.astype(str)
+                    points = centroids.assign(Population=centroids['ZIPCode'].map(zip_populations).fillna(0))
+                    proximity = facility_proximity(points, facilities)
+
+                catchment = catchment_access(points, facilities, radius_miles=args.catchment_miles)
+                community_health = enforce_schema(
+                    add_proximity_columns(add_proximity_columns(community_health, proximity), catchment)
+                )
+                stage['rows'] = len(points)
+        else:
+            logger.info(f"No ZIP centroid table at {args.centroids}; skipping nearest-facility distances")
+            if access_score == 'catchment':
+                logger.warning("The catchment access score needs the centroid table; using per-capita facilities")
+                access_score = 'per_capita'
+        factor_groups = disparity_factor_groups(access_score)
+
+        # The stages share one feature matrix and return only the columns they add
+        features = FeatureMatrix.from_frame(community_health, ANALYSIS_FEATURES)
+        groups = community_health[group_col] if group_col else None
+
+        # Step 3: Identify healthcare disparities (per year when a range was fetched)
+        with profiler.stage('disparities') as stage:
+            disparity_columns = compute_disparity_columns(features, groups, factor_groups)
+            memory_report('disparities', disparity_columns)
+            stage['rows'] = len(disparity_columns)
+
+        # Uncertainty of the index and of each community's disparity level
+        uncertainty_columns = None
+        if args.bootstrap:
+            with profiler.stage('uncertainty') as stage:
+                uncertainty_columns = compute_uncertainty_columns(features, groups, args.bootstrap, factor_groups)
+                memory_report('uncertainty', uncertainty_columns)
+                stage['rows'] = len(uncertainty_columns)
+
+        # Stability of the rankings under other weightings of the factor groups
+        sensitivity_columns = None
+        output_tables = {}
+        if args.sensitivity:
+            with profiler.stage('sensitivity') as stage:
+                sensitivity_columns, output_tables['weight_sensitivity'] = compute_sensitivity_columns(
+                    features, groups, args.sensitivity, args.sensitivity_top_n, factor_groups,
+                    n_tau_pairs=args.sensitivity_tau_pairs
+                )
+                stage['rows'] = len(sensitivity_columns)
 
         # Step 4: Cluster communities
-        clustered_data, cluster_profiles = cluster_communities(disparity_data)
+        with profiler.stage('clustering') as stage:
+            cluster_columns, cluster_profiles = compute_cluster_columns(features, groups)
+            memory_report('clustering', cluster_columns)
+            stage['rows'] = len(cluster_columns)
+
+        # Assemble the analysis frame once
+        with profiler.stage('assembly') as stage:
+            del features
+            stage_columns = [disparity_columns, uncertainty_columns, sensitivity_columns, cluster_columns]
+            clustered_data = enforce_schema(pd.concat(
+                [community_health] + [columns for columns in stage_columns if columns is not None], axis=1
+            ))
+            memory_report('assembly', clustered_data)
+            stage['rows'] = len(clustered_data)
 
         # Step 5: Generate insights
-        insights = generate_insights(clustered_data)
+        with profiler.stage('insights') as stage:
+            # Income groups and facility access are exported with every year, with quartiles cut within each year
+            clustered_data['IncomeGroup'] = assign_income_groups(clustered_data, by='Year' if years else None)
+            clustered_data['FacilityAccessScore'] = facility_access_score(clustered_data)
+
+            # Insights and charts describe the most recent year when a range was fetched
+            if years:
+                report_data = clustered_data[clustered_data['Year'] == clustered_data['Year'].max()].copy()
+            else:
+                report_data = clustered_data
+            memory_report('report', report_data)
+
+            # Summarize every group once for both the insights and the charts
+            summary_cube = build_summary_cube(report_data)
+            insights = generate_insights(report_data, cube=summary_cube)
+            stage['rows'] = len(report_data)
 
         # Print insights
         print("\nKey Insights from Analysis:")
@@ -638,20 +3874,40 @@ def main():
 
         # Step 6: Create visualizations
         output_dir = 'visualizations'
-        create_visualizations(clustered_data, output_dir)
+        with profiler.stage('visualizations') as stage:
+            create_visualizations(report_data, output_dir, cube=summary_cube)
+            stage['rows'] = len(report_data)
 
         # Step 7: Save processed data for PowerBI
-        # Create a directory for PowerBI data if it doesn't exist
-        powerbi_dir = 'powerbi_data'
-        os.makedirs(powerbi_dir, exist_ok=True)
-
-        # Save the processed data for PowerBI
-        clustered_data.to_csv(os.path.join(powerbi_dir, 'la_health_disparities_analysis.csv'), index=False)
-        data_dict['facilities'].to_csv(os.path.join(powerbi_dir, 'healthcare_facilities.csv'), index=False)
+        with profiler.stage('export') as stage:
+            # Each year is kept as its own partition of this run in the output store
+            store = OutputStore(args.output_store)
+            report_year = int(report_data['Year'].iloc[0]) if years else COMMUNITY_HEALTH_VIEW_YEAR
+            year_partitions = clustered_data.groupby('Year', observed=True) if years else [(report_year, clustered_data)]
+
+            for year, year_data in year_partitions:
+                year_tables = {
+                    name: table[table['Year'] == year] if 'Year' in table else table
+                    for name, table in output_tables.items()
+                }
+                with store.write_partition(year, run_id) as partition_dir:
+                    write_outputs(partition_dir, year_data, data_dict['facilities'],
+                                  args.columnar_format, args.columnar_columns, year_tables)
+                    if year == report_year:
+                        shutil.copytree(output_dir, os.path.join(partition_dir, 'visualizations'),
+                                        ignore=shutil.ignore_patterns(RENDER_MANIFEST))
+
+            # The dashboard's own directory always holds the latest complete run
+            powerbi_dir = 'powerbi_data'
+            write_outputs(powerbi_dir, clustered_data, data_dict['facilities'],
+                          args.columnar_format, args.columnar_columns, output_tables)
+            stage['rows'] = len(clustered_data)
 
         print("\nAnalysis complete! Data has been processed and saved for PowerBI visualization.")
         print(f"PowerBI data is available in the '{powerbi_dir}' directory.")
         print(f"Visualizations are available in the '{output_dir}' directory.")
+        print(f"Run {run_id} is stored under '{args.output_store}'.")
+        print(f"Stage metrics were appended to '{args.metrics_file}'.")
 
     finally:
         # Close the database connection
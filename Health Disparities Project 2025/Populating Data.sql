@@ -278,6 +278,55 @@ VALUES
 ('Valley Presbyterian Hospital', 'Hospital', '91405', '15107 Vanowen St', 1, 1, 1);
 GO
 
+-- Add the RowVer change markers on databases created before they were added to Creating Database.sql
+-- The analysis validates its fetch cache with @@DBTS, which only advances for tables that have one
+IF COL_LENGTH('dbo.ZIPCodes', 'RowVer') IS NULL
+    ALTER TABLE ZIPCodes ADD RowVer ROWVERSION;
+IF COL_LENGTH('dbo.HealthcareFacilities', 'RowVer') IS NULL
+    ALTER TABLE HealthcareFacilities ADD RowVer ROWVERSION;
+IF COL_LENGTH('dbo.HealthIndicators', 'RowVer') IS NULL
+    ALTER TABLE HealthIndicators ADD RowVer ROWVERSION;
+IF COL_LENGTH('dbo.HealthcareAccessBarriers', 'RowVer') IS NULL
+    ALTER TABLE HealthcareAccessBarriers ADD RowVer ROWVERSION;
+IF COL_LENGTH('dbo.EnvironmentalFactors', 'RowVer') IS NULL
+    ALTER TABLE EnvironmentalFactors ADD RowVer ROWVERSION;
+GO
+
+-- Create the composite indexes on databases created before they were added to Creating Database.sql
+-- They serve the per-year joins of CommunityHealthView and CommunityHealthYearView
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_zipcode_year' AND object_id = OBJECT_ID('dbo.HealthIndicators'))
+    CREATE INDEX idx_zipcode_year ON HealthIndicators(ZIPCode, Year);
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_zipcode_year_health_access' AND object_id = OBJECT_ID('dbo.HealthcareAccessBarriers'))
+    CREATE INDEX idx_zipcode_year_health_access ON HealthcareAccessBarriers(ZIPCode, Year);
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_zipcode_year_environmental' AND object_id = OBJECT_ID('dbo.EnvironmentalFactors'))
+    CREATE INDEX idx_zipcode_year_environmental ON EnvironmentalFactors(ZIPCode, Year);
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_zipcode_facility_type' AND object_id = OBJECT_ID('dbo.HealthcareFacilities'))
+    CREATE INDEX idx_zipcode_facility_type ON HealthcareFacilities(ZIPCode, FacilityType);
+GO
+
+-- Create the indexed facility summary view on databases created before it was added to Creating Database.sql
+-- CommunityHealthView below reads it WITH (NOEXPAND), which fails if the view or its index is missing
+IF OBJECT_ID('dbo.FacilitySummaryView', 'V') IS NULL
+BEGIN
+    EXEC('CREATE VIEW dbo.FacilitySummaryView WITH SCHEMABINDING AS
+    SELECT
+        hf.ZIPCode,
+        hf.FacilityType,
+        COUNT_BIG(*) AS FacilityCount
+    FROM
+        dbo.HealthcareFacilities hf
+    GROUP BY
+        hf.ZIPCode,
+        hf.FacilityType;');
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_facility_summary' AND object_id = OBJECT_ID('dbo.FacilitySummaryView'))
+BEGIN
+    CREATE UNIQUE CLUSTERED INDEX idx_facility_summary ON dbo.FacilitySummaryView(ZIPCode, FacilityType);
+END
+GO
+
 -- Check if the view exists and drop it
 IF EXISTS (SELECT * FROM sys.views WHERE name = 'CommunityHealthView')
 BEGIN
@@ -316,9 +365,13 @@ SELECT
     ef.FoodDesertScore,
     ef.GreenSpaceAccess,
     ef.CalEnviroScreenScore,
-    (SELECT COUNT(*) FROM HealthcareFacilities hf WHERE hf.ZIPCode = z.ZIPCode) AS FacilityCount
+    CAST(ISNULL(fs.FacilityCount, 0) AS INT) AS FacilityCount
 FROM
     ZIPCodes z
+LEFT JOIN
+    (SELECT ZIPCode, SUM(FacilityCount) AS FacilityCount
+     FROM FacilitySummaryView WITH (NOEXPAND)
+     GROUP BY ZIPCode) fs ON z.ZIPCode = fs.ZIPCode
 LEFT JOIN
     HealthIndicators hi ON z.ZIPCode = hi.ZIPCode AND hi.Year = 2023
 LEFT JOIN
@@ -327,6 +380,54 @@ LEFT JOIN
     EnvironmentalFactors ef ON z.ZIPCode = ef.ZIPCode AND ef.Year = 2023;
 GO
 
+-- Create a long-format view with one row per ZIP code and year
+-- Filter it with WHERE Year BETWEEN ... to analyze a range of years (read by --start-year/--end-year)
+CREATE OR ALTER VIEW CommunityHealthYearView AS
+SELECT
+    z.ZIPCode,
+    hi.Year,
+    z.CommunityName,
+    z.TotalPopulation,
+    z.MedianIncome,
+    z.PercentMinority,
+    z.PercentPoverty,
+    z.PercentUninsured,
+    z.SocialVulnerabilityIndex,
+    hi.DiabetesPrevalence,
+    hi.HeartDiseasePrevalence,
+    hi.AsthmaPrevalence,
+    hi.HypertensionPrevalence,
+    hi.ObesityPrevalence,
+    hi.MentalHealthDisordersPrevalence,
+    hi.PreventableHospitalizations,
+    hi.LifeExpectancy,
+    hab.PercentNoRegularCheckup,
+    hab.PercentDelayedCare,
+    hab.PercentNoTransportation,
+    hab.AvgDistanceToHospital,
+    hab.AvgDistanceToClinic,
+    hab.PublicTransitAccessScore,
+    hab.DigitalDivideIndex,
+    ef.AirPollutionIndex,
+    ef.WaterQualityIndex,
+    ef.FoodDesertScore,
+    ef.GreenSpaceAccess,
+    ef.CalEnviroScreenScore,
+    CAST(ISNULL(fs.FacilityCount, 0) AS INT) AS FacilityCount
+FROM
+    ZIPCodes z
+INNER JOIN
+    HealthIndicators hi ON z.ZIPCode = hi.ZIPCode
+LEFT JOIN
+    (SELECT ZIPCode, SUM(FacilityCount) AS FacilityCount
+     FROM FacilitySummaryView WITH (NOEXPAND)
+     GROUP BY ZIPCode) fs ON z.ZIPCode = fs.ZIPCode
+LEFT JOIN
+    HealthcareAccessBarriers hab ON z.ZIPCode = hab.ZIPCode AND hab.Year = hi.Year
+LEFT JOIN
+    EnvironmentalFactors ef ON z.ZIPCode = ef.ZIPCode AND ef.Year = hi.Year;
+GO
+
 -- Print confirmation message
 PRINT 'Database population complete. Data is ready for analysis.';
 GO
\ No newline at end of file
@@ -0,0 +1,407 @@
+# Import
+import os
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# pyodbc is only needed for SQL Server; the SQLite stand-in works without it
+try:
+    import pyodbc
+except ImportError:
+    pyodbc = None
+
+
+logger = logging.getLogger(__name__)
+
+
+# Connection settings, overridable through the environment
+DEFAULT_SERVER = os.environ.get('LAHEALTH_DB_SERVER', 'DESKTOP-7A92MUU')
+DEFAULT_DATABASE = os.environ.get('LAHEALTH_DB_DATABASE', 'LAHealthDisparities')
+
+# SQLite database file to use instead of SQL Server (for local runs and tests)
+SQLITE_PATH_ENV = 'LAHEALTH_DB_SQLITE'
+
+# ODBC drivers to use, in order of preference
+PREFERRED_DRIVERS = ['SQL Server', 'ODBC Driver 17 for SQL Server', 'ODBC Driver 18 for SQL Server']
+
+# Query used to check that a connection is still alive
+HEALTH_CHECK_QUERY = 'SELECT 1'
+
+
+# Installed ODBC drivers in order of preference, listed once per process
+_candidate_drivers = None
+
+
+# Function to list the ODBC drivers to try, in order
+def candidate_drivers(preferred=None):
+    """
+    List the ODBC drivers to try when connecting, in order of preference.
+
+    The installed drivers are listed only once per process. An empty result
+    is never cached, so a driver installed later is still picked up.
+
+    Args:
+        preferred: Driver name to use (defaults to LAHEALTH_DB_DRIVER, then PREFERRED_DRIVERS)
+
+    Returns:
+        list: Driver names, with the preferred ones first
+
+    Raises:
+        RuntimeError: If pyodbc or an ODBC driver is not installed
+    """
+    global _candidate_drivers
+    preferred = preferred or os.environ.get('LAHEALTH_DB_DRIVER')
+    if preferred:
+        return [preferred]
+    if _candidate_drivers:
+        return list(_candidate_drivers)
+    if pyodbc is None:
+        raise RuntimeError("pyodbc is required to connect to SQL Server")
+
+    available = pyodbc.drivers()
+    logger.info(f"Available ODBC drivers: {available}")
+    drivers = [driver for driver in PREFERRED_DRIVERS if driver in available]
+    drivers += [driver for driver in available if driver not in drivers]
+    if not drivers:
+        raise RuntimeError("No ODBC driver is installed; install 'ODBC Driver 18 for SQL Server' "
+                           "or set LAHEALTH_DB_DRIVER")
+
+    _candidate_drivers = drivers
+    return list(drivers)
+
+
+# Function to pick the ODBC driver to connect with
+def resolve_driver(preferred=None):
+    """
+    Pick the ODBC driver to connect with.
+
+    Args:
+        preferred: Driver name to use (defaults to LAHEALTH_DB_DRIVER, then PREFERRED_DRIVERS)
+
+    Returns:
+        str: The first driver of candidate_drivers()
+
+    Raises:
+        RuntimeError: If pyodbc or an ODBC driver is not installed
+    """
+    return candidate_drivers(preferred)[0]
+
+
+# Function to remember the driver that connected
+def prefer_driver(driver):
+    """
+    Move a driver that connected successfully to the front of the candidates.
+
+    Args:
+        driver: Driver name from candidate_drivers()
+    """
+    global _candidate_drivers
+    if _candidate_drivers and driver in _candidate_drivers:
+        _candidate_drivers = [driver] + [other for other in _candidate_drivers if other != driver]
+
+
+# Function to build the SQL Server connection string
+def connection_string(server=None, database=None, driver=None):
+    """
+    Build the Windows Authentication connection string.
+
+    Args:
+        server: SQL Server host (defaults to DEFAULT_SERVER)
+        database: Database name (defaults to DEFAULT_DATABASE)
+        driver: ODBC driver (defaults to resolve_driver())
+
+    Returns:
+        str: ODBC connection string
+    """
+    server = server or DEFAULT_SERVER
+    database = database or DEFAULT_DATABASE
+    driver = driver or resolve_driver()
+    return f'DRIVER={{{driver}}};SERVER={server};DATABASE={database};Trusted_Connection=yes;TrustServerCertificate=yes'
+
+
+# Function to open a new database connection
+def connect(server=None, database=None, driver=None, sqlite_path=None):
+    """
+    Open a new connection to SQL Server, or to SQLite when a path is configured.
+
+    Args:
+        server: SQL Server host (defaults to DEFAULT_SERVER)
+        database: Database name (defaults to DEFAULT_DATABASE)
+        driver: ODBC driver (defaults to resolve_driver())
+        sqlite_path: SQLite file to use instead (defaults to the LAHEALTH_DB_SQLITE environment variable)
+
+    Returns:
+        connection: A DB-API connection
+
+    Raises:
+        RuntimeError: If pyodbc or an ODBC driver is not installed
+        pyodbc.Error: If no driver could connect (the last driver's error)
+    """
+    sqlite_path = sqlite_path or os.environ.get(SQLITE_PATH_ENV)
+    if sqlite_path:
+        # Pooled connections may be used from several threads, one at a time
+        return sqlite3.connect(sqlite_path, check_same_thread=False)
+
+    # Checked here as well, since a configured driver skips the lookup in candidate_drivers
+    if pyodbc is None:
+        raise RuntimeError("pyodbc is required to connect to SQL Server")
+
+    # Try each driver in turn; some machines only have one of the ODBC drivers working
+    drivers = candidate_drivers(driver)
+    for i, candidate in enumerate(drivers):
+        try:
+            connection = pyodbc.connect(connection_string(server, database, candidate))
+        except pyodbc.Error as e:
+            if i == len(drivers) - 1:
+                raise
+            logger.warning(f"Connecting with {candidate} failed: {e}; trying {drivers[i + 1]}")
+            continue
+        logger.info(f"Connected using {candidate}.")
+        prefer_driver(candidate)
+        return connection
+
+
+# Function to check that a connection is still usable
+def ping(connection):
+    """
+    Run a trivial query to check that a connection is alive.
+
+    Args:
+        connection: A DB-API connection
+
+    Returns:
+        bool: True if the query succeeded
+    """
+    try:
+        cursor = connection.cursor()
+        cursor.execute(HEALTH_CHECK_QUERY)
+        cursor.fetchall()
+        cursor.close()
+        return True
+    except Exception as e:
+        logger.warning(f"Connection health check failed: {e}")
+        return False
+
+
+# Class for a connection handed out by a pool
+class PooledConnection:
+    """
+    Wrapper that returns its connection to the pool on close().
+
+    Every other attribute is delegated to the underlying connection, so it
+    can be passed anywhere a DB-API connection is expected.
+    """
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    @property
+    def raw(self):
+        """The underlying DB-API connection, for libraries (like pandas) that check the connection type."""
+        return self._connection
+
+    def close(self):
+        """Return the connection to the pool instead of closing it."""
+        if self._connection is not None:
+            self._pool.release(self._connection)
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# Function to unwrap a pooled connection
+def raw_connection(connection):
+    """
+    Get the DB-API connection behind a PooledConnection.
+
+    Args:
+        connection: A PooledConnection or a plain DB-API connection
+
+    Returns:
+        connection: The underlying DB-API connection
+    """
+    return getattr(connection, 'raw', connection)
+
+
+# Class for a thread-safe pool of database connections
+class ConnectionPool:
+    """
+    Thread-safe pool of reusable database connections.
+
+    Idle connections are health-checked before they are handed out and
+    replaced if they have gone stale. A pool belongs to the process that
+    created it; worker processes should call get_pool() to build their own.
+    """
+
+    def __init__(self, factory=connect, max_size=4, check_interval=30, timeout=30):
+        """
+        Args:
+            factory: Zero-argument callable that opens a new connection
+            max_size: Maximum number of open connections
+            check_interval: Seconds a connection may sit idle before it is health-checked again
+            timeout: Seconds to wait for a free connection when the pool is exhausted
+        """
+        self.factory = factory
+        self.max_size = max_size
+        self.check_interval = check_interval
+        self.timeout = timeout
+        self._idle = []
+        self._open = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Take a healthy connection from the pool, opening one if needed.
+
+        Returns:
+            connection: A DB-API connection (give it back with release())
+        """
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                while self._idle:
+                    connection, idle_since = self._idle.pop()
+                    if time.monotonic() - idle_since < self.check_interval or ping(connection):
+                        return connection
+                    self._discard(connection)
+
+                if self._open < self.max_size:
+                    self._open += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    raise TimeoutError(f"No database connection became free within {self.timeout}s")
+
+        try:
+            return self.factory()
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, connection):
+        """
+        Return a connection to the pool.
+
+        Args:
+            connection: A connection from acquire()
+        """
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a with block.
+
+        Yields:
+            connection: A DB-API connection
+        """
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def health_check(self):
+        """
+        Check every idle connection and drop the ones that fail.
+
+        Returns:
+            dict: Number of 'open', 'idle' and 'dropped' connections
+        """
+        with self._condition:
+            healthy = []
+            dropped = 0
+            for connection, _ in self._idle:
+                if ping(connection):
+                    healthy.append((connection, time.monotonic()))
+                else:
+                    self._discard(connection)
+                    dropped += 1
+            self._idle = healthy
+            self._condition.notify_all()
+            return {'open': self._open, 'idle': len(self._idle), 'dropped': dropped}
+
+    def close_all(self):
+        """Close every idle connection."""
+        with self._condition:
+            for connection, _ in self._idle:
+                self._discard(connection)
+            self._idle = []
+            self._condition.notify_all()
+
+    def _discard(self, connection):
+        # Caller holds the lock
+        self._open -= 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+# Pools by (process id, settings), so forked workers never share a parent's connections
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+# Function to get this process's shared pool
+def get_pool(server=None, database=None, driver=None, sqlite_path=None, max_size=4):
+    """
+    Get the shared connection pool for the given settings in this process.
+
+    Args:
+        server: SQL Server host (defaults to DEFAULT_SERVER)
+        database: Database name (defaults to DEFAULT_DATABASE)
+        driver: ODBC driver (defaults to resolve_driver())
+        sqlite_path: SQLite file to use instead (defaults to the LAHEALTH_DB_SQLITE environment variable)
+        max_size: Maximum number of open connections (used when the pool is created)
+
+    Returns:
+        ConnectionPool: The pool
+    """
+    key = (os.getpid(), server, database, driver, sqlite_path or os.environ.get(SQLITE_PATH_ENV))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                lambda: connect(server, database, driver, sqlite_path), max_size=max_size
+            )
+        return _pools[key]
+
+
+# Function to borrow a pooled connection that goes back to the pool on close()
+def connect_to_database(server=None, database=None, driver=None, sqlite_path=None):
+    """
+    Connect to our SQL Server database through the shared pool.
+
+    Args:
+        server: SQL Server host (defaults to DEFAULT_SERVER)
+        database: Database name (defaults to DEFAULT_DATABASE)
+        driver: ODBC driver (defaults to resolve_driver())
+        sqlite_path: SQLite file to use instead (defaults to the LAHEALTH_DB_SQLITE environment variable)
+
+    Returns:
+        PooledConnection: A connection whose close() returns it to the pool, or None if connection fails
+    """
+    logger.info("Connecting to the database...")
+    pool = get_pool(server, database, driver, sqlite_path)
+    try:
+        connection = PooledConnection(pool, pool.acquire())
+        logger.info("Successfully connected to the database!")
+        return connection
+    except Exception as e:
+        logger.error(f"All connection attempts failed: {e}")
+        return None
@@ -0,0 +1,99 @@
+# Shared helpers for the tests: loading the analysis scripts and building SQLite stand-in databases
+import os
+import re
+import sys
+import atexit
+import tempfile
+import importlib.util
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The scripts import lahealth_db from the project directory
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+# The scripts log to la_health_analysis.log in the working directory, so they are imported from here
+WORK_DIR = tempfile.TemporaryDirectory()
+atexit.register(WORK_DIR.cleanup)
+
+
+# Function to load an analysis script whose file name is not a valid module name
+def load_script(module_name, filename):
+    """
+    Load an analysis script once and register it so process pools can pickle its functions.
+
+    Args:
+        module_name: Name to register the module under
+        filename: Script file name in PROJECT_DIR
+
+    Returns:
+        module: The loaded script
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(PROJECT_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    previous_dir = os.getcwd()
+    os.chdir(WORK_DIR.name)
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    finally:
+        os.chdir(previous_dir)
+    return module
+
+
+def load_first_code():
+    return load_script('lahealth_first', 'LAHealth First Code.py')
+
+
+def load_second_code():
+    return load_script('lahealth_second', 'LAHealth Second Code.py')
+
+
+# T-SQL in the view definitions and its SQLite equivalent
+VIEW_REPLACEMENTS = [(' WITH SCHEMABINDING', ''), (' WITH (NOEXPAND)', ''), ('dbo.', ''),
+                     ('COUNT_BIG(*)', 'COUNT(*)'), ('ISNULL(', 'IFNULL(')]
+
+
+# Function to create the tables and views of Creating Database.sql in a SQLite database
+def create_schema(connection):
+    with open(os.path.join(PROJECT_DIR, 'Creating Database.sql')) as f:
+        sql = f.read()
+    for statement in re.findall(r'CREATE TABLE .*?\n\);', sql, flags=re.S):
+        connection.execute(statement.replace('INT IDENTITY(1,1) PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT'))
+    for statement in re.findall(r'CREATE VIEW .*?;\nGO', sql, flags=re.S):
+        statement = statement[:-len(';\nGO')]
+        for tsql, sqlite in VIEW_REPLACEMENTS:
+            statement = statement.replace(tsql, sqlite)
+        connection.execute(statement)
+    connection.commit()
+
+
+# Function to build the frame fetch_data_for_analysis returns, without a database
+def community_health_frame(n_units=300, seed=1, years=None):
+    """
+    Build typed community health data from the synthetic generators.
+
+    Args:
+        n_units: Number of geographic units
+        seed: Seed for the generators
+        years: Optional years; the units are repeated once per year with a Year column
+
+    Returns:
+        DataFrame: Community health data with facility counts
+    """
+    import pandas as pd
+
+    first, second = load_first_code(), load_second_code()
+    units = first.generate_unit_data(n_units, seed)
+    facilities = first.generate_healthcare_facilities(zip_codes=units['ZIPCode'].to_numpy(), seed=seed)
+    community_health = second.enforce_schema(second.add_facility_counts(units, second.count_facilities(facilities)))
+    if years:
+        community_health = pd.concat([community_health.assign(Year=year) for year in years], ignore_index=True)
+    return community_health
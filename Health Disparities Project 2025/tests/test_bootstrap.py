@@ -0,0 +1,55 @@
+# Tests of the disparity index bootstrap in LAHealth Second Code.py
+import tracemalloc
+import unittest
+
+import numpy as np
+
+from support import community_health_frame, load_second_code
+
+
+class BootstrapTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.second = load_second_code()
+        cls.features = cls.second.FeatureMatrix.from_frame(community_health_frame(), cls.second.ANALYSIS_FEATURES)
+
+    def bootstrap(self, **options):
+        return self.second.bootstrap_disparity(self.features, n_boot=40, **options)
+
+    def test_results_do_not_depend_on_threads_or_budget(self):
+        reference = self.bootstrap(n_jobs=1, memory_budget=64 * 1024 ** 2)
+
+        for n_jobs, memory_budget in [(4, 64 * 1024 ** 2), (3, 400 * 1024), (1, 300 * 1024)]:
+            result = self.bootstrap(n_jobs=n_jobs, memory_budget=memory_budget)
+            np.testing.assert_array_equal(result.to_numpy(), reference.to_numpy())
+
+    def test_seed_changes_the_resamples(self):
+        self.assertFalse(np.array_equal(self.bootstrap(seed=1).to_numpy(), self.bootstrap(seed=2).to_numpy()))
+
+    def test_interval_contains_the_point_estimate(self):
+        point = self.second.compute_disparity_columns(self.features)['HealthDisparityIndex']
+        result = self.bootstrap()
+
+        self.assertTrue((result['HealthDisparityIndexLower'] <= point + 1e-3).all())
+        self.assertTrue((point - 1e-3 <= result['HealthDisparityIndexUpper']).all())
+        np.testing.assert_allclose(result.iloc[:, 2:].sum(axis=1), 1, atol=1e-6)
+
+    def test_stays_within_memory_budget(self):
+        memory_budget = 400 * 1024
+        tracemalloc.start()
+        try:
+            self.bootstrap(n_jobs=4, memory_budget=memory_budget)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertLessEqual(peak, memory_budget)
+
+    def test_budget_too_small_for_one_batch_raises(self):
+        with self.assertRaisesRegex(ValueError, 'memory_budget'):
+            self.bootstrap(memory_budget=100 * 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
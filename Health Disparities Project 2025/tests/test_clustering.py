@@ -0,0 +1,51 @@
+# Tests of the streaming community clustering in LAHealth Second Code.py
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import adjusted_rand_score
+
+from support import community_health_frame, load_second_code
+
+
+class StreamingClusteringTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.second = load_second_code()
+
+    def cluster(self, data, chunk_size, **options):
+        chunk_source = lambda: (data.iloc[start:start + chunk_size].copy() for start in range(0, len(data), chunk_size))
+        labeled_chunks, profiles = self.second.cluster_communities_streaming(chunk_source, **options)
+        return pd.concat(list(labeled_chunks)), profiles
+
+    def test_every_row_is_assigned_its_nearest_profile(self):
+        data = community_health_frame()
+        labeled, profiles = self.cluster(data, chunk_size=64, k=4, batch_size=50)
+
+        features = data[profiles.columns].to_numpy(dtype='float64')
+        # The running statistics of the streamed chunks equal those of the whole frame
+        means, stds = np.nanmean(features, axis=0), np.nanstd(features, axis=0)
+        scaled = (np.where(np.isnan(features), means, features) - means) / stds
+        centers = (profiles.to_numpy() - means) / stds
+        nearest = np.argmin(((scaled[:, None, :] - centers[None]) ** 2).sum(axis=2), axis=1)
+
+        self.assertEqual(len(labeled), len(data))
+        np.testing.assert_array_equal(labeled['Cluster'].to_numpy(), nearest)
+        self.assertFalse(labeled['CommunityProfile'].isna().any())
+
+    def test_recovers_separated_groups(self):
+        rng = np.random.default_rng(3)
+        groups = np.repeat(np.arange(3), 200)
+        columns = self.second.CLUSTER_FEATURES
+        data = pd.DataFrame(rng.normal(size=(600, len(columns))) + 10 * groups[:, None], columns=columns)
+        order = rng.permutation(600)
+        data, groups = data.iloc[order].reset_index(drop=True), groups[order]
+
+        labeled, _ = self.cluster(data, chunk_size=128, k=3, batch_size=100, n_epochs=3)
+
+        self.assertEqual(adjusted_rand_score(groups, labeled['Cluster']), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# Tests of the connection pool in lahealth_db.py, with SQLite connections standing in for SQL Server
+import sqlite3
+import unittest
+
+import support  # noqa: F401  (puts the project directory on sys.path)
+import lahealth_db  # noqa: E402
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.opened = []
+        self.pool = lahealth_db.ConnectionPool(self.open_connection, max_size=2, timeout=0.1)
+        self.addCleanup(self.pool.close_all)
+
+    def open_connection(self):
+        connection = sqlite3.connect(':memory:', check_same_thread=False)
+        self.opened.append(connection)
+        return connection
+
+    def test_released_connections_are_reused(self):
+        for _ in range(3):
+            with self.pool.connection() as connection:
+                connection.execute("SELECT 1")
+
+        self.assertEqual(len(self.opened), 1)
+
+    def test_health_check_drops_broken_connections(self):
+        first, second = self.pool.acquire(), self.pool.acquire()
+        first.close()
+        self.pool.release(first)
+        self.pool.release(second)
+
+        self.assertEqual(self.pool.health_check(), {'open': 1, 'idle': 1, 'dropped': 1})
+
+    def test_stale_connection_is_replaced_on_acquire(self):
+        self.pool.check_interval = 0
+        connection = self.pool.acquire()
+        connection.close()
+        self.pool.release(connection)
+
+        replacement = self.pool.acquire()
+
+        self.assertIsNot(replacement, connection)
+        replacement.execute("SELECT 1")
+
+    def test_exhausted_pool_times_out(self):
+        self.pool.acquire()
+        self.pool.acquire()
+
+        with self.assertRaises(TimeoutError):
+            self.pool.acquire()
+
+    def test_failed_open_frees_its_slot(self):
+        self.pool.factory = lambda: (_ for _ in ()).throw(OSError("server unreachable"))
+        for _ in range(3):
+            with self.assertRaises(OSError):
+                self.pool.acquire()
+
+        self.pool.factory = self.open_connection
+        self.pool.acquire()
+        self.pool.acquire()
+
+    def test_pooled_connection_returns_itself_on_close(self):
+        pooled = lahealth_db.PooledConnection(self.pool, self.pool.acquire())
+        raw = lahealth_db.raw_connection(pooled)
+        pooled.close()
+
+        self.assertIs(self.pool.acquire(), raw)
+
+
+if __name__ == '__main__':
+    unittest.main()
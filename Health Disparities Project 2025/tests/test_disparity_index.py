@@ -0,0 +1,98 @@
+# Tests of the healthcare disparity index in LAHealth Second Code.py
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from support import community_health_frame, load_second_code
+
+
+class DisparityIndexTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.second = load_second_code()
+        cls.factor_cols = [col for factors, _ in cls.second.FACTOR_GROUP_WEIGHTS for col in factors]
+
+    def test_rows_without_factors_get_no_level_by_year(self):
+        data = community_health_frame(years=[2022, 2023])
+        data.loc[3, self.factor_cols] = np.nan
+
+        grouped = self.second.identify_healthcare_disparities(data, group_col='Year')
+        ungrouped = self.second.identify_healthcare_disparities(data[data['Year'] == 2022])
+
+        for result in [grouped, ungrouped]:
+            self.assertTrue(np.isnan(result.loc[3, 'HealthDisparityIndex']))
+            self.assertTrue(result['DisparityLevel'].isna()[3])
+        self.assertEqual(grouped['DisparityLevel'].isna().sum(), 1)
+
+    def test_saved_model_scores_like_the_original(self):
+        data = community_health_frame()
+        model = self.second.DisparityModel().fit(data)
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, 'model.json')
+            model.save(path)
+            loaded = self.second.DisparityModel.load(path)
+
+        pd.testing.assert_frame_equal(loaded.transform(data), model.transform(data))
+
+    def test_score_records_matches_transform(self):
+        data = community_health_frame().dropna(subset=self.factor_cols)
+        model = self.second.DisparityModel().fit(data)
+
+        index, levels = model.score_records(data[model.factor_cols].to_numpy(dtype='float64'))
+        expected = model.transform(data)
+
+        np.testing.assert_allclose(index, expected['HealthDisparityIndex'], atol=1e-9)
+        np.testing.assert_array_equal(levels, expected['DisparityLevel'].cat.codes)
+
+
+class IncrementalUpdateTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.second = load_second_code()
+
+    def setUp(self):
+        self.data = community_health_frame()
+        self.state = self.second.build_disparity_state(self.data)
+
+    def full_recompute(self):
+        return self.second.identify_healthcare_disparities(self.state['data'].reset_index()).set_index('ZIPCode')
+
+    def test_small_update_stays_within_tolerance_of_full_recompute(self):
+        updates = self.data.sample(10, random_state=1)
+        updates['DiabetesPrevalence'] *= 1.05
+
+        refreshed = self.second.update_healthcare_disparities(self.state, updates, tolerance=0.05)
+
+        full = self.full_recompute()
+        index_error = np.abs(full['HealthDisparityIndex'] - self.state['result']['HealthDisparityIndex'].reindex(full.index))
+        self.assertLess(index_error.max(), 0.05)
+        pd.testing.assert_series_equal(self.state['result'].loc[refreshed.index, 'HealthDisparityIndex'],
+                                       refreshed['HealthDisparityIndex'])
+
+    def test_drifting_update_matches_full_recompute(self):
+        updates = self.data.sample(100, random_state=2)
+        updates['AirPollutionIndex'] += 30
+
+        self.second.update_healthcare_disparities(self.state, updates, tolerance=0.05)
+
+        full = self.full_recompute()
+        result = self.state['result'].reindex(full.index)
+        np.testing.assert_array_equal(result['HealthDisparityIndex'], full['HealthDisparityIndex'])
+        np.testing.assert_array_equal(result['DisparityLevel'].astype(str), full['DisparityLevel'].astype(str))
+
+    def test_new_rows_are_appended(self):
+        new_rows = self.data.head(3).assign(ZIPCode=['X1', 'X2', 'X3'])
+
+        refreshed = self.second.update_healthcare_disparities(self.state, new_rows)
+
+        self.assertEqual(len(self.state['result']), len(self.data) + 3)
+        self.assertEqual(sorted(refreshed.index), ['X1', 'X2', 'X3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
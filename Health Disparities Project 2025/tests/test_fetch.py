@@ -0,0 +1,97 @@
+# Tests of the typed, cached fetch in LAHealth Second Code.py against SQLite (no SQL Server needed)
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from support import create_schema, load_first_code, load_second_code
+
+# Imported after support, which puts the project directory on sys.path
+import lahealth_db  # noqa: E402
+
+
+class FetchTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.first = load_first_code()
+        cls.second = load_second_code()
+
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        self.db_path = os.path.join(workdir.name, 'test.sqlite')
+        self.cache_dir = os.path.join(workdir.name, 'cache')
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.addCleanup(self.connection.close)
+        create_schema(self.connection)
+        self.first.load_synthetic_data(self.connection, n_units=40, years=(2022, 2023))
+
+    def fetch(self, **options):
+        return self.second.fetch_data_for_analysis(self.connection, years=(2022, 2023), **options)
+
+    def test_chunked_fetch_matches_unchunked(self):
+        whole = self.second.read_community_health(self.connection, years=(2022, 2023))
+        chunked = self.second.read_community_health(self.connection, chunksize=7, years=(2022, 2023))
+
+        key = ['ZIPCode', 'Year']
+        whole = whole[chunked.columns].sort_values(key).reset_index(drop=True)
+        chunked = chunked.sort_values(key).reset_index(drop=True)
+        self.assertEqual(len(chunked), 80)
+        pd.testing.assert_frame_equal(chunked, whole, check_categorical=False)
+
+    def test_chunks_have_declared_dtypes(self):
+        for chunk in self.second.community_health_chunks(self.connection, chunksize=7, years=(2022, 2023)):
+            self.assertLessEqual(len(chunk), 7)
+            for col, dtype in self.second.COMMUNITY_HEALTH_DTYPES.items():
+                if col in chunk.columns:
+                    self.assertEqual(str(chunk[col].dtype), dtype, col)
+
+    def test_pooled_fetch_matches_serial_fetch(self):
+        pool = lahealth_db.ConnectionPool(lambda: sqlite3.connect(self.db_path, check_same_thread=False))
+        self.addCleanup(pool.close_all)
+
+        serial = self.fetch(include_facilities=True)
+        pooled = self.fetch(include_facilities=True, pool=pool)
+
+        for name in serial:
+            pd.testing.assert_frame_equal(pooled[name], serial[name])
+
+    def test_cache_hit_returns_the_fetched_data(self):
+        fetched = self.fetch(cache_dir=self.cache_dir)
+
+        # A hit never runs the queries (a failed fetch returns None)
+        with mock.patch.object(self.second, 'run_fetch_queries', side_effect=AssertionError("cache miss")):
+            cached = self.fetch(cache_dir=self.cache_dir)
+
+        self.assertIsNotNone(cached)
+        pd.testing.assert_frame_equal(cached['community_health'], fetched['community_health'],
+                                      check_categorical=False)
+
+    def test_update_invalidates_cache(self):
+        before = self.fetch(cache_dir=self.cache_dir)['community_health']
+        self.connection.execute("UPDATE HealthIndicators SET DiabetesPrevalence = 99 WHERE Year = 2023")
+        self.connection.commit()
+
+        after = self.fetch(cache_dir=self.cache_dir)['community_health']
+
+        self.assertFalse((before['DiabetesPrevalence'] == 99).any())
+        self.assertTrue((after.loc[after['Year'] == 2023, 'DiabetesPrevalence'] == 99).all())
+
+    def test_read_only_database_falls_back_to_hashing(self):
+        read_only = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        self.addCleanup(read_only.close)
+        key = self.second.fetch_cache_key(read_only, years=[2022, 2023])
+        self.assertEqual(key, self.second.fetch_cache_key(read_only, years=[2022, 2023]))
+
+        self.connection.execute("UPDATE ZIPCodes SET CommunityName = 'Renamed' WHERE rowid = 1")
+        self.connection.commit()
+
+        self.assertNotEqual(self.second.fetch_cache_key(read_only, years=[2022, 2023]), key)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+# Tests of the synthetic data loader in LAHealth First Code.py against SQLite (no SQL Server needed)
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from support import create_schema, load_first_code
+
+
+def count(connection, query, params=()):
+    return connection.execute(query, params).fetchone()[0]
+
+
+class LoadSyntheticDataTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.first = load_first_code()
+
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        # main() writes the centroid table to the working directory
+        previous_dir = os.getcwd()
+        os.chdir(workdir.name)
+        self.addCleanup(os.chdir, previous_dir)
+        self.db_path = os.path.join(workdir.name, 'test.sqlite')
+        self.connection = sqlite3.connect(self.db_path)
+        create_schema(self.connection)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def insert_curated_rows(self):
+        # A hand-curated ZIP code, as Populating Data.sql inserts them
+        self.connection.execute("INSERT INTO ZIPCodes (ZIPCode, CommunityName, TotalPopulation) VALUES ('90001', 'Curated', 1)")
+        self.connection.execute("INSERT INTO HealthIndicators (ZIPCode, Year, DiabetesPrevalence) VALUES ('90001', 2023, 18.5)")
+        self.connection.execute("INSERT INTO HealthcareFacilities (FacilityName, FacilityType, ZIPCode) "
+                                "VALUES ('Curated Hospital', 'Hospital', '90001')")
+        self.connection.commit()
+
+    def test_loads_every_table(self):
+        stats = self.first.load_synthetic_data(self.connection, n_units=50, years=(2022, 2023), chunk_size=17)
+
+        self.assertEqual(count(self.connection, "SELECT COUNT(*) FROM ZIPCodes"), 50)
+        for table in ['HealthIndicators', 'HealthcareAccessBarriers', 'EnvironmentalFactors']:
+            self.assertEqual(count(self.connection, f"SELECT COUNT(*) FROM {table}"), 100)
+            self.assertEqual(count(self.connection, f"SELECT COUNT(DISTINCT Year) FROM {table}"), 2)
+        self.assertEqual(count(self.connection, "SELECT COUNT(*) FROM HealthcareFacilities"), 100)
+        self.assertEqual(stats['HealthIndicators']['rows'], 100)
+
+    def test_append_keeps_existing_rows(self):
+        self.insert_curated_rows()
+
+        self.first.load_synthetic_data(self.connection, n_units=5, years=(2023, 2024))
+
+        self.assertEqual(count(self.connection, "SELECT COUNT(*) FROM ZIPCodes"), 5)
+        self.assertEqual(count(self.connection, "SELECT CommunityName FROM ZIPCodes WHERE ZIPCode = '90001'"), 'Curated')
+        # The curated 2023 row is kept and not duplicated; 2024 is added
+        self.assertEqual(count(self.connection, "SELECT COUNT(*) FROM HealthIndicators WHERE ZIPCode = '90001'"), 2)
+        self.assertEqual(count(self.connection, "SELECT DiabetesPrevalence FROM HealthIndicators "
+                                                "WHERE ZIPCode = '90001' AND Year = 2023"), 18.5)
+        # Facilities are only generated for the four new ZIP codes
+        self.assertEqual(count(self.connection, "SELECT COUNT(*) FROM HealthcareFacilities WHERE ZIPCode = '90001'"), 1)
+        self.assertEqual(count(self.connection, "SELECT COUNT(*) FROM HealthcareFacilities"), 1 + 2 * 4)
+
+    def test_append_twice_adds_nothing(self):
+        self.first.load_synthetic_data(self.connection, n_units=5)
+        stats = self.first.load_synthetic_data(self.connection, n_units=5)
+
+        self.assertTrue(all(table_stats['rows'] == 0 for table_stats in stats.values()))
+        self.assertEqual(count(self.connection, "SELECT COUNT(*) FROM HealthIndicators"), 5)
+
+    def test_clear_existing_replaces_rows(self):
+        self.insert_curated_rows()
+
+        self.first.load_synthetic_data(self.connection, n_units=5, clear_existing=True)
+
+        self.assertNotEqual(count(self.connection, "SELECT CommunityName FROM ZIPCodes WHERE ZIPCode = '90001'"), 'Curated')
+        self.assertEqual(count(self.connection, "SELECT COUNT(*) FROM HealthcareFacilities"), 10)
+
+    def test_main_appends_unless_told_to_clear(self):
+        self.insert_curated_rows()
+
+        with mock.patch.dict(os.environ, {'LAHEALTH_DB_SQLITE': self.db_path}):
+            self.first.main([])
+            self.assertEqual(count(self.connection, "SELECT CommunityName FROM ZIPCodes WHERE ZIPCode = '90001'"), 'Curated')
+            self.assertEqual(count(self.connection, "SELECT COUNT(*) FROM ZIPCodes"), len(self.first.LA_ZIP_CODES))
+
+            self.first.main(['--clear-existing'])
+            self.assertNotEqual(count(self.connection, "SELECT CommunityName FROM ZIPCodes WHERE ZIPCode = '90001'"), 'Curated')
+            self.assertEqual(count(self.connection, "SELECT COUNT(*) FROM HealthcareFacilities "
+                                                    "WHERE FacilityName = 'Curated Hospital'"), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
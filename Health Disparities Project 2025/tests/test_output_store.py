@@ -0,0 +1,60 @@
+# Tests of the partitioned output store in LAHealth Second Code.py
+import os
+import tempfile
+import unittest
+
+from support import load_second_code
+
+
+class OutputStoreTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.second = load_second_code()
+
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        self.store = self.second.OutputStore(os.path.join(workdir.name, 'store'))
+
+    def write(self, year, run_id, name='analysis.csv'):
+        with self.store.write_partition(year, run_id) as staging_path:
+            with open(os.path.join(staging_path, name), 'w') as f:
+                f.write('ZIPCode\n90001\n')
+
+    def test_completed_partition_is_recorded_as_latest(self):
+        self.write(2023, 'run-a')
+        self.write(2023, 'run-b')
+
+        latest = self.store.latest_partition(2023)
+        self.assertEqual(latest, self.store.partition_path(2023, 'run-b'))
+        self.assertTrue(os.path.exists(os.path.join(latest, 'analysis.csv')))
+        self.assertEqual([p['run_id'] for p in self.store.read_manifest()['partitions']], ['run-a', 'run-b'])
+
+    def test_failed_partition_leaves_no_trace(self):
+        with self.assertRaises(RuntimeError):
+            with self.store.write_partition(2023, 'run-a') as staging_path:
+                open(os.path.join(staging_path, 'analysis.csv'), 'w').close()
+                raise RuntimeError("analysis failed")
+
+        self.assertIsNone(self.store.latest_partition())
+        self.assertFalse(os.path.exists(self.store.partition_path(2023, 'run-a')))
+        self.assertEqual(os.listdir(os.path.join(self.store.root, '.staging')), [])
+
+    def test_partition_is_never_overwritten(self):
+        self.write(2023, 'run-a')
+
+        with self.assertRaises(FileExistsError):
+            self.write(2023, 'run-a', name='other.csv')
+        self.assertEqual(self.store.read_manifest()['partitions'][0]['files'], ['analysis.csv'])
+
+    def test_latest_partition_defaults_to_most_recent_year(self):
+        self.write(2024, 'run-a')
+        self.write(2022, 'run-b')
+
+        self.assertEqual(self.store.latest_partition(), self.store.partition_path(2024, 'run-a'))
+        self.assertIsNone(self.store.latest_partition(2021))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+# Tests of the facility proximity and catchment access scores in LAHealth Second Code.py
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from support import load_second_code
+
+
+# Function to compute great-circle distances in miles between every point and every facility
+def haversine_miles(points, facilities):
+    lat1, lon1 = (np.radians(points[col].to_numpy())[:, None] for col in ['Latitude', 'Longitude'])
+    lat2, lon2 = (np.radians(facilities[col].to_numpy())[None, :] for col in ['Latitude', 'Longitude'])
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * np.arcsin(np.sqrt(a)) * 3958.8
+
+
+class ProximityTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.second = load_second_code()
+        rng = np.random.default_rng(0)
+        # Points and facilities scattered over LA County
+        cls.points = pd.DataFrame({
+            'ZIPCode': [f"{90000 + i}" for i in range(200)],
+            'Latitude': rng.uniform(33.7, 34.8, 200),
+            'Longitude': rng.uniform(-118.9, -117.7, 200),
+            'Population': rng.integers(0, 50000, 200),
+        })
+        cls.facilities = pd.DataFrame({
+            'FacilityType': rng.choice(['Hospital', 'Clinic', 'Community Health Center'], 80),
+            'HasEmergencyServices': rng.random(80) < 0.3,
+            'AcceptsMediCal': rng.random(80) < 0.6,
+            'AcceptsMedicare': rng.random(80) < 0.6,
+            'Latitude': rng.uniform(33.7, 34.8, 80),
+            'Longitude': rng.uniform(-118.9, -117.7, 80),
+        })
+        cls.miles = haversine_miles(cls.points, cls.facilities)
+
+    def test_nearest_distances_match_brute_force(self):
+        proximity = self.second.facility_proximity(self.points, self.facilities, chunk_size=33)
+
+        for column, criteria in self.second.PROXIMITY_TARGETS:
+            selected = np.ones(len(self.facilities), dtype=bool)
+            for col, values in criteria.items():
+                selected &= self.facilities[col].isin(values).to_numpy()
+            expected = self.miles[:, selected].min(axis=1)
+            np.testing.assert_allclose(proximity[column].to_numpy(), expected, rtol=1e-5, err_msg=column)
+
+    def test_catchment_matrix_matches_brute_force(self):
+        catchment = self.second.catchment_matrix(self.points, self.facilities, radius_miles=10, chunk_size=33)
+
+        np.testing.assert_array_equal(catchment.toarray() > 0, self.miles <= 10)
+
+    def test_catchment_access_matches_dense_2sfca(self):
+        access = self.second.catchment_access(self.points, self.facilities, radius_miles=10)
+
+        within = (self.miles <= 10).astype('float64')
+        population = self.points['Population'].to_numpy(dtype='float64')
+        demand = within.T @ population
+        ratios = np.divide(self.second.facility_capacity(self.facilities), demand,
+                           out=np.zeros(len(self.facilities)), where=demand > 0)
+        expected = within @ ratios * 10000
+        expected[population == 0] = np.nan
+        np.testing.assert_allclose(access['CatchmentAccessPer10k'].to_numpy(), expected, rtol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
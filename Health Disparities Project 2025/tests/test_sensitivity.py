@@ -0,0 +1,51 @@
+# Tests of the weight sensitivity sweep in LAHealth Second Code.py
+import unittest
+
+import numpy as np
+from scipy.stats import kendalltau
+
+from support import community_health_frame, load_second_code
+
+
+class SensitivityTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.second = load_second_code()
+        cls.features = cls.second.FeatureMatrix.from_frame(community_health_frame(), cls.second.ANALYSIS_FEATURES)
+        cls.weights = cls.second.candidate_weights(30)
+        categories = cls.second.category_scores(cls.features)
+        cls.categories = categories[~np.isnan(categories).any(axis=1)]
+
+    def scipy_tau(self):
+        baseline = self.categories @ self.weights[0]
+        return np.array([kendalltau(baseline, self.categories @ weights).statistic for weights in self.weights])
+
+    def test_kendall_tau_is_exact_for_small_populations(self):
+        _, candidates = self.second.weight_sensitivity(self.features, self.weights)
+
+        np.testing.assert_allclose(candidates['KendallTau'], self.scipy_tau(), atol=1e-12)
+
+    def test_sampled_kendall_tau_is_close(self):
+        _, candidates = self.second.weight_sensitivity(self.features, self.weights, n_tau_pairs=5000)
+
+        # The standard error is at most 1 / sqrt(5000) ~ 0.014
+        np.testing.assert_allclose(candidates['KendallTau'], self.scipy_tau(), atol=0.06)
+
+    def test_results_do_not_depend_on_budget(self):
+        stability, candidates = self.second.weight_sensitivity(self.features, self.weights)
+        small_stability, small_candidates = self.second.weight_sensitivity(self.features, self.weights,
+                                                                           memory_budget=1)
+
+        np.testing.assert_array_equal(small_stability.to_numpy(), stability.to_numpy())
+        np.testing.assert_array_equal(small_candidates.to_numpy(), candidates.to_numpy())
+
+    def test_baseline_candidate_agrees_with_itself(self):
+        _, candidates = self.second.weight_sensitivity(self.features, self.weights)
+
+        self.assertEqual(candidates['KendallTau'].iloc[0], 1)
+        self.assertEqual(candidates['TopNChurn'].iloc[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()